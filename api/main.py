@@ -7,6 +7,7 @@ import pandas as pd
 
 try:
     from .database import get_db
+    from .queries import CHANNEL_ACTIVITY_QUERY, SEARCH_MESSAGES_QUERY, SEARCH_CHANNEL_FILTER, SEARCH_ORDER
     from .schemas import (
         ChannelStats, TopProduct, Message, 
         VisualContentStats, ActivityTrend, MessageSearch
@@ -14,6 +15,7 @@ try:
 except ImportError:
     # Fallback for when running directly
     from database import get_db
+    from queries import CHANNEL_ACTIVITY_QUERY, SEARCH_MESSAGES_QUERY, SEARCH_CHANNEL_FILTER, SEARCH_ORDER
     from schemas import (
         ChannelStats, TopProduct, Message, 
         VisualContentStats, ActivityTrend, MessageSearch
@@ -104,21 +106,7 @@ def get_channel_activity(
     Shows daily message counts and average views.
     """
     try:
-        query = """
-        SELECT 
-            TO_CHAR(dd.full_date, 'YYYY-MM-DD') as date,
-            COUNT(fm.message_id) as message_count,
-            COALESCE(AVG(fm.view_count), 0) as avg_views
-        FROM public_marts.dim_dates dd
-        LEFT JOIN public_marts.fct_messages fm ON dd.date_key = fm.date_key
-        LEFT JOIN public_marts.dim_channels dc ON fm.channel_key = dc.channel_key
-        WHERE dc.channel_name = :channel_name
-          AND dd.full_date >= CURRENT_DATE - INTERVAL ':days days'
-        GROUP BY dd.full_date
-        ORDER BY dd.full_date DESC
-        """
-        
-        result = db.execute(text(query), {
+        result = db.execute(text(CHANNEL_ACTIVITY_QUERY), {
             "channel_name": channel_name,
             "days": days
         })
@@ -148,28 +136,15 @@ def search_messages(
     Supports channel filtering.
     """
     try:
-        base_query = """
-        SELECT 
-            fm.message_id,
-            dc.channel_name,
-            dd.full_date as message_date,
-            fm.message_text,
-            fm.view_count as views,
-            fm.forward_count as forwards,
-            fm.has_image
-        FROM public_marts.fct_messages fm
-        JOIN public_marts.dim_channels dc ON fm.channel_key = dc.channel_key
-        JOIN public_marts.dim_dates dd ON fm.date_key = dd.date_key
-        WHERE LOWER(fm.message_text) LIKE '%' || LOWER(:query) || '%'
-        """
+        base_query = SEARCH_MESSAGES_QUERY
         
         params = {"query": query, "limit": limit}
         
         if channel:
-            base_query += " AND dc.channel_name = :channel"
+            base_query += SEARCH_CHANNEL_FILTER
             params["channel"] = channel
         
-        base_query += " ORDER BY fm.view_count DESC LIMIT :limit"
+        base_query += SEARCH_ORDER
         
         result = db.execute(text(base_query), params)
         
@@ -0,0 +1,38 @@
+# api/queries.py - SQL of the endpoints filtering on indexed warehouse keys
+# (tests/test_query_plans.py checks that their plans use the indexes)
+
+# Daily message counts of one channel. The date_key bound lets Postgres
+# skip the fct_messages partitions of older months.
+CHANNEL_ACTIVITY_QUERY = """
+SELECT 
+    TO_CHAR(dd.full_date, 'YYYY-MM-DD') as date,
+    COUNT(fm.message_id) as message_count,
+    COALESCE(AVG(fm.view_count), 0) as avg_views
+FROM public_marts.dim_dates dd
+LEFT JOIN public_marts.fct_messages fm ON dd.date_key = fm.date_key
+LEFT JOIN public_marts.dim_channels dc ON fm.channel_key = dc.channel_key
+WHERE dc.channel_name = :channel_name
+  AND dd.full_date >= CURRENT_DATE - INTERVAL ':days days'
+  AND fm.date_key >= TO_CHAR(CURRENT_DATE - INTERVAL ':days days', 'YYYYMMDD')::integer
+GROUP BY dd.full_date
+ORDER BY dd.full_date DESC
+"""
+
+SEARCH_MESSAGES_QUERY = """
+SELECT 
+    fm.message_id,
+    dc.channel_name,
+    dd.full_date as message_date,
+    fm.message_text,
+    fm.view_count as views,
+    fm.forward_count as forwards,
+    fm.has_image
+FROM public_marts.fct_messages fm
+JOIN public_marts.dim_channels dc ON fm.channel_key = dc.channel_key
+JOIN public_marts.dim_dates dd ON fm.date_key = dd.date_key
+WHERE LOWER(fm.message_text) LIKE '%' || LOWER(:query) || '%'
+"""
+
+SEARCH_CHANNEL_FILTER = " AND dc.channel_name = :channel"
+
+SEARCH_ORDER = " ORDER BY fm.view_count DESC LIMIT :limit"
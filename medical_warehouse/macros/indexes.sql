@@ -0,0 +1,13 @@
+{#
+    CREATE INDEX on the model's table, for post-hooks:
+
+        post_hook=[after_commit("{{ create_index(['channel_key']) }}")]
+
+    Run after commit: during --full-refresh the previous table, renamed to a
+    backup until then, still holds indexes of the same names.
+#}
+{% macro create_index(columns, type='btree', unique=false) %}
+    {%- set name = this.identifier ~ '_' ~ columns | join('_') ~ ('_' ~ type if type != 'btree' else '') -%}
+    CREATE {% if unique %}UNIQUE {% endif %}INDEX IF NOT EXISTS {{ name }}
+    ON {{ this }} USING {{ type }} ({{ columns | join(', ') }})
+{% endmacro %}
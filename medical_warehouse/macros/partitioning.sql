@@ -0,0 +1,36 @@
+{#
+    Range-partition the model's table by month of a YYYYMMDD integer column,
+    for an after-commit post-hook placed before the index hooks.
+
+    A fresh build (first run or --full-refresh) is a plain table: its rows
+    move into a partitioned one, sorted so BRIN indexes on the column stay
+    selective. Incremental runs merge rows of months without a partition into
+    the default partition; they move into new monthly partitions.
+#}
+{% macro partition_by_month(column) %}
+    {%- set table = this.schema ~ '.' ~ this.identifier -%}
+DO $$
+DECLARE
+    month integer;
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = '{{ table }}'::regclass) = 'r' THEN
+        ALTER TABLE {{ table }} RENAME TO {{ this.identifier }}__pending;
+        CREATE TABLE {{ table }} (LIKE {{ table }}__pending) PARTITION BY RANGE ({{ column }});
+    ELSIF EXISTS (SELECT 1 FROM {{ table }}_default WHERE {{ column }} IS NOT NULL) THEN
+        ALTER TABLE {{ table }} DETACH PARTITION {{ table }}_default;
+        ALTER TABLE {{ table }}_default RENAME TO {{ this.identifier }}__pending;
+    ELSE
+        RETURN;
+    END IF;
+
+    FOR month IN SELECT DISTINCT {{ column }} / 100 FROM {{ table }}__pending WHERE {{ column }} IS NOT NULL LOOP
+        EXECUTE format('CREATE TABLE IF NOT EXISTS %I.%I PARTITION OF {{ table }} FOR VALUES FROM (%s) TO (%s)',
+                       '{{ this.schema }}', '{{ this.identifier }}_p' || month, month * 100,
+                       (CASE WHEN month % 100 = 12 THEN month + 89 ELSE month + 1 END) * 100);
+    END LOOP;
+    CREATE TABLE {{ table }}_default PARTITION OF {{ table }} DEFAULT;
+
+    INSERT INTO {{ table }} SELECT * FROM {{ table }}__pending ORDER BY {{ column }};
+    DROP TABLE {{ table }}__pending;
+END $$
+{% endmacro %}
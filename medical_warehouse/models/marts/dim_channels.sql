@@ -1,14 +1,51 @@
-{{ config(materialized='table', schema='marts') }}
+-- Incremental so channel_key never changes: fct_messages is merged
+-- incrementally and keeps the keys its rows were built with. Known channels
+-- keep their key, new ones are numbered after the largest; the counts are
+-- refreshed on every run.
+{{ config(
+    materialized='incremental',
+    unique_key='channel_name',
+    incremental_strategy='merge',
+    schema='marts',
+    post_hook=[
+        after_commit("{{ create_index(['channel_key'], unique=true) }}"),
+        after_commit("{{ create_index(['channel_name'], unique=true) }}")
+    ]
+) }}
 
+WITH channels AS (
+    SELECT
+        channel_name,
+        CASE 
+            WHEN channel_name = 'lobelia4cosmetics' THEN 'Cosmetics'
+            WHEN channel_name = 'tikvahpharma' THEN 'Pharmaceutical'
+            ELSE 'Medical'
+        END as channel_type,
+        COUNT(*) as total_posts,
+        AVG(views)::integer as avg_views
+    FROM {{ ref('stg_telegram_messages') }}
+    GROUP BY channel_name
+)
+
+{% if is_incremental() %}
+SELECT
+    COALESCE(
+        d.channel_key,
+        (SELECT COALESCE(MAX(channel_key), 0) FROM {{ this }})
+            + ROW_NUMBER() OVER (PARTITION BY d.channel_key IS NULL ORDER BY c.channel_name)
+    ) as channel_key,
+    c.channel_name,
+    c.channel_type,
+    c.total_posts,
+    c.avg_views
+FROM channels c
+LEFT JOIN {{ this }} d ON c.channel_name = d.channel_name
+{% else %}
 SELECT
     ROW_NUMBER() OVER (ORDER BY channel_name) as channel_key,
     channel_name,
-    CASE 
-        WHEN channel_name = 'lobelia4cosmetics' THEN 'Cosmetics'
-        WHEN channel_name = 'tikvahpharma' THEN 'Pharmaceutical'
-        ELSE 'Medical'
-    END as channel_type,
-    COUNT(*) as total_posts,
-    AVG(views)::integer as avg_views
-FROM {{ ref('stg_telegram_messages') }}
-GROUP BY channel_name
+    channel_type,
+    total_posts,
+    avg_views
+FROM channels
+{% endif %}
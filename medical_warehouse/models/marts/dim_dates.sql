@@ -1,4 +1,11 @@
-{{ config(materialized='table', schema='public_marts') }}
+{{ config(
+    materialized='table',
+    schema='marts',
+    post_hook=[
+        after_commit("{{ create_index(['date_key'], unique=true) }}"),
+        after_commit("{{ create_index(['full_date'], type='brin') }}")
+    ]
+) }}
 
 WITH date_series AS (
     SELECT 
@@ -1,24 +1,65 @@
 -- models/marts/fct_image_detections.sql
-{{ config(materialized='table', schema='public_marts') }}
+-- Incremental: only images with a raw row updated (loaded, re-detected or
+-- reclassified) since the newest updated_at already in the table are merged,
+-- on (message_id, channel_key). date_key is the date of the detected message,
+-- taken from fct_messages. Detections of channels missing from dim_channels
+-- are left out until a full refresh.
+{{ config(
+    materialized='incremental',
+    schema='marts',
+    unique_key=['message_id', 'channel_key'],
+    incremental_strategy='merge',
+    on_schema_change='fail',
+    post_hook=[
+        after_commit("{{ create_index(['message_id', 'channel_key'], unique=true) }}"),
+        after_commit("{{ create_index(['updated_at']) }}"),
+        after_commit("{{ create_index(['date_key'], type='brin') }}")
+    ]
+) }}
 
-WITH image_detections AS (
+{% if is_incremental() and execute %}
+    {# A literal cutoff (not a subquery) lets the planner use the updated_at index #}
+    {% set since = run_query("SELECT COALESCE(MAX(updated_at), '1900-01-01') FROM " ~ this).columns[0].values()[0] %}
+{% endif %}
+
+WITH latest_detections AS (
+    -- One row per image: the newest detection, whatever model version made it
+    -- (a reclassified older row must not replace a newer model's detection)
+    SELECT DISTINCT ON (message_id, channel_name)
+        *,
+        -- Last change to any row of the image, the next run's cutoff
+        MAX(updated_at) OVER (PARTITION BY message_id, channel_name) AS image_updated_at
+    FROM {{ source('raw', 'yolo_detections') }}
+    WHERE image_category IS NOT NULL
+    {% if is_incremental() %}
+      AND (message_id, channel_name) IN (
+          SELECT message_id, channel_name
+          FROM {{ source('raw', 'yolo_detections') }}
+          WHERE updated_at >= '{{ since }}'::timestamp
+      )
+    {% endif %}
+    ORDER BY message_id, channel_name, detected_at DESC
+),
+
+image_detections AS (
     SELECT
         y.message_id,
         c.channel_key,
-        d.date_key,
+        f.date_key,
         y.detected_class,
         y.confidence_score,
         y.image_category,
         y.detection_count,
-        y.detected_at
-    FROM raw.yolo_detections y
-    LEFT JOIN {{ ref('dim_channels') }} c 
+        y.detected_at,
+        y.duplicate_of,
+        y.image_updated_at AS updated_at
+    FROM latest_detections y
+    -- The merge key needs a channel_key: NULL keys never match and would duplicate every run
+    JOIN {{ ref('dim_channels') }} c 
         ON y.channel_name = c.channel_name
     LEFT JOIN {{ ref('fct_messages') }} f 
         ON y.message_id = f.message_id
-    LEFT JOIN {{ ref('dim_dates') }} d 
-        ON f.date_key = d.date_key
-    WHERE y.image_category IS NOT NULL
+        AND y.channel_name = f.channel_name
 )
 
-SELECT * FROM image_detections
\ No newline at end of file
+SELECT * FROM image_detections
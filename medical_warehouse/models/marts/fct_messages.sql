@@ -1,15 +1,41 @@
-{{ config(materialized='table', schema='marts') }}
+-- Incremental: only messages scraped within the lookback window of the newest
+-- row already in the table are merged on (message_id, channel_name), so rows
+-- re-scraped with new view/forward counts are updated without rebuilding all
+-- history. `dbt build --full-refresh` rebuilds the whole table.
+-- Range-partitioned by month of date_key; a message's date never changes, so
+-- date_key is part of the merge key (unique indexes must include it).
+{{ config(
+    materialized='incremental',
+    schema='marts',
+    unique_key=['message_id', 'channel_name', 'date_key'],
+    incremental_strategy='merge',
+    on_schema_change='fail',
+    post_hook=[
+        after_commit("{{ partition_by_month('date_key') }}"),
+        after_commit("{{ create_index(['message_id', 'channel_name', 'date_key'], unique=true) }}"),
+        after_commit("{{ create_index(['channel_key']) }}"),
+        after_commit("{{ create_index(['date_key'], type='brin') }}"),
+        after_commit("{{ create_index(['scraped_at']) }}")
+    ]
+) }}
 
 SELECT
     m.message_id,
     c.channel_key,
-    EXTRACT(YEAR FROM m.message_date)*10000 + 
-    EXTRACT(MONTH FROM m.message_date)*100 + 
-    EXTRACT(DAY FROM m.message_date) as date_key,
+    TO_CHAR(m.message_date, 'YYYYMMDD')::integer as date_key,
     m.message_text,
     m.message_length,
     m.views as view_count,
     m.forwards as forward_count,
-    m.has_image
+    m.has_image,
+    m.channel_name,
+    m.scraped_at
 FROM {{ ref('stg_telegram_messages') }} m
 LEFT JOIN {{ ref('dim_channels') }} c ON m.channel_name = c.channel_name
+{% if is_incremental() %}
+WHERE m.scraped_at >= (
+    SELECT COALESCE(MAX(scraped_at), '1900-01-01'::timestamp)
+        - INTERVAL '{{ var("fct_messages_lookback_days", 3) }} days'
+    FROM {{ this }}
+)
+{% endif %}
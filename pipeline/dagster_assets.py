@@ -0,0 +1,319 @@
+# pipeline/dagster_assets.py - Daily-partitioned assets over the raw lake partitions
+from dagster import (
+    asset, AssetKey, AssetSelection, BackfillPolicy, DailyPartitionsDefinition, Definitions, MaterializeResult,
+    DagsterInstance, RunRequest, build_schedule_from_partitioned_job, define_asset_job, materialize, schedule
+)
+from dagster_dbt import DagsterDbtTranslator, DbtCliResource, dbt_assets
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+import argparse
+import json
+import shutil
+import time
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from pipeline.dagster_pipeline import (
+    stage_metadata, logger, is_full_refresh, FULL_REFRESH_TAG, medical_telegram_pipeline
+)
+from pipeline.dbt_project import dbt_project, DBT_PROJECT_PATH, PREPARE_COMMAND
+from src.utils.raw_lake import RAW_MESSAGES_DIR, lake_files
+
+# One partition per data/raw/telegram_messages/YYYY-MM-DD directory, up to today's
+# (end_offset=1: the scraper writes the current day's partition)
+daily_partitions = DailyPartitionsDefinition(start_date='2026-01-01', end_offset=1)
+
+# Partitions processed at once by a backfill
+DEFAULT_BACKFILL_CONCURRENCY = 4
+
+
+def partition_dir(date):
+    return f'{RAW_MESSAGES_DIR}/{date}'
+
+
+def is_today(date):
+    return date == datetime.now().strftime('%Y-%m-%d')
+
+
+@asset(partitions_def=daily_partitions, group_name='telegram')
+def raw_telegram_files(context):
+    """Lake files of one day
+
+    Telegram only serves the newest messages, so only today's partition is
+    scraped; for earlier days the files already in the lake are reported.
+    """
+    date = context.partition_key
+    stats = {'date': date}
+
+    if is_today(date):
+        from src.scraper import TelegramScraper
+
+        started = time.perf_counter()
+        summary = TelegramScraper().run()
+        stats.update(messages=summary['messages'], images=summary['images'],
+                     scrape_seconds=time.perf_counter() - started)
+
+    files = lake_files(partition_dir(date))
+    if not files:
+        logger.warning(f"⚠️ No lake files for {date}")
+    stats.update(files=len(files), bytes=sum(os.path.getsize(path) for path in files))
+    return MaterializeResult(metadata=stage_metadata(stats))
+
+
+@asset(partitions_def=daily_partitions, group_name='telegram', deps=[raw_telegram_files])
+def raw_telegram_messages(context):
+    """One day's lake files loaded into raw.telegram_messages"""
+    from src.loader import get_connection, create_raw_table, load_partition
+    from src.utils.cursor_store import CursorStore
+
+    date = context.partition_key
+    stats = {'files': 0, 'rows': 0, 'changed': 0, 'bytes': 0, 'seconds': 0.0}
+
+    conn = get_connection()
+    try:
+        create_raw_table(conn)
+        if os.path.exists(partition_dir(date)):
+            # Backfilled days are older than the cursors: only today's run advances them
+            cursors = CursorStore() if is_today(date) else None
+            stats = load_partition(conn, partition_dir(date), cursors)
+    finally:
+        conn.close()
+
+    logger.info(f"✅ {date}: loaded {stats['rows']} rows from {stats['files']} files in {stats['seconds']:.2f}s")
+    return MaterializeResult(metadata=stage_metadata(dict(stats, date=date)))
+
+
+@asset(partitions_def=daily_partitions, group_name='telegram', deps=[raw_telegram_files])
+def yolo_detections(context):
+    """Detections for the images of one day's messages, in raw.yolo_detections"""
+    from src.yolo_detect import YOLODetector
+
+    date = context.partition_key
+    started = time.perf_counter()
+    detector = YOLODetector()
+    items = list(detector.partition_images(partition_dir(date))) if os.path.exists(partition_dir(date)) else []
+
+    results = detector.detect_items(items) if items else []
+    loaded = changed = 0
+    if results:
+        counts = detector.load_to_postgres(results)
+        if counts is None:
+            raise Exception(f"YOLO failed: could not load the detections of {date} to PostgreSQL")
+        loaded, changed = counts
+
+    stats = {
+        'date': date,
+        'images': len(results),
+        'duplicates': sum(1 for row in results if row.get('duplicate_of')),
+        'rows_loaded': loaded,
+        'rows_changed': changed,
+        'seconds': time.perf_counter() - started
+    }
+    logger.info(f"✅ {date}: {stats['images']} images detected in {stats['seconds']:.2f}s")
+    return MaterializeResult(metadata=stage_metadata(stats))
+
+
+# Artifacts of the last successful dbt build, to find what changed since
+DBT_STATE_DIR = 'data/state/dbt'
+
+# dbt sources and the assets that load them
+SOURCE_ASSETS = {'telegram_messages': 'raw_telegram_messages', 'yolo_detections': 'yolo_detections'}
+
+
+def run_dbt_command(args):
+    """Invoke dbt in this process on the warehouse project"""
+    from dbt.cli.main import dbtRunner
+
+    res = dbtRunner().invoke(args + ['--project-dir', DBT_PROJECT_PATH, '--profiles-dir', DBT_PROJECT_PATH])
+    if res.exception is not None or not res.success:
+        raise Exception(f"dbt {' '.join(args[:2])} failed: {res.exception}")
+    return res
+
+
+if not os.path.exists(dbt_project.manifest_path):
+    raise FileNotFoundError(f"No dbt manifest at {dbt_project.manifest_path}, build it first: {PREPARE_COMMAND}")
+
+
+class WarehouseTranslator(DagsterDbtTranslator):
+    """Map dbt sources onto the partitioned assets that load them"""
+
+    def get_asset_key(self, dbt_resource_props):
+        if dbt_resource_props['resource_type'] == 'source' and dbt_resource_props['name'] in SOURCE_ASSETS:
+            return AssetKey(SOURCE_ASSETS[dbt_resource_props['name']])
+        return super().get_asset_key(dbt_resource_props)
+
+    def get_group_name(self, dbt_resource_props):
+        return 'warehouse'
+
+
+def record_source_freshness(state_dir=DBT_STATE_DIR):
+    """`dbt source freshness` into state_dir/current: the newest loaded_at of each source"""
+    run_dbt_command(['source', 'freshness', '--target-path', os.path.join(os.path.abspath(state_dir), 'current')])
+
+
+def models_to_skip(state_dir=DBT_STATE_DIR):
+    """Models whose code and sources are unchanged since the last successful build
+
+    `dbt source freshness` records the newest loaded_at of each source; with
+    the previous build's artifacts as --state, `state:modified+` and
+    `source_status:fresher+` select what needs rebuilding and everything
+    else is skipped. Nothing is skipped without a previous state.
+    """
+    state = os.path.abspath(state_dir)
+    current = os.path.join(state, 'current')
+    record_source_freshness(state_dir)
+
+    if not all(os.path.exists(os.path.join(state, name)) for name in ('manifest.json', 'sources.json')):
+        return []
+
+    with open(os.path.join(current, 'manifest.json'), encoding='utf-8') as f:
+        nodes = json.load(f)['nodes'].values()
+    models = {node['name'] for node in nodes if node['resource_type'] == 'model'}
+
+    changed = run_dbt_command(['ls', '--resource-type', 'model', '--output', 'name', '--target-path', current,
+                               '--select', 'state:modified+ source_status:fresher+', '--state', state]).result
+    return sorted(models - set(changed))
+
+
+def save_dbt_state(state_dir=DBT_STATE_DIR):
+    """Keep this run's manifest and source freshness for the next comparison"""
+    state = os.path.abspath(state_dir)
+    for name in ('manifest.json', 'sources.json'):
+        shutil.copyfile(os.path.join(state, 'current', name), os.path.join(state, name))
+
+
+@dbt_assets(manifest=dbt_project.manifest_path, project=dbt_project, dagster_dbt_translator=WarehouseTranslator(),
+            partitions_def=daily_partitions, backfill_policy=BackfillPolicy.single_run(),
+            required_resource_keys={'dbt'})
+def warehouse_models(context):
+    """One asset per dbt model, with the model's tests as its asset checks
+
+    `dbt build` tests each model as soon as it is built (on the profile's
+    threads, alongside other models), and only models downstream of changed
+    code or fresher sources are rebuilt. The models read whole raw tables,
+    so a backfill builds them once for its date range. Incremental models
+    merge only recent rows; runs tagged FULL_REFRESH_TAG rebuild everything.
+    """
+    start, end = context.partition_key_range.start, context.partition_key_range.end
+    full_refresh = is_full_refresh(context)
+    skipped = [] if full_refresh else models_to_skip()
+    logger.info(f"🔄 Building the warehouse for {start} → {end}" + (" (full refresh)" if full_refresh else "")
+                + (f", {len(skipped)} unchanged models skipped: {', '.join(skipped)}" if skipped else ""))
+
+    args = ['build']
+    if full_refresh:
+        args.append('--full-refresh')
+        # The next selective build still compares against this run's freshness
+        record_source_freshness()
+    if skipped:
+        args += ['--exclude', ' '.join(skipped)]
+    yield from context.resources.dbt.cli(args, context=context).stream()
+
+    save_dbt_state()
+
+
+partition_assets = [raw_telegram_files, raw_telegram_messages, yolo_detections, warehouse_models]
+
+resources = {'dbt': DbtCliResource(project_dir=dbt_project)}
+
+# Partitioned like the selected assets
+daily_partition_job = define_asset_job('daily_partition_job', selection=AssetSelection.assets(*partition_assets))
+
+# Daily at 2 AM, for the current day's partition
+daily_partition_schedule = build_schedule_from_partitioned_job(daily_partition_job, hour_of_day=2)
+
+warehouse_refresh_job = define_asset_job('warehouse_refresh_job', selection=AssetSelection.assets(warehouse_models))
+
+
+@schedule(cron_schedule="0 3 * * 0", job=warehouse_refresh_job, execution_timezone="UTC")
+def weekly_full_refresh_schedule(context):
+    """Rebuild the incremental models from scratch every Sunday at 3 AM
+
+    Catches anything the nightly lookback window missed (late edits of old
+    messages, deleted rows).
+    """
+    date = context.scheduled_execution_time.strftime('%Y-%m-%d')
+    return RunRequest(partition_key=date, tags={FULL_REFRESH_TAG: 'true'})
+
+
+# The legacy op job stays available for manual runs, without its schedule: both
+# schedules firing at 2 AM would scrape, load and detect twice over the same cursors
+defs = Definitions(
+    assets=partition_assets,
+    resources=resources,
+    jobs=[medical_telegram_pipeline],
+    schedules=[daily_partition_schedule, weekly_full_refresh_schedule]
+)
+
+
+def get_instance():
+    """The DAGSTER_HOME instance when there is one, so backfill runs are recorded"""
+    return DagsterInstance.get() if os.getenv('DAGSTER_HOME') else DagsterInstance.ephemeral()
+
+
+def materialize_partition(date):
+    """Raw files, load and detection of one day, in a worker process"""
+    result = materialize(partition_assets, selection=[raw_telegram_files, raw_telegram_messages, yolo_detections],
+                         partition_key=date, instance=get_instance(), resources=resources)
+    return result.success
+
+
+def backfill(start, end, concurrency=DEFAULT_BACKFILL_CONCURRENCY):
+    """Materialize the days from start to end, `concurrency` partitions at a time
+
+    Each partition runs in its own process; the marts are built once at the
+    end for the whole range. Returns the dates that failed.
+    """
+    dates = [date for date in daily_partitions.get_partition_keys() if start <= date <= end]
+
+    print(f"\n📅 Backfilling {start} → {end}: {len(dates)} partitions, {concurrency} at a time")
+    started = time.perf_counter()
+    failed = []
+
+    with ProcessPoolExecutor(max_workers=concurrency) as executor:
+        futures = {executor.submit(materialize_partition, date): date for date in dates}
+        for future in as_completed(futures):
+            date = futures[future]
+            try:
+                ok = future.result()
+            except Exception as e:
+                print(f"  ❌ {date}: {e}")
+                ok = False
+            if not ok:
+                failed.append(date)
+            else:
+                print(f"  ✅ {date}")
+
+    print(f"  {len(dates) - len(failed)}/{len(dates)} partitions in {time.perf_counter() - started:.2f}s")
+
+    if dates and not failed:
+        result = materialize(partition_assets, selection=[warehouse_models], instance=get_instance(), resources=resources,
+                             tags={'dagster/asset_partition_range_start': dates[0],
+                                   'dagster/asset_partition_range_end': dates[-1]})
+        if not result.success:
+            failed.append('warehouse_models')
+
+    return sorted(failed)
+
+
+def parse_args(argv=None):
+    """Command line options"""
+    parser = argparse.ArgumentParser(description="Backfill daily partitions of the pipeline")
+    parser.add_argument('--start', required=True, help="First partition (YYYY-MM-DD)")
+    parser.add_argument('--end', default=datetime.now().strftime('%Y-%m-%d'), help="Last partition (default: today)")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_BACKFILL_CONCURRENCY,
+                        help="Partitions processed at once, each in its own process")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    failed = backfill(args.start, args.end, args.concurrency)
+    if failed:
+        print(f"❌ Failed: {', '.join(failed)}")
+        sys.exit(1)
+    print("✅ Backfill complete")
@@ -1,156 +1,244 @@
 # pipeline/dagster_pipeline.py - COMPLETE DAGSTER PIPELINE
 from dagster import job, op, get_dagster_logger, schedule
 from datetime import datetime
-import subprocess
+import argparse
+import time
 import os
 import sys
 
+# Stages run in this process, so the repo root must be importable
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+DBT_PROJECT_DIR = 'medical_warehouse'
+
+# The only model reading YOLO's output (raw.yolo_detections)
+IMAGE_MART = 'fct_image_detections'
+
+# Steps running at once (the widest point of the DAG is two branches)
+MAX_CONCURRENT_STEPS = 2
+
+# Run tag rebuilding the incremental models from scratch (`dbt build --full-refresh`)
+FULL_REFRESH_TAG = 'dbt/full_refresh'
+
 logger = get_dagster_logger()
 
+
+def stage_metadata(stats, **extra):
+    """Dagster metadata of a stage's metrics
+
+    Scalar entries of `stats` become metadata values; `extra` adds
+    structured ones (e.g. a dict of per-model timings).
+    """
+    metadata = {
+        key: round(value, 3) if isinstance(value, float) else value
+        for key, value in stats.items()
+        if isinstance(value, (int, float, str))
+    }
+    metadata.update(extra)
+    return metadata
+
+
+def add_stage_metadata(context, stats, **extra):
+    """Attach a stage's metrics to its output, so Dagster shows them per run"""
+    context.add_output_metadata(stage_metadata(stats, **extra))
+
+
 @op
-def scrape_telegram_data():
+def scrape_telegram_data(context):
     """Run Telegram scraper"""
     logger.info("🔄 Starting Telegram data scraping...")
-    
-    try:
-        result = subprocess.run(
-            [sys.executable, "src/scraper.py"],
-            capture_output=True,
-            text=True,
-            cwd=os.getcwd()
-        )
-        
-        if result.returncode == 0:
-            logger.info("✅ Telegram scraping completed successfully")
-            return {
-                "status": "success",
-                "message": "Scraped Telegram data",
-                "output": result.stdout[-500:]  # Last 500 chars
-            }
-        else:
-            logger.error(f"❌ Telegram scraping failed: {result.stderr}")
-            raise Exception(f"Scraping failed: {result.stderr}")
-            
-    except Exception as e:
-        logger.error(f"❌ Error in scraping: {e}")
-        raise
+
+    # Imported here: the scraper sets up its log file on import
+    from src.scraper import TelegramScraper
+
+    started = time.perf_counter()
+    summary = TelegramScraper().run()
+    seconds = time.perf_counter() - started
+
+    files = [path for totals in summary['channels'].values() for path in totals.get('files', [])]
+    result = {
+        "status": "success",
+        "date": summary['date'],
+        "messages": summary['messages'],
+        "images": summary['images'],
+        "channels": len(summary['channels']),
+        "files": len(files),
+        "bytes": sum(os.path.getsize(path) for path in files if os.path.exists(path)),
+        "seconds": seconds
+    }
+
+    logger.info(f"✅ Scraped {result['messages']} messages ({result['images']} images) in {seconds:.2f}s")
+    add_stage_metadata(context, result)
+    return result
 
 @op
 def load_raw_to_postgres(context, scrape_result):
     """Load raw data to PostgreSQL"""
     logger.info("🔄 Loading data to PostgreSQL...")
-    
+
+    from src.loader import get_connection, create_raw_table, load_partition
+    from src.utils.cursor_store import CursorStore
+    from src.utils.raw_lake import RAW_MESSAGES_DIR
+
+    data_dir = f"{RAW_MESSAGES_DIR}/{scrape_result['date']}"
+    stats = {'files': 0, 'rows': 0, 'changed': 0, 'bytes': 0, 'seconds': 0.0}
+
+    conn = get_connection()
     try:
-        result = subprocess.run(
-            [sys.executable, "src/loader.py"],
-            capture_output=True,
-            text=True,
-            cwd=os.getcwd()
-        )
-        
-        if result.returncode == 0:
-            logger.info("✅ Data loaded to PostgreSQL successfully")
-            return {
-                "status": "success",
-                "message": "Data loaded to PostgreSQL",
-                "scrape_result": scrape_result,
-                "output": result.stdout[-500:]
-            }
+        create_raw_table(conn)
+        if os.path.exists(data_dir):
+            stats = load_partition(conn, data_dir, CursorStore())
         else:
-            logger.error(f"❌ Data loading failed: {result.stderr}")
-            raise Exception(f"Loading failed: {result.stderr}")
-            
-    except Exception as e:
-        logger.error(f"❌ Error in loading: {e}")
-        raise
+            logger.warning(f"⚠️ No partition to load: {data_dir}")
+    finally:
+        conn.close()
+
+    seconds = stats['seconds']
+    result = dict(stats, status="success", date=scrape_result['date'],
+                  rows_per_sec=stats['rows'] / seconds if seconds else 0.0)
+
+    logger.info(f"✅ Loaded {stats['rows']} rows from {stats['files']} files in {seconds:.2f}s")
+    add_stage_metadata(context, result)
+    return {**result, "scrape_result": scrape_result}
+
+def is_full_refresh(context):
+    """Whether the run asks for incremental models to be rebuilt from scratch"""
+    return context.run.tags.get(FULL_REFRESH_TAG) == 'true'
+
+def invoke_dbt(selection, full_refresh=False):
+    """`dbt build` of a node selection, in this process
+
+    Each model's tests run as soon as the model is built, alongside the
+    other models (the profile's threads), instead of in one `dbt test` at
+    the end; models downstream of a failure are skipped. Incremental
+    models only merge new rows unless `full_refresh` is set.
+    Returns (stats, per-node seconds); raises if a model or test fails.
+    """
+    # dbt is only needed by the dbt ops, and is slow to import
+    from dbt.cli.main import dbtRunner
+
+    args = ['--project-dir', DBT_PROJECT_DIR, '--profiles-dir', DBT_PROJECT_DIR] + selection
+    if full_refresh:
+        args.append('--full-refresh')
+    started = time.perf_counter()
+
+    res = dbtRunner().invoke(['build'] + args)
+    if res.exception is not None:
+        raise Exception(f"dbt build failed: {res.exception}")
+
+    nodes = list(res.result or [])
+    failed = [node.node.name for node in nodes if str(node.status) in ('error', 'fail')]
+    stats = {
+        'run_nodes': sum(1 for node in nodes if node.node.resource_type == 'model'),
+        'test_nodes': sum(1 for node in nodes if node.node.resource_type == 'test'),
+        'failures': len(failed)
+    }
+    timings = {node.node.name: round(node.execution_time, 3) for node in nodes}
+
+    if not res.success:
+        logger.error(f"❌ dbt build failed: {', '.join(failed)}")
+        raise Exception(f"dbt build failed: {', '.join(failed)}")
+
+    stats['seconds'] = time.perf_counter() - started
+    return stats, timings
 
 @op
 def run_dbt_transformations(context, load_result):
-    """Run dbt transformations"""
+    """Run dbt transformations of the message models
+
+    Everything except the detection mart, which also needs YOLO's output
+    and is built by build_detection_mart.
+    """
     logger.info("🔄 Running dbt transformations...")
-    
-    try:
-        # Run dbt
-        dbt_run = subprocess.run(
-            ["dbt", "run"],
-            capture_output=True,
-            text=True,
-            cwd="medical_warehouse"
-        )
-        
-        # Run dbt tests
-        dbt_test = subprocess.run(
-            ["dbt", "test"],
-            capture_output=True,
-            text=True,
-            cwd="medical_warehouse"
-        )
-        
-        if dbt_run.returncode == 0 and dbt_test.returncode == 0:
-            logger.info("✅ dbt transformations completed successfully")
-            return {
-                "status": "success",
-                "message": "dbt transformations complete",
-                "load_result": load_result,
-                "dbt_output": dbt_run.stdout[-500:] + "\n" + dbt_test.stdout[-500:]
-            }
-        else:
-            error_msg = f"dbt run: {dbt_run.stderr}\ndbt test: {dbt_test.stderr}"
-            logger.error(f"❌ dbt transformations failed: {error_msg}")
-            raise Exception(f"dbt failed: {error_msg}")
-            
-    except Exception as e:
-        logger.error(f"❌ Error in dbt: {e}")
-        raise
+
+    stats, timings = invoke_dbt(['--exclude', IMAGE_MART], is_full_refresh(context))
+    result = dict(stats, status="success")
+
+    logger.info(f"✅ dbt: {stats['run_nodes']} models built, {stats['test_nodes']} tests passed "
+                f"in {stats['seconds']:.2f}s")
+    add_stage_metadata(context, result, node_seconds=timings)
+    return {**result, "load_result": load_result}
 
 @op
-def run_yolo_enrichment(context, dbt_result):
-    """Run YOLO object detection"""
+def run_yolo_enrichment(context, scrape_result):
+    """Run YOLO object detection
+
+    Only needs the scraped images, so it runs alongside loading and dbt.
+    """
     logger.info("🔄 Running YOLO object detection...")
-    
-    try:
-        result = subprocess.run(
-            [sys.executable, "src/yolo_detect.py"],
-            capture_output=True,
-            text=True,
-            cwd=os.getcwd()
-        )
-        
-        if result.returncode == 0:
-            logger.info("✅ YOLO enrichment completed successfully")
-            
-            # Create final summary
-            summary = {
-                "status": "success",
-                "message": "Pipeline execution complete",
-                "timestamp": datetime.now().isoformat(),
-                "stages": {
-                    "scraping": dbt_result["load_result"]["scrape_result"]["status"],
-                    "loading": dbt_result["load_result"]["status"],
-                    "dbt": dbt_result["status"],
-                    "yolo": "success"
-                },
-                "output": result.stdout[-500:]
-            }
-            
-            logger.info(f"📊 Pipeline Summary: {summary}")
-            return summary
-            
-        else:
-            logger.error(f"❌ YOLO enrichment failed: {result.stderr}")
-            raise Exception(f"YOLO failed: {result.stderr}")
-            
-    except Exception as e:
-        logger.error(f"❌ Error in YOLO: {e}")
-        raise
-
-@job
+
+    from src.yolo_detect import YOLODetector
+
+    started = time.perf_counter()
+    detector = YOLODetector()
+    results = detector.process_all_images()
+
+    loaded = changed = 0
+    if results:
+        counts = detector.load_to_postgres(results)
+        if counts is None:
+            raise Exception("YOLO failed: could not load detections to PostgreSQL")
+        loaded, changed = counts
+    detector.commit_progress()
+
+    categories = {}
+    for row in results:
+        categories[row['image_category']] = categories.get(row['image_category'], 0) + 1
+
+    result = {
+        "status": "success",
+        "images": len(results),
+        "duplicates": sum(1 for row in results if row.get('duplicate_of')),
+        "rows_loaded": loaded,
+        "rows_changed": changed,
+        "seconds": time.perf_counter() - started
+    }
+    logger.info(f"✅ YOLO enrichment: {result['images']} images in {result['seconds']:.2f}s")
+    add_stage_metadata(context, result, categories=categories)
+    return dict(result, categories=categories)
+
+@op
+def build_detection_mart(context, dbt_result, yolo_result):
+    """Build and test fct_image_detections once both branches are done"""
+    logger.info(f"🔄 Building {IMAGE_MART}...")
+
+    stats, timings = invoke_dbt(['--select', IMAGE_MART], is_full_refresh(context))
+    mart = dict(stats, status="success")
+    add_stage_metadata(context, mart, node_seconds=timings)
+
+    load_result = dbt_result["load_result"]
+    scrape_result = load_result["scrape_result"]
+
+    # Create final summary
+    summary = {
+        "status": "success",
+        "message": "Pipeline execution complete",
+        "timestamp": datetime.now().isoformat(),
+        "stages": {
+            "scraping": {key: scrape_result[key] for key in ('messages', 'images', 'bytes', 'seconds')},
+            "loading": {key: load_result[key] for key in ('files', 'rows', 'bytes', 'seconds')},
+            "dbt": {key: dbt_result[key] for key in ('run_nodes', 'test_nodes', 'seconds')},
+            "yolo": yolo_result,
+            "detection_mart": {key: mart[key] for key in ('run_nodes', 'test_nodes', 'seconds')}
+        }
+    }
+
+    logger.info(f"📊 Pipeline Summary: {summary}")
+    return summary
+
+@job(config={"execution": {"config": {"multiprocess": {"max_concurrent": MAX_CONCURRENT_STEPS}}}})
 def medical_telegram_pipeline():
     """Main pipeline for Medical Telegram Warehouse"""
     scrape_result = scrape_telegram_data()
+
+    # Two branches after scraping: messages (load -> dbt) and images (YOLO)
     load_result = load_raw_to_postgres(scrape_result)
     dbt_result = run_dbt_transformations(load_result)
-    run_yolo_enrichment(dbt_result)
+    yolo_result = run_yolo_enrichment(scrape_result)
+
+    build_detection_mart(dbt_result, yolo_result)
 
 @schedule(
     cron_schedule="0 2 * * *",  # Daily at 2 AM
@@ -162,14 +250,34 @@ def daily_pipeline_schedule(context):
     logger.info(f"📅 Scheduled pipeline execution: {context.scheduled_execution_time}")
     return {}
 
+def parse_args(argv=None):
+    """Command line options"""
+    parser = argparse.ArgumentParser(description="Run the medical Telegram pipeline once")
+    parser.add_argument('--in-process', action='store_true',
+                        help="Run the steps one after another in this process (default on single-core machines)")
+    parser.add_argument('--parallel', action='store_true',
+                        help="Run the YOLO and message branches at once in separate processes")
+    return parser.parse_args(argv)
+
 # For manual execution
 if __name__ == "__main__":
-    # Test pipeline locally
-    result = medical_telegram_pipeline.execute_in_process()
-    
+    from dagster import DagsterInstance, execute_job, reconstructable
+
+    args = parse_args()
+    # Step processes only pay off when the branches get their own cores
+    parallel = args.parallel or (not args.in_process and (os.cpu_count() or 1) > 1)
+
+    if parallel:
+        # The multiprocess executor needs a persistent instance (DAGSTER_HOME, or a temporary one)
+        instance = DagsterInstance.get() if os.getenv('DAGSTER_HOME') else DagsterInstance.local_temp()
+        with instance:
+            result = execute_job(reconstructable(medical_telegram_pipeline), instance=instance)
+    else:
+        result = medical_telegram_pipeline.execute_in_process()
+
     if result.success:
         print("✅ Pipeline execution successful!")
         print(f"Run ID: {result.run_id}")
     else:
         print("❌ Pipeline execution failed")
-        print(f"Error: {result.failure_data}")
\ No newline at end of file
+        print(f"Error: {result.failure_data}")
@@ -0,0 +1,22 @@
+# pipeline/dbt_project.py - The dbt warehouse project, apart from the asset definitions
+"""
+The dbt manifest the assets are defined from is built once, before Dagster
+loads pipeline/dagster_assets.py (importing it never runs dbt):
+
+    dagster-dbt project prepare-and-package --file pipeline/dbt_project.py
+"""
+from dagster_dbt import DbtProject
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from pipeline.dagster_pipeline import DBT_PROJECT_DIR
+
+DBT_PROJECT_PATH = os.path.join(ROOT, DBT_PROJECT_DIR)
+
+dbt_project = DbtProject(project_dir=DBT_PROJECT_PATH, profiles_dir=DBT_PROJECT_PATH)
+
+PREPARE_COMMAND = "dagster-dbt project prepare-and-package --file pipeline/dbt_project.py"
@@ -0,0 +1,99 @@
+"""
+Benchmark: the API's warehouse queries on the indexed, partitioned marts vs plain tables
+
+Runs the channel activity and message search queries of api/queries.py
+against public_marts, then against plain copies of the marts without
+indexes or partitions (what the models built before the create_index and
+partition_by_month hooks), and prints the median time of each.
+The copies go to a scratch schema that is dropped at the end.
+
+Usage:
+    cd medical_warehouse && dbt build --profiles-dir <profile of loader_benchmark>
+    python scripts/benchmark_api_queries.py --database loader_benchmark --runs 7
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.loader import get_connection
+from api.queries import CHANNEL_ACTIVITY_QUERY, SEARCH_MESSAGES_QUERY, SEARCH_CHANNEL_FILTER, SEARCH_ORDER
+
+MARTS = ['fct_messages', 'dim_channels', 'dim_dates']
+PLAIN_SCHEMA = 'benchmark_plain_marts'
+
+
+def queries(channel, term):
+    """(label, SQL, params) of the benchmarked endpoints"""
+    search = SEARCH_MESSAGES_QUERY + SEARCH_CHANNEL_FILTER + SEARCH_ORDER
+    return [
+        ('Channel activity, 7 days', CHANNEL_ACTIVITY_QUERY, {'channel_name': channel, 'days': 7}),
+        ('Channel activity, 30 days', CHANNEL_ACTIVITY_QUERY, {'channel_name': channel, 'days': 30}),
+        ('Message search with a channel filter', search, {'query': term, 'channel': channel, 'limit': 20}),
+    ]
+
+
+def median_ms(conn, sql, params, runs):
+    """Median milliseconds of a query, bound like the API binds it (SQLAlchemy text)"""
+    query = text(sql)
+    conn.execute(query, params).fetchall()  # warm the cache
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        conn.execute(query, params).fetchall()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API query benchmark")
+    parser.add_argument('--database', default='loader_benchmark')
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--channel', default=None, help="Channel to query (default: the busiest one)")
+    parser.add_argument('--query', default='amoxicillin', help="Search term")
+    args = parser.parse_args()
+
+    engine = create_engine('postgresql+psycopg2://', creator=lambda: get_connection(database=args.database))
+    conn = engine.connect()
+
+    channel = args.channel
+    if channel is None:
+        channel = conn.execute(text("""
+        SELECT dc.channel_name FROM public_marts.fct_messages fm
+        JOIN public_marts.dim_channels dc ON fm.channel_key = dc.channel_key
+        GROUP BY dc.channel_name ORDER BY COUNT(*) DESC LIMIT 1
+        """)).scalar()
+    messages = conn.execute(text("SELECT COUNT(*) FROM public_marts.fct_messages")).scalar()
+
+    print("=" * 60)
+    print(f"API QUERY BENCHMARK: {messages:,} messages, channel {channel}, median of {args.runs} runs")
+    print("=" * 60)
+
+    # The same rows as plain tables: no indexes, no partitions
+    conn.execute(text(f"DROP SCHEMA IF EXISTS {PLAIN_SCHEMA} CASCADE"))
+    conn.execute(text(f"CREATE SCHEMA {PLAIN_SCHEMA}"))
+    for table in MARTS:
+        conn.execute(text(f"CREATE TABLE {PLAIN_SCHEMA}.{table} AS SELECT * FROM public_marts.{table}"))
+        conn.execute(text(f"ANALYZE {PLAIN_SCHEMA}.{table}"))
+    conn.commit()
+
+    try:
+        print(f"{'query':<40}{'plain':>10}{'marts':>10}")
+        for label, sql, params in queries(channel, args.query):
+            plain = median_ms(conn, sql.replace('public_marts.', f'{PLAIN_SCHEMA}.'), params, args.runs)
+            marts = median_ms(conn, sql, params, args.runs)
+            print(f"{label:<40}{plain:>8.0f}ms{marts:>8.0f}ms")
+    finally:
+        conn.rollback()
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {PLAIN_SCHEMA} CASCADE"))
+        conn.commit()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Micro-benchmark: per-box Python post-processing vs vectorized BoxClassifier
+
+Builds synthetic detection results (0-10 boxes per image, COCO-sized class
+list) and categorizes them with:
+  - the original per-box loop (int(box.cls[0]) / float(box.conf[0]), a dict
+    per box, string-list membership) over ultralytics Boxes, when installed
+  - the same loop over plain Python lists (summarize_boxes)
+  - BoxClassifier.summarize over the whole batch at once
+
+Usage: python scripts/benchmark_box_classifier.py --images 100000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.utils.box_classifier import BoxClassifier, classify, summarize_boxes, PRODUCT_CLASSES
+
+# 80 classes like COCO, with the ones the rules look at
+NAMES = ['person'] + PRODUCT_CLASSES + [f'class_{i}' for i in range(80 - 1 - len(PRODUCT_CLASSES))]
+
+
+def fake_images(n, max_boxes=10):
+    for _ in range(n):
+        boxes = random.randint(0, max_boxes)
+        yield ([random.randrange(len(NAMES)) for _ in range(boxes)],
+               [round(random.uniform(0.25, 1.0), 4) for _ in range(boxes)])
+
+
+def per_box_loop(all_boxes, names):
+    """The original detect_image post-processing, one Boxes object per image"""
+    rows = []
+    for boxes in all_boxes:
+        detections = []
+        for box in boxes:
+            class_id = int(box.cls[0])
+            detections.append({
+                'class_id': class_id,
+                'class_name': names[class_id],
+                'confidence': float(box.conf[0])
+            })
+        category = classify([det['class_name'] for det in detections])
+        top = max(detections, key=lambda x: x['confidence']) if detections else None
+        rows.append((top['class_name'] if top else 'none', top['confidence'] if top else 0.0,
+                     category, len(detections)))
+    return rows
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Box classification micro-benchmark")
+    parser.add_argument('--images', type=int, default=100000)
+    parser.add_argument('--tensor-images', type=int, default=10000,
+                        help="Images for the (slow) loop over ultralytics Boxes")
+    args = parser.parse_args()
+
+    random.seed(42)
+    images = list(fake_images(args.images))
+    classifier = BoxClassifier(NAMES)
+
+    print("=" * 60)
+    print(f"BOX CLASSIFICATION MICRO-BENCHMARK: {args.images:,} images, "
+          f"{sum(len(ids) for ids, _ in images):,} boxes")
+    print("=" * 60)
+
+    def vectorized():
+        return classifier.summarize(
+            [class_id for ids, _ in images for class_id in ids],
+            [conf for _, confidences in images for conf in confidences],
+            [len(ids) for ids, _ in images]
+        )
+
+    def python_lists():
+        return [summarize_boxes([NAMES[i] for i in ids], confidences) for ids, confidences in images]
+
+    expected, python_s = timed(python_lists)
+    summary, vector_s = timed(vectorized)
+
+    mismatches = sum(1 for i, row in enumerate(expected) if tuple(column[i] for column in summary) != row)
+    print(f"{'per-box (lists)':<22}{args.images / python_s:>12,.0f} images/sec ({python_s:.2f}s)")
+    print(f"{'vectorized (NumPy)':<22}{args.images / vector_s:>12,.0f} images/sec ({vector_s:.2f}s)  "
+          f"{python_s / vector_s:.1f}x, {mismatches} mismatches")
+
+    try:
+        import torch
+        from ultralytics.engine.results import Boxes
+    except ImportError:
+        print("\n(ultralytics not installed: skipping the loop over Boxes tensors)")
+    else:
+        subset = images[:args.tensor_images]
+        all_boxes = []
+        for ids, confidences in subset:
+            data = torch.zeros((len(ids), 6))
+            data[:, 4] = torch.tensor(confidences)
+            data[:, 5] = torch.tensor(ids, dtype=torch.float32)
+            all_boxes.append(Boxes(data, orig_shape=(300, 400)))
+
+        _, tensor_s = timed(lambda: per_box_loop(all_boxes, NAMES))
+
+        def tensors_vectorized():
+            arrays = [boxes.cpu().numpy() for boxes in all_boxes]
+            return classifier.summarize(np.concatenate([b.cls for b in arrays]).astype(int),
+                                        np.concatenate([b.conf for b in arrays]),
+                                        [len(b) for b in arrays])
+
+        _, tensor_vector_s = timed(tensors_vectorized)
+        print(f"\nOn ultralytics Boxes ({len(subset):,} images):")
+        print(f"{'per-box (tensors)':<22}{len(subset) / tensor_s:>12,.0f} images/sec ({tensor_s:.2f}s)")
+        print(f"{'vectorized (NumPy)':<22}{len(subset) / tensor_vector_s:>12,.0f} images/sec "
+              f"({tensor_vector_s:.2f}s)  {tensor_s / tensor_vector_s:.1f}x")
+
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
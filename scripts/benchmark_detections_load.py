@@ -0,0 +1,137 @@
+"""
+Benchmark: loading YOLO detections into raw.yolo_detections
+
+Compares the original path (write CSV, read it back, one INSERT per row via
+DataFrame.iterrows) with batched execute_values upserts and COPY + one
+set-based upsert, on synthetic detections, then times re-classifying the
+stored boxes. The table is truncated before each run, so point this at a
+throwaway database, never the real warehouse.
+
+Usage:
+    createdb -h localhost -p 5433 -U postgres loader_benchmark
+    python scripts/benchmark_detections_load.py --database loader_benchmark --detections 100000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.loader import get_connection
+from src.yolo_detect import create_detections_table, copy_detections, upsert_detections, reclassify_detections
+from src.utils.box_classifier import summarize_boxes
+
+CLASSES = ['person', 'bottle', 'cup', 'cell phone', 'chair', 'book']
+CATEGORIES = ['promotional', 'product_display', 'lifestyle', 'other']
+
+
+def fake_detections(n, channels=10):
+    now = datetime.now().isoformat()
+    for i in range(n):
+        channel = f'bench_channel_{i % channels:03d}'
+        message_id = i // channels + 1
+        boxes = random.randint(0, 5)
+        box_classes = [random.choice(CLASSES) for _ in range(boxes)]
+        box_confidences = [round(random.uniform(0.25, 1.0), 4) for _ in range(boxes)]
+        detected_class, confidence, category, count = summarize_boxes(box_classes, box_confidences)
+        yield {
+            'message_id': message_id,
+            'channel_name': channel,
+            'image_path': f'data/raw/images/{channel}/{message_id}.jpg',
+            'detected_class': detected_class,
+            'confidence_score': confidence,
+            'image_category': category,
+            'detection_count': count,
+            'detected_at': now,
+            'model_version': 'yolov8n.pt:benchmark',
+            'box_classes': box_classes,
+            'box_confidences': box_confidences,
+            'box_xyxy': [round(random.uniform(0, 400), 1) for _ in range(4 * boxes)]
+        }
+
+
+def legacy_load(cur, results, directory):
+    """The original load_to_postgres: CSV round trip + iterrows + one INSERT per row"""
+    path = os.path.join(directory, 'yolo_detections.csv')
+    pd.DataFrame(results).to_csv(path, index=False)
+    df = pd.read_csv(path)
+    for _, row in df.iterrows():
+        cur.execute("""
+        INSERT INTO raw.yolo_detections
+        (message_id, channel_name, image_path, detected_class,
+         confidence_score, image_category, detection_count, detected_at, model_version)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT DO NOTHING
+        """, (
+            int(row['message_id']), row['channel_name'], row['image_path'], row['detected_class'],
+            float(row['confidence_score']), row['image_category'], int(row['detection_count']),
+            row['detected_at'], row['model_version']
+        ))
+    return len(df), len(df)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="YOLO detections load benchmark")
+    parser.add_argument('--database', required=True, help="Scratch database (its raw.yolo_detections is truncated)")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', default='5433')
+    parser.add_argument('--detections', type=int, default=100000)
+    args = parser.parse_args()
+
+    if args.database == 'medical_warehouse':
+        sys.exit("Refusing to truncate the real warehouse, use a scratch database")
+
+    random.seed(42)
+    results = list(fake_detections(args.detections))
+    directory = tempfile.mkdtemp(prefix='detections_bench_')
+
+    conn = get_connection(database=args.database, host=args.host, port=args.port)
+    create_detections_table(conn)
+    cur = conn.cursor()
+
+    print("=" * 60)
+    print(f"DETECTIONS LOAD BENCHMARK ({args.database}): {args.detections:,} detections")
+    print("=" * 60)
+
+    rates = {}
+    for label, load in [
+        ('csv + iterrows', lambda: legacy_load(cur, results, directory)),
+        ('execute_values', lambda: upsert_detections(cur, results)),
+        ('copy', lambda: copy_detections(cur, results)),
+    ]:
+        cur.execute("TRUNCATE raw.yolo_detections")
+        conn.commit()
+
+        started = time.perf_counter()
+        total, _ = load()
+        conn.commit()
+        elapsed = time.perf_counter() - started
+
+        rates[label] = total / elapsed
+        print(f"{label:>15}: {total:,} rows in {elapsed:.2f}s -> {total / elapsed:,.0f} rows/sec")
+
+    # A second load of the same detections must not add rows
+    copy_detections(cur, results)
+    conn.commit()
+    cur.execute("SELECT COUNT(*) FROM raw.yolo_detections")
+    print(f"\nRows after reloading: {cur.fetchone()[0]:,} (idempotent)")
+
+    for label in ['execute_values', 'copy']:
+        print(f"{label} speedup: {rates[label] / rates['csv + iterrows']:.1f}x rows/sec")
+
+    started = time.perf_counter()
+    checked, updated = reclassify_detections(conn, min_confidence=0.5)
+    print(f"\nReclassify (min confidence 0.5): {checked:,} images in {time.perf_counter() - started:.2f}s, "
+          f"{updated:,} rows changed")
+    print("=" * 60)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
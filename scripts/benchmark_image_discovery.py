@@ -0,0 +1,94 @@
+"""
+Benchmark: finding new images by listing directories vs reading the manifest
+
+Creates --images small files spread over --channels channels (discovery never
+decodes them), records them in the image manifest and marks them as detected
+(yolo cursors + manifest offset). Then --new images are added and both
+discovery paths of YOLODetector.pending_images are timed:
+  - listing data/raw/images/<channel>/*.jpg and parsing every filename
+  - reading the manifest lines appended since the last run
+
+Usage: python scripts/benchmark_image_discovery.py --images 200000 --new 100
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+from src.utils.image_manifest import ImageManifest
+from src.utils.cursor_store import SCRAPER, YOLO as YOLO_STAGE
+
+
+def add_images(manifest, channels, start, count, record=True):
+    newest = {}
+    for i in range(start, start + count):
+        channel = f'bench_channel_{i % channels:02d}'
+        message_id = i // channels + 1
+        path = f'data/raw/images/{channel}/{message_id}.jpg'
+        with open(path, 'wb') as f:
+            f.write(i.to_bytes(8, 'big'))
+        if record:
+            manifest.append(path, message_id, channel)
+        newest[channel] = max(newest.get(channel, 0), message_id)
+    return newest
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Image discovery benchmark")
+    parser.add_argument('--images', type=int, default=200000)
+    parser.add_argument('--new', type=int, default=100)
+    parser.add_argument('--channels', type=int, default=20)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix='discovery_bench_'))
+    logging.disable(logging.INFO)
+    for c in range(args.channels):
+        os.makedirs(f'data/raw/images/bench_channel_{c:02d}', exist_ok=True)
+
+    from src.yolo_detect import YOLODetector
+
+    manifest = ImageManifest()
+    add_images(manifest, args.channels, 0, args.images, record=False)
+    manifest.rebuild()
+    detector = YOLODetector(cursor_file='state/cursors.json')
+
+    # Everything so far was detected by an earlier run
+    list(detector.pending_images())
+    detector.commit_manifest()
+    newest = {}
+    for _, message_id, channel in detector.pending_images(full_refresh=True):
+        newest[channel] = max(newest.get(channel, 0), message_id)
+    for channel, message_id in newest.items():
+        detector.cursors.update(channel, message_id, stage=YOLO_STAGE)
+
+    for channel, message_id in add_images(manifest, args.channels, args.images, args.new).items():
+        detector.cursors.update(channel, message_id, stage=SCRAPER)
+    detector.cursors.save()
+
+    print("=" * 60)
+    print(f"IMAGE DISCOVERY BENCHMARK: {args.images:,} images on disk, {args.new} new")
+    print("=" * 60)
+
+    listed, scan_s = timed(lambda: list(YOLODetector(cursor_file='state/cursors.json', manifest_file=None)
+                                        .pending_images(newest={})))
+    found, manifest_s = timed(lambda: list(detector.pending_images(newest={})))
+
+    print(f"{'directory listing':<20}{scan_s * 1000:>10.1f} ms  ({len(listed)} new images)")
+    print(f"{'manifest tail':<20}{manifest_s * 1000:>10.1f} ms  ({len(found)} new images)")
+    print(f"\nSpeedup: {scan_s / manifest_s:.0f}x, same images: {sorted(listed) == sorted(found)}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
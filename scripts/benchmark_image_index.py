@@ -0,0 +1,88 @@
+"""
+Benchmark: near-duplicate lookups in the perceptual-hash index
+
+Builds an ImageHashIndex of synthetic 64-bit dHashes, then times Hamming
+lookups with multi-index hashing against a brute-force NumPy scan of every
+hash, and checks both return the same images. Also times re-opening the
+saved index, which is what every detection run pays.
+
+Usage: python scripts/benchmark_image_index.py --hashes 1000000 --queries 2000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.utils.image_hash import ImageHashIndex, DEFAULT_RADIUS, popcount
+
+
+def near(value, bits):
+    """Flip `bits` random bits of a hash"""
+    for bit in random.sample(range(64), bits):
+        value ^= 1 << bit
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perceptual-hash index benchmark")
+    parser.add_argument('--hashes', type=int, default=1000000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--radius', type=int, default=DEFAULT_RADIUS)
+    parser.add_argument('--chunks', type=int, default=4)
+    args = parser.parse_args()
+
+    random.seed(42)
+    values = [random.getrandbits(64) for _ in range(args.hashes)]
+    # Half the queries are near-duplicates of indexed images, half are new
+    queries = [near(random.choice(values), random.randint(0, args.radius)) if i % 2 else random.getrandbits(64)
+               for i in range(args.queries)]
+
+    path = os.path.join(tempfile.mkdtemp(prefix='image_index_bench_'), 'image_hashes.sqlite')
+
+    print("=" * 60)
+    print(f"IMAGE HASH INDEX BENCHMARK: {args.hashes:,} hashes, radius {args.radius}, {args.chunks} chunks")
+    print("=" * 60)
+
+    started = time.perf_counter()
+    with ImageHashIndex(path, args.radius, args.chunks) as index:
+        for i, value in enumerate(values):
+            index.add(f'data/raw/images/bench/{i}.jpg', value)
+    print(f"{'build + save':<18}{time.perf_counter() - started:>8.2f}s "
+          f"({args.hashes / (time.perf_counter() - started):,.0f} images/sec, duplicates checked on add)")
+
+    started = time.perf_counter()
+    index = ImageHashIndex(path, args.radius, args.chunks)
+    print(f"{'reopen':<18}{time.perf_counter() - started:>8.2f}s ({len(index):,} images)")
+
+    started = time.perf_counter()
+    indexed = [index.lookup(query) for query in queries]
+    mih_s = time.perf_counter() - started
+
+    hashes = np.array(values, dtype=np.uint64)
+
+    def brute_force(query):
+        distances = popcount(hashes ^ np.uint64(query))
+        return sorted((int(distances[i]), f'data/raw/images/bench/{i}.jpg')
+                      for i in np.flatnonzero(distances <= args.radius))
+
+    started = time.perf_counter()
+    scanned = [brute_force(query) for query in queries]
+    scan_s = time.perf_counter() - started
+
+    mismatches = sum(1 for a, b in zip(indexed, scanned) if sorted(a) != b)
+    found = sum(1 for matches in indexed if matches)
+    print(f"{'multi-index':<18}{args.queries / mih_s:>8,.0f} lookups/sec")
+    print(f"{'numpy scan':<18}{args.queries / scan_s:>8,.0f} lookups/sec")
+    print(f"\nSpeedup: {scan_s / mih_s:.1f}x, {found:,} queries matched, {mismatches} mismatches")
+    print("=" * 60)
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark: raw lake file formats
+
+Writes the same synthetic messages as pretty-printed JSON (the original
+layout), NDJSON, gzip NDJSON and Parquet, then compares file size, full
+load time and the time to read only two columns.
+
+Usage: python scripts/benchmark_lake_formats.py --messages 200000
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.utils.raw_lake import open_writer, lake_files, iter_partition
+
+PRODUCTS = [
+    "Paracetamol 500mg available now! Price: 50 ETB",
+    "Amoxicillin capsules 250mg - 120 ETB per pack",
+    "Vitamin C 1000mg tablets - Boost immunity",
+    "Blood pressure monitor digital - 1200 ETB",
+]
+CITIES = ["Addis Ababa", "Adama", "Bahir Dar", "Mekelle", "Hawassa"]
+
+
+def fake_messages(n, channel='chemed'):
+    now = datetime.now()
+    for i in range(1, n + 1):
+        city = random.choice(CITIES)
+        has_media = random.random() < 0.4
+        yield {
+            'message_id': i,
+            'channel_name': channel,
+            'message_date': (now - timedelta(days=random.randint(0, 30))).isoformat(),
+            'message_text': f"🚚 Available in {city}: {random.choice(PRODUCTS)}\n📍 Location: {city}",
+            'has_media': has_media,
+            'image_path': f'data/raw/images/{channel}/{i}.jpg' if has_media else None,
+            'views': random.randint(50, 500),
+            'forwards': random.randint(0, 50),
+            'scraped_at': now.isoformat()
+        }
+
+
+def directory_size(directory):
+    return sum(os.path.getsize(path) for path in lake_files(directory))
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Raw lake format benchmark")
+    parser.add_argument('--messages', type=int, default=200000)
+    args = parser.parse_args()
+
+    random.seed(42)
+    messages = list(fake_messages(args.messages))
+    root = tempfile.mkdtemp(prefix='lake_bench_')
+
+    print("=" * 60)
+    print(f"RAW LAKE FORMAT BENCHMARK: {args.messages} messages")
+    print("=" * 60)
+    print(f"{'format':<16}{'size (MB)':>12}{'write (s)':>12}{'load (s)':>12}{'2 cols (s)':>12}")
+
+    columns = ['message_id', 'views']
+
+    # Original layout: one pretty-printed JSON list per channel
+    legacy_dir = os.path.join(root, 'json')
+    os.makedirs(legacy_dir)
+    legacy_path = os.path.join(legacy_dir, 'chemed.json')
+
+    def write_legacy():
+        with open(legacy_path, 'w', encoding='utf-8') as f:
+            json.dump(messages, f, indent=2, ensure_ascii=False)
+
+    _, write_s = timed(write_legacy)
+    _, load_s = timed(lambda: sum(1 for _ in iter_partition(legacy_dir)))
+    _, cols_s = timed(lambda: sum(m['views'] for m in iter_partition(legacy_dir)))
+    baseline = os.path.getsize(legacy_path)
+    print(f"{'json (indent=2)':<16}{baseline / 1e6:>12.2f}{write_s:>12.2f}{load_s:>12.2f}{cols_s:>12.2f}")
+
+    for label, fmt, compression in [
+        ('ndjson', 'ndjson', None),
+        ('ndjson.gz', 'ndjson', 'gzip'),
+        ('parquet', 'parquet', 'snappy'),
+        ('parquet zstd', 'parquet', 'zstd'),
+    ]:
+        directory = os.path.join(root, label.replace(' ', '_'))
+
+        def write():
+            with open_writer(directory, 'chemed', fmt=fmt, compression=compression) as writer:
+                writer.write_all(messages)
+
+        _, write_s = timed(write)
+        _, load_s = timed(lambda: sum(1 for _ in iter_partition(directory)))
+        _, cols_s = timed(lambda: sum(m['views'] for m in iter_partition(directory, columns=columns)))
+        size = directory_size(directory)
+        print(f"{label:<16}{size / 1e6:>12.2f}{write_s:>12.2f}{load_s:>12.2f}{cols_s:>12.2f}"
+              f"   ({baseline / size:.1f}x smaller)")
+
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark: COPY bulk load vs batched upsert vs row-by-row INSERT into raw.telegram_messages
+
+Generates a synthetic NDJSON partition, then loads it into a scratch
+database with both loader methods. The table is truncated before each run,
+so point this at a throwaway database, never the real warehouse.
+
+Usage:
+    createdb -h localhost -p 5433 -U postgres loader_benchmark
+    python scripts/benchmark_loader.py --database loader_benchmark --messages 1000000
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.loader import get_connection, create_raw_table, load_directory
+from src.utils.raw_lake import open_writer
+from scripts.benchmark_lake_formats import fake_messages
+
+
+def write_partition(directory, messages, channels):
+    per_channel = messages // channels
+    for n in range(channels):
+        channel = f'bench_channel_{n:03d}'
+        with open_writer(directory, channel) as writer:
+            writer.write_all(fake_messages(per_channel, channel))
+    return per_channel * channels
+
+
+def run(conn, directory, method):
+    cur = conn.cursor()
+    cur.execute("TRUNCATE raw.telegram_messages, raw.load_manifest")
+    conn.commit()
+
+    started = time.perf_counter()
+    rows = load_directory(conn, directory, method=method)
+    return rows, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Loader benchmark")
+    parser.add_argument('--database', required=True, help="Scratch database (its raw.telegram_messages is truncated)")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', default='5433')
+    parser.add_argument('--messages', type=int, default=1000000)
+    parser.add_argument('--insert-messages', type=int, default=50000,
+                        help="Rows for the (slow) row-by-row run")
+    parser.add_argument('--channels', type=int, default=10)
+    args = parser.parse_args()
+
+    if args.database == 'medical_warehouse':
+        sys.exit("Refusing to truncate the real warehouse, use a scratch database")
+
+    conn = get_connection(database=args.database, host=args.host, port=args.port)
+    create_raw_table(conn)
+
+    root = tempfile.mkdtemp(prefix='loader_bench_')
+    copy_dir = os.path.join(root, 'copy')
+    insert_dir = os.path.join(root, 'insert')
+    copy_total = write_partition(copy_dir, args.messages, args.channels)
+    insert_total = write_partition(insert_dir, args.insert_messages, args.channels)
+
+    print("=" * 60)
+    print(f"LOADER BENCHMARK ({args.database})")
+    print("=" * 60)
+
+    results = {}
+    for method, directory, total in [('insert', insert_dir, insert_total), ('upsert', copy_dir, copy_total),
+                                     ('copy', copy_dir, copy_total)]:
+        rows, elapsed = run(conn, directory, method)
+        results[method] = rows / elapsed
+        print(f"{method:>7}: {rows:,} rows in {elapsed:.2f}s -> {rows / elapsed:,.0f} rows/sec")
+
+    print(f"\nUpsert speedup: {results['upsert'] / results['insert']:.1f}x rows/sec")
+    print(f"COPY speedup: {results['copy'] / results['insert']:.1f}x rows/sec")
+    print("=" * 60)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
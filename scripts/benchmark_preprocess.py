@@ -0,0 +1,103 @@
+"""
+Benchmark: decoding full-size downloads vs pre-resized inference copies
+
+Creates phone-camera-sized JPEGs in a temp dir, preprocesses them into the
+content-addressed resize cache (draft-mode decode, process pool), then
+compares:
+  - decoding the original JPEG vs the 640px copy (what the prefetch threads do)
+  - YOLO inference over originals vs copies, when --weights is given
+
+Usage: python scripts/benchmark_preprocess.py --images 200 --workers 1 4 --weights yolov8n.pt
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+from src.utils.image_resize import ResizedImageCache
+
+
+def make_images(directory, count, size):
+    """Noisy gradients, so JPEG sizes look like real photos"""
+    rng = np.random.default_rng(42)
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(1, count + 1):
+        gradient = np.linspace(0, 200, size[0])[None, :, None] * rng.uniform(0.5, 1.0, 3)
+        pixels = gradient + rng.normal(0, 20, (size[1], size[0], 3))
+        path = os.path.join(directory, f'{i}.jpg')
+        Image.fromarray(pixels.clip(0, 255).astype(np.uint8)).save(path, quality=90)
+        paths.append(path)
+    return paths
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Image preprocessing benchmark")
+    parser.add_argument('--images', type=int, default=200)
+    parser.add_argument('--size', type=int, nargs=2, default=[2048, 1536], metavar=('WIDTH', 'HEIGHT'))
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1])
+    parser.add_argument('--weights', default=None, help="Also time YOLO on originals vs copies")
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix='preprocess_bench_'))
+    logging.disable(logging.INFO)
+    paths = make_images('data/raw/images/bench', args.images, tuple(args.size))
+    megabytes = sum(os.path.getsize(path) for path in paths) / 1024 ** 2
+
+    print("=" * 60)
+    print(f"PREPROCESS BENCHMARK: {args.images} images of {args.size[0]}x{args.size[1]} ({megabytes:.0f} MB)")
+    print("=" * 60)
+
+    for workers in args.workers:
+        resized = ResizedImageCache(f'cache_{workers}')
+        (_, written, _), elapsed = timed(lambda: resized.preprocess_all(paths, workers))
+        print(f"preprocess, {workers} workers: {args.images / elapsed:7.1f} images/sec ({written} copies)")
+
+    _, rerun = timed(lambda: resized.preprocess_all(paths, 1))
+    print(f"re-run (all cached):    {args.images / rerun:7.1f} images/sec")
+
+    def decode(use_copies):
+        pixels = 0
+        for path in paths:
+            source = resized.inference_copy(path) if use_copies else path
+            with Image.open(source) as img:
+                pixels += img.convert('RGB').width * img.height
+        return pixels
+
+    full_pixels, full_s = timed(lambda: decode(False))
+    copy_pixels, copy_s = timed(lambda: decode(True))
+    print(f"\ndecode originals:       {args.images / full_s:7.1f} images/sec, "
+          f"{full_pixels * 3 / args.images / 1024 ** 2:.1f} MB per decoded image")
+    print(f"decode 640px copies:    {args.images / copy_s:7.1f} images/sec, "
+          f"{copy_pixels * 3 / args.images / 1024 ** 2:.1f} MB per decoded image  ({full_s / copy_s:.1f}x)")
+
+    if args.weights:
+        from src.yolo_detect import YOLODetector
+
+        items = [(path, i, 'bench') for i, path in enumerate(paths, 1)]
+        for label, resized_dir in [('originals', None), ('640px copies', resized.root)]:
+            detector = YOLODetector(cursor_file='state/cursors.json', device='cpu', weights=args.weights,
+                                    cache_file=None, index_file=None, resized_dir=resized_dir)
+            list(detector.infer(items[:4]))
+            _, elapsed = timed(lambda: list(detector.infer(items)))
+            print(f"YOLO on {label + ':':<15}{args.images / elapsed:7.1f} images/sec")
+
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark: startup cost of the YOLO stage
+
+Each measurement runs in a fresh interpreter (median of --repeats runs):
+  - import src.yolo_detect
+  - import + construct YOLODetector
+  - a full run with no new images (empty image directory)
+  - loading the model (what a run with new images pays on top)
+and reports which heavy packages each step imported. With --output the
+timings are appended as one JSON line (with the git commit), so startup
+regressions can be tracked over time.
+
+Usage: python scripts/benchmark_startup.py --repeats 5 --output data/benchmarks/startup.ndjson
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+HEAVY_MODULES = ['ultralytics', 'torch', 'pandas']
+
+SETUP = f"""
+import os, sys, time, json, logging
+sys.path.insert(0, {ROOT!r})
+logging.disable(logging.INFO)
+started = time.perf_counter()
+"""
+
+STEPS = {
+    'import': "import src.yolo_detect",
+    'construct': "from src.yolo_detect import YOLODetector\n"
+                 "detector = YOLODetector(cursor_file='state/cursors.json')",
+    'no new images': "from src.yolo_detect import YOLODetector\n"
+                     "os.makedirs('data/raw/images/empty_channel', exist_ok=True)\n"
+                     "YOLODetector(cursor_file='state/cursors.json').process_all_images()",
+    'load model': "from src.yolo_detect import YOLODetector\n"
+                  "YOLODetector(cursor_file='state/cursors.json', weights={weights!r}).model",
+}
+
+REPORT = f"""
+print(json.dumps({{'seconds': time.perf_counter() - started,
+                  'imported': [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def measure(code, directory):
+    output = subprocess.run([sys.executable, '-c', SETUP + code + REPORT], cwd=directory,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="YOLO stage startup benchmark")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--weights', default=os.path.join(ROOT, 'yolov8n.pt'),
+                        help="Weights for the 'load model' step (e.g. yolov8n.yaml offline)")
+    parser.add_argument('--output', default=None, help="Append the timings to this NDJSON file")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='startup_bench_')
+    timings = {}
+
+    print("=" * 60)
+    print(f"YOLO STAGE STARTUP (median of {args.repeats} fresh interpreters)")
+    print("=" * 60)
+
+    for step, code in STEPS.items():
+        runs = [measure(code.format(weights=args.weights), directory) for _ in range(args.repeats)]
+        timings[step] = statistics.median(run['seconds'] for run in runs)
+        imported = ', '.join(runs[-1]['imported']) or '-'
+        print(f"{step:<15}{timings[step]:>8.2f}s   heavy imports: {imported}")
+    print("=" * 60)
+
+    if args.output:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip()
+        if os.path.dirname(args.output):
+            os.makedirs(os.path.dirname(args.output), exist_ok=True)
+        with open(args.output, 'a') as f:
+            f.write(json.dumps({'measured_at': datetime.now().isoformat(), 'commit': commit,
+                                'seconds': timings}) + "\n")
+        print(f"📝 Appended to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Benchmark: PyTorch vs ONNX Runtime (FP32 / INT8) vs OpenVINO YOLO on CPU
+
+Runs YOLODetector with each backend over the scraper's sample images (in a
+temp dir) and reports per-image latency (batch size 1) and batched
+images/sec. Detections of every backend are compared with PyTorch's: the
+share of images given the same category, the same number of boxes, and the
+largest difference in top confidence. Exits non-zero when category
+agreement is below --tolerance.
+
+Without a weights file (e.g. no network to fetch yolov8n.pt) a randomly
+initialised yolov8n with COCO class names is saved and used; use a low
+--conf then, since an untrained model scores every box close to zero.
+
+Usage: python scripts/benchmark_yolo_backends.py --images 64 --backends torch onnx onnx-int8
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+
+def make_images(count, channel='bench_channel'):
+    from src.scraper import TelegramScraper
+
+    scraper = TelegramScraper(channels=[channel], cursor_file='state/cursors.json')
+    return [(scraper.create_sample_image(channel, i), i, channel) for i in range(1, count + 1)]
+
+
+def random_weights(path):
+    """Untrained yolov8n with the COCO class names, saved as a weights file"""
+    from ultralytics import YOLO
+    from ultralytics.utils import ROOT as ULTRALYTICS_ROOT, YAML
+
+    model = YOLO('yolov8n.yaml')
+    model.model.names = YAML.load(ULTRALYTICS_ROOT / 'cfg' / 'datasets' / 'coco.yaml')['names']
+    model.save(path)
+    return path
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="YOLO inference backend benchmark")
+    parser.add_argument('--images', type=int, default=64)
+    parser.add_argument('--backends', nargs='+', default=['torch', 'onnx', 'onnx-int8'])
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--weights', default=os.path.join(ROOT, 'yolov8n.pt'))
+    parser.add_argument('--conf', type=float, default=None, help="Confidence threshold override")
+    parser.add_argument('--tolerance', type=float, default=0.95,
+                        help="Minimum share of images whose category matches PyTorch")
+    args = parser.parse_args()
+
+    weights = os.path.abspath(args.weights)
+    os.chdir(tempfile.mkdtemp(prefix='yolo_backends_'))
+    logging.disable(logging.INFO)
+
+    if not os.path.exists(weights):
+        weights = random_weights(os.path.abspath('yolov8n-random.pt'))
+        print(f"(no {args.weights}: using randomly initialised weights)")
+
+    from src.yolo_detect import YOLODetector
+
+    items = make_images(args.images)
+    rows = {}
+
+    print("=" * 60)
+    print(f"YOLO BACKEND BENCHMARK (CPU): {args.images} sample images")
+    print("=" * 60)
+
+    for backend in ['torch'] + [b for b in args.backends if b != 'torch']:
+        detector = YOLODetector(cursor_file='state/cursors.json', device='cpu', weights=weights, backend=backend,
+                                cache_file=None, index_file=None, resized_dir=None, conf=args.conf)
+        try:
+            # Export (first time only) and load
+            _, setup_s = timed(lambda: detector.model)
+        except ImportError as e:
+            print(f"{backend:<10} skipped ({e})")
+            continue
+
+        detector.batch_size = 1
+        list(detector.detect_images(items[:2]))
+        latencies = []
+        for item in items:
+            _, elapsed = timed(lambda: list(detector.detect_images([item])))
+            latencies.append(elapsed * 1000)
+
+        detector.batch_size = args.batch_size
+        results, elapsed = timed(lambda: list(detector.detect_images(items)))
+        rows[backend] = results
+
+        print(f"{backend:<10} latency p50 {np.percentile(latencies, 50):6.1f} ms, "
+              f"p95 {np.percentile(latencies, 95):6.1f} ms | batch {args.batch_size}: "
+              f"{len(results) / elapsed:6.1f} images/sec | "
+              f"{np.mean([row['detection_count'] for row in results]):.1f} boxes/image | setup {setup_s:.1f}s")
+
+    print("\nAgreement with PyTorch:")
+    failed = False
+    reference = {row['image_path']: row for row in rows['torch']}
+    for backend, results in rows.items():
+        if backend == 'torch':
+            continue
+        same_category = same_count = 0
+        confidence_diff = 0.0
+        for row in results:
+            expected = reference[row['image_path']]
+            same_category += row['image_category'] == expected['image_category']
+            same_count += row['detection_count'] == expected['detection_count']
+            confidence_diff = max(confidence_diff, abs(row['confidence_score'] - expected['confidence_score']))
+
+        agreement = same_category / len(results)
+        failed |= agreement < args.tolerance
+        print(f"{backend:<10} category {agreement:.1%}, box count {same_count / len(results):.1%}, "
+              f"max top-confidence diff {confidence_diff:.4f}  {'OK' if agreement >= args.tolerance else 'FAIL'}")
+
+    print("=" * 60)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark: one-image-at-a-time vs batched vs sharded YOLO inference on CPU
+
+Creates synthetic product images with the scraper's create_sample_image in a
+temp dir, then runs YOLODetector.detect_images with batch_size=1 (the original
+path) and with batched inference plus prefetching, and finally shards the
+images over several worker processes. Prints images/sec for each run.
+
+Usage: python scripts/benchmark_yolo_batch.py --images 256 --batch-sizes 8 16 32 --workers 2 4
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+
+def make_images(count, channel='bench_channel'):
+    from src.scraper import TelegramScraper
+
+    scraper = TelegramScraper(channels=[channel], cursor_file='state/cursors.json')
+    return [(scraper.create_sample_image(channel, i), i, channel) for i in range(1, count + 1)]
+
+
+def run_once(detector, items, batch_size, workers=1):
+    detector.batch_size = batch_size
+    started = time.perf_counter()
+    if workers > 1:
+        results = list(detector.detect_sharded(items, workers))
+    else:
+        results = list(detector.detect_images(items))
+    return len(results), time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batched YOLO inference benchmark")
+    parser.add_argument('--images', type=int, default=256)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[8, 16, 32])
+    parser.add_argument('--prefetch-workers', type=int, default=4)
+    parser.add_argument('--workers', type=int, nargs='*', default=[],
+                        help="Worker process counts for the sharded runs (includes model loading)")
+    parser.add_argument('--weights', default=os.path.join(ROOT, 'yolov8n.pt'))
+    args = parser.parse_args()
+
+    # Keep the repo's data lake untouched
+    os.chdir(tempfile.mkdtemp(prefix='yolo_bench_'))
+    logging.disable(logging.INFO)
+
+    from src.yolo_detect import YOLODetector
+
+    items = make_images(args.images)
+    detector = YOLODetector(cursor_file='state/cursors.json', prefetch_workers=args.prefetch_workers,
+                            device='cpu', weights=args.weights)
+
+    # Warm up so model setup is not counted in the first run
+    run_once(detector, items[:4], 4)
+
+    print("=" * 60)
+    print(f"YOLO BATCH BENCHMARK (CPU): {args.images} images")
+    print("=" * 60)
+
+    count, baseline = run_once(detector, items, 1)
+    print(f"batch size  1 (serial): {count / baseline:6.1f} images/sec ({baseline:.2f}s)")
+
+    for batch_size in args.batch_sizes:
+        count, elapsed = run_once(detector, items, batch_size)
+        print(f"batch size {batch_size:>2} + prefetch: {count / elapsed:6.1f} images/sec "
+              f"({elapsed:.2f}s, {baseline / elapsed:.1f}x)")
+
+    batch_size = args.batch_sizes[-1] if args.batch_sizes else 16
+    for workers in args.workers:
+        count, elapsed = run_once(detector, items, batch_size, workers)
+        print(f"{workers} workers x {max(1, (os.cpu_count() or 1) // workers)} threads: "
+              f"{count / elapsed:6.1f} images/sec ({elapsed:.2f}s, {baseline / elapsed:.1f}x)")
+
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
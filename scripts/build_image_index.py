@@ -0,0 +1,47 @@
+"""
+Build the perceptual-hash index over every scraped image
+
+Hashes data/raw/images/<channel>/*.jpg on a process pool and records each
+near-duplicate's original in data/state/image_hashes.sqlite. Only images
+not indexed yet are hashed, so re-running after a scrape is cheap.
+Detection runs add new images themselves; this is for the initial backfill.
+
+Usage: python scripts/build_image_index.py --workers 4
+"""
+
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.utils.image_hash import ImageHashIndex, DEFAULT_INDEX_FILE, DEFAULT_RADIUS, index_images
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the near-duplicate image index")
+    parser.add_argument('--images-dir', default='data/raw/images')
+    parser.add_argument('--index-file', default=DEFAULT_INDEX_FILE)
+    parser.add_argument('--radius', type=int, default=DEFAULT_RADIUS,
+                        help="Max differing bits between near-duplicates")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    # Sorted, so the earliest message of each picture becomes its original
+    paths = sorted((str(path) for path in Path(args.images_dir).glob('*/*.jpg')),
+                   key=lambda path: (os.path.dirname(path), int(Path(path).stem) if Path(path).stem.isdigit() else 0))
+
+    started = time.perf_counter()
+    with ImageHashIndex(args.index_file, radius=args.radius) as index:
+        added, unreadable = index_images(index, paths, workers=args.workers)
+        duplicates = sum(1 for path in paths if index.duplicate_of(path))
+        elapsed = time.perf_counter() - started
+
+        print(f"✅ Indexed {added:,} new images in {elapsed:.2f}s "
+              f"({added / elapsed if elapsed else 0:,.0f} images/sec, {args.workers} workers)")
+        print(f"   {len(index):,} images in the index, {duplicates:,} near-duplicates, {unreadable} unreadable")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Compact Parquet partitions of the raw data lake
+
+Incremental scraper runs add one small Parquet part per channel and run.
+This merges the parts of each channel into one file per daily partition.
+
+Usage:
+    python scripts/compact_raw_lake.py --date 2026-01-15
+    python scripts/compact_raw_lake.py --all
+"""
+
+import os
+import sys
+import argparse
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.utils.raw_lake import RAW_MESSAGES_DIR, compact_partition
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge small Parquet files of the raw lake")
+    parser.add_argument('--date', default=datetime.now().strftime('%Y-%m-%d'),
+                        help="Partition to compact (YYYY-MM-DD, default: today)")
+    parser.add_argument('--all', action='store_true', help="Compact every partition")
+    parser.add_argument('--compression', default='zstd', help="Parquet codec of the compacted files")
+    args = parser.parse_args()
+
+    if args.all:
+        dates = sorted(os.listdir(RAW_MESSAGES_DIR)) if os.path.isdir(RAW_MESSAGES_DIR) else []
+    else:
+        dates = [args.date]
+
+    print("=" * 60)
+    print("COMPACTING RAW LAKE PARQUET PARTITIONS")
+    print("=" * 60)
+
+    total = 0
+    for date in dates:
+        directory = os.path.join(RAW_MESSAGES_DIR, date)
+        if not os.path.isdir(directory):
+            print(f"  {date}: partition not found")
+            continue
+
+        compacted = compact_partition(directory, compression=args.compression)
+        for channel, rows in compacted.items():
+            print(f"  {date}/{channel}: {rows} rows merged")
+            total += 1
+
+    print(f"\nOK Compacted {total} channel partitions")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,14 @@ Task 2: Load JSON data to SQLite database
 Simple version without special characters
 """
 
-import json
+import os
+import sys
 import sqlite3
 from pathlib import Path
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.utils.raw_lake import RAW_MESSAGES_DIR, parse_lake_filename, iter_records
+
 print("="*60)
 print("TASK 2: LOADING DATA TO DATABASE")
 print("="*60)
@@ -30,15 +34,13 @@ CREATE TABLE IF NOT EXISTS raw_messages (
 ''')
 print("OK Created table: raw_messages")
 
-# 3. Load JSON files
-json_files = list(Path('data/raw/telegram_messages').glob('**/*.json'))
+# 3. Load lake files (NDJSON parts and legacy JSON), one message at a time
+lake_files = sorted(p for p in Path(RAW_MESSAGES_DIR).glob('**/*') if parse_lake_filename(p.name))
 total = 0
 
-for file_path in json_files:
-    with open(file_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    for msg in data:
+for file_path in lake_files:
+    count = 0
+    for msg in iter_records(str(file_path)):
         cursor.execute('''
         INSERT INTO raw_messages VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         ''', (
@@ -51,9 +53,10 @@ for file_path in json_files:
             1 if msg.get('has_media', False) else 0,
             msg.get('image_path', '')
         ))
+        count += 1
     
-    total += len(data)
-    print(f"OK Loaded {len(data)} messages from {file_path.name}")
+    total += count
+    print(f"OK Loaded {count} messages from {file_path.name}")
 
 conn.commit()
 print(f"\nTotal messages loaded: {total}")
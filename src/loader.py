@@ -1,27 +1,65 @@
-
 import os
-import json
+import time
+import argparse
 import psycopg2
-from datetime import datetime
-
-print("="*60)
-print("📊 LOADING TO POSTGRESQL (PORT 5433)")
-print("="*60)
+from psycopg2.extras import execute_values
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
 
 try:
-    # Connect to PostgreSQL on PORT 5433
-    conn = psycopg2.connect(
+    from src.utils.cursor_store import CursorStore, DEFAULT_CURSOR_FILE, LOADER
+    from src.utils.raw_lake import RAW_MESSAGES_DIR, lake_files, iter_records, file_checksum
+    from src.utils.pg_copy import CopyStream
+except ImportError:
+    # Fallback for when running directly: python src/loader.py
+    from utils.cursor_store import CursorStore, DEFAULT_CURSOR_FILE, LOADER
+    from utils.raw_lake import RAW_MESSAGES_DIR, lake_files, iter_records, file_checksum
+    from utils.pg_copy import CopyStream
+
+# Bytes handed to COPY per read
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Rows per INSERT ... ON CONFLICT batch
+UPSERT_BATCH_SIZE = 1000
+
+# Columns written by the loaders, in COPY order
+MESSAGE_COLUMNS = [
+    'message_id', 'channel_name', 'message_date', 'message_text',
+    'has_media', 'image_path', 'views', 'forwards', 'scraped_at'
+]
+
+# Reloading a message only touches the row when its views/forwards changed
+UPSERT_CLAUSE = """
+ON CONFLICT (message_id, channel_name) DO UPDATE SET
+    views = EXCLUDED.views,
+    forwards = EXCLUDED.forwards,
+    scraped_at = EXCLUDED.scraped_at
+WHERE (raw.telegram_messages.views, raw.telegram_messages.forwards)
+    IS DISTINCT FROM (EXCLUDED.views, EXCLUDED.forwards)
+"""
+
+
+def connection_params(**overrides):
+    """Connection settings for PostgreSQL on PORT 5433"""
+    params = dict(
         host="localhost",
         database="medical_warehouse",
         user="postgres",
         password="postgres",
         port="5433"  # PORT 5433
     )
-    print("✅ Connected to PostgreSQL on port 5433")
-    
+    params.update(overrides)
+    return params
+
+
+def get_connection(**overrides):
+    """Connect to PostgreSQL on PORT 5433"""
+    return psycopg2.connect(**connection_params(**overrides))
+
+
+def create_raw_table(conn):
+    """Create raw schema and table"""
     cur = conn.cursor()
-    
-    # Create schema and table
     cur.execute("CREATE SCHEMA IF NOT EXISTS raw;")
     cur.execute("""
     CREATE TABLE IF NOT EXISTS raw.telegram_messages (
@@ -37,67 +75,472 @@ try:
         scraped_at TIMESTAMP
     );
     """)
+    ensure_unique_key(cur)
+
+    # Files already loaded, so unchanged partitions can be skipped
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS raw.load_manifest (
+        file_path TEXT PRIMARY KEY,
+        checksum VARCHAR(64) NOT NULL,
+        file_size BIGINT,
+        row_count INTEGER,
+        loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """)
     conn.commit()
-    print("✅ Created raw schema and table")
-    
-    # Load data
-    today = datetime.now().strftime('%Y-%m-%d')
-    data_dir = f'data/raw/telegram_messages/{today}'
+
+
+def ensure_unique_key(cur):
+    """Make (message_id, channel_name) unique so loads can upsert
+
+    Tables created by earlier loader versions have no such constraint and may
+    hold duplicates from reruns; those are removed first, keeping the last row
+    written (by ctid, as tables from scripts/load_to_postgres_real.py have no id).
+    """
+    cur.execute("""
+    SELECT 1 FROM pg_indexes
+    WHERE schemaname = 'raw' AND tablename = 'telegram_messages' AND indexname = 'idx_unique_message'
+    """)
+    if cur.fetchone():
+        return
+
+    cur.execute("""
+    DELETE FROM raw.telegram_messages a
+    USING raw.telegram_messages b
+    WHERE a.message_id = b.message_id
+      AND a.channel_name = b.channel_name
+      AND a.ctid < b.ctid
+    """)
+    if cur.rowcount:
+        print(f"🧹 Removed {cur.rowcount} duplicate rows")
+
+    cur.execute("CREATE UNIQUE INDEX idx_unique_message ON raw.telegram_messages (message_id, channel_name)")
+
+
+def insert_messages(cur, messages):
+    """Upsert messages row by row (last-resort fallback)
+
+    Returns (rows read, rows inserted or updated).
+    """
+    count = 0
+    changed = 0
+    for msg in messages:
+        cur.execute(f"""
+        INSERT INTO raw.telegram_messages
+        (message_id, channel_name, message_date, message_text,
+         has_media, image_path, views, forwards, scraped_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        {UPSERT_CLAUSE}
+        """, message_row(msg))
+        count += 1
+        changed += cur.rowcount
+    return count, changed
+
+
+def upsert_messages(cur, messages, batch_size=UPSERT_BATCH_SIZE):
+    """Idempotent batched INSERT ... ON CONFLICT DO UPDATE
+
+    Returns (rows read, rows inserted or updated).
+    """
+    sql = f"INSERT INTO raw.telegram_messages ({', '.join(MESSAGE_COLUMNS)}) VALUES %s {UPSERT_CLAUSE}"
     total = 0
-    
-    if os.path.exists(data_dir):
-        print(f"\n📁 Loading data from: {data_dir}")
-        
-        for filename in os.listdir(data_dir):
-            if filename.endswith('.json'):
-                filepath = os.path.join(data_dir, filename)
-                
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    messages = json.load(f)
-                
-                for msg in messages:
-                    cur.execute("""
-                    INSERT INTO raw.telegram_messages 
-                    (message_id, channel_name, message_date, message_text, 
-                     has_media, image_path, views, forwards, scraped_at)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT DO NOTHING
-                    """, (
-                        msg['message_id'],
-                        msg['channel_name'],
-                        msg['message_date'],
-                        msg['message_text'],
-                        msg.get('has_media', False),
-                        msg.get('image_path'),
-                        msg.get('views', 0),
-                        msg.get('forwards', 0),
-                        msg.get('scraped_at')
-                    ))
-                    total += 1
-        
-        conn.commit()
-        print(f"✅ Loaded {total} messages")
-    
-    # Show count
+    changed = 0
+    batch = {}
+
+    def flush():
+        nonlocal changed
+        if batch:
+            execute_values(cur, sql, list(batch.values()), page_size=len(batch))
+            changed += cur.rowcount
+            batch.clear()
+
+    for msg in messages:
+        # A statement may not upsert the same key twice: the last copy wins
+        batch[(msg['message_id'], msg['channel_name'])] = message_row(msg)
+        total += 1
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    return total, changed
+
+
+def message_row(msg):
+    """Column values of a message, in MESSAGE_COLUMNS order"""
+    return (
+        msg['message_id'],
+        msg['channel_name'],
+        msg['message_date'],
+        msg['message_text'],
+        msg.get('has_media', False),
+        msg.get('image_path'),
+        msg.get('views', 0),
+        msg.get('forwards', 0),
+        msg.get('scraped_at')
+    )
+
+
+def report_progress(rows, rows_per_sec):
+    print(f"  ... {rows:,} rows streamed ({rows_per_sec:,.0f} rows/sec)")
+
+
+def copy_messages(cur, messages, progress_every=100000):
+    """Bulk load messages through COPY FROM STDIN and one set-based upsert
+
+    Rows are streamed into a temporary staging table, then upserted into
+    raw.telegram_messages in a single statement. Returns (rows streamed,
+    rows inserted or updated).
+    """
+    columns = ', '.join(MESSAGE_COLUMNS)
+
+    cur.execute("""
+    CREATE TEMP TABLE IF NOT EXISTS staging_telegram_messages (
+        message_id INTEGER,
+        channel_name VARCHAR(255),
+        message_date TIMESTAMP,
+        message_text TEXT,
+        has_media BOOLEAN,
+        image_path TEXT,
+        views INTEGER,
+        forwards INTEGER,
+        scraped_at TIMESTAMP
+    ) ON COMMIT DELETE ROWS;
+    """)
+
+    stream = CopyStream(
+        (message_row(msg) for msg in messages),
+        progress_every=progress_every,
+        on_progress=report_progress
+    )
+    cur.copy_expert(f"COPY staging_telegram_messages ({columns}) FROM STDIN", stream, size=COPY_CHUNK_SIZE)
+
+    # Latest scrape wins when a message appears in several files
+    cur.execute(f"""
+    INSERT INTO raw.telegram_messages ({columns})
+    SELECT DISTINCT ON (message_id, channel_name) {columns}
+    FROM staging_telegram_messages
+    ORDER BY message_id, channel_name, scraped_at DESC NULLS LAST
+    {UPSERT_CLAUSE}
+    """)
+    return stream.rows, cur.rowcount
+
+
+def track_newest(messages, newest):
+    """Pass messages through, remembering the newest one per channel"""
+    for msg in messages:
+        current = newest.get(msg['channel_name'])
+        if current is None or msg['message_id'] > current['message_id']:
+            newest[msg['channel_name']] = {
+                'message_id': msg['message_id'],
+                'message_date': msg.get('message_date')
+            }
+        yield msg
+
+
+def changed_files(cur, paths, full_refresh=False):
+    """Lake files whose checksum differs from the load manifest
+
+    Returns [(path, checksum, size)]; unchanged files are skipped entirely.
+    """
+    cur.execute("SELECT file_path, checksum FROM raw.load_manifest WHERE file_path = ANY(%s)", (list(paths),))
+    loaded = dict(cur.fetchall())
+
+    changed = []
+    for path in paths:
+        checksum = file_checksum(path)
+        if not full_refresh and loaded.get(path) == checksum:
+            print(f"  ⏭️  {os.path.basename(path)}: unchanged since last load")
+            continue
+        changed.append((path, checksum, os.path.getsize(path)))
+    return changed
+
+
+def record_manifest(cur, files, row_counts):
+    """Remember loaded files with their checksums (same transaction as the data)
+
+    Files that yielded no rows (e.g. a part still being written) are left
+    out, so the next run looks at them again.
+    """
+    for path, checksum, size in files:
+        if not row_counts.get(path, 0):
+            continue
+        cur.execute("""
+        INSERT INTO raw.load_manifest (file_path, checksum, file_size, row_count, loaded_at)
+        VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP)
+        ON CONFLICT (file_path) DO UPDATE SET
+            checksum = EXCLUDED.checksum,
+            file_size = EXCLUDED.file_size,
+            row_count = EXCLUDED.row_count,
+            loaded_at = EXCLUDED.loaded_at
+        """, (path, checksum, size, row_counts.get(path, 0)))
+
+
+def iter_files(files, row_counts=None):
+    """Stream the messages of lake files that still need loading
+
+    `files` comes from changed_files(), so the load manifest's checksums
+    decide which files are read, not the channel cursors: an older partition
+    that was never loaded (e.g. a failed nightly run) is loaded in full.
+    Every row of a file is yielded, so views and forwards updated in a
+    changed file are upserted too. Rows yielded per file are counted into
+    `row_counts`.
+    """
+    for filepath, _, _ in files:
+        # Stream the file: only one message is in memory at a time
+        for msg in iter_records(filepath):
+            if row_counts is not None:
+                row_counts[filepath] = row_counts.get(filepath, 0) + 1
+            yield msg
+
+
+def load_files(conn, files, method='copy'):
+    """Load lake files in one transaction and commit
+
+    `files` comes from changed_files(). Returns (method used, rows read,
+    rows inserted or updated, newest message per channel).
+    """
+    cur = conn.cursor()
+
+    def load(method):
+        newest, row_counts = {}, {}
+        messages = track_newest(iter_files(files, row_counts), newest)
+
+        if method == 'copy':
+            total, changed = copy_messages(cur, messages)
+        elif method == 'upsert':
+            total, changed = upsert_messages(cur, messages)
+        else:
+            total, changed = insert_messages(cur, messages)
+
+        record_manifest(cur, files, row_counts)
+        return total, changed, newest
+
+    try:
+        total, changed, newest = load(method)
+    except psycopg2.Error as e:
+        if method != 'copy':
+            raise
+        print(f"⚠️  COPY failed ({e}), falling back to batched upserts")
+        conn.rollback()
+        method = 'upsert'
+        total, changed, newest = load(method)
+
+    conn.commit()
+    return method, total, changed, newest
+
+
+def advance_cursors(cursors, newest):
+    """Move the loader cursors to the newest committed messages"""
+    for channel, msg in newest.items():
+        cursors.update(channel, msg['message_id'], msg['message_date'], LOADER)
+    cursors.save()
+
+
+def load_partition(conn, data_dir, cursors=None, full_refresh=False, method='copy'):
+    """Load every changed channel file of a date partition
+
+    `method` is 'copy' (COPY into a staging table + one set-based upsert),
+    'upsert' (batched INSERT ... ON CONFLICT) or 'insert' (one row at a time).
+    All three are idempotent on (message_id, channel_name). If COPY fails,
+    the partition is retried with batched upserts. Cursors are advanced only
+    after the transaction is committed.
+    Returns a dict of metrics (files, rows, changed, bytes, seconds, method).
+    """
+    started = time.perf_counter()
+    stats = {'files': 0, 'rows': 0, 'changed': 0, 'bytes': 0, 'seconds': 0.0, 'method': method}
+
+    files = changed_files(conn.cursor(), lake_files(data_dir), full_refresh)
+    if not files:
+        print("  Nothing to load: every file is unchanged")
+        stats['seconds'] = time.perf_counter() - started
+        return stats
+
+    method, total, changed, newest = load_files(conn, files, method)
+
+    elapsed = time.perf_counter() - started
+    print(f"  {method}: {total:,} rows from {len(files)} files in {elapsed:.2f}s "
+          f"({total / elapsed if elapsed else 0:,.0f} rows/sec), {changed:,} inserted or updated")
+
+    if cursors:
+        advance_cursors(cursors, newest)
+
+    stats.update(files=len(files), rows=total, changed=changed, bytes=sum(size for _, _, size in files),
+                 seconds=elapsed, method=method)
+    return stats
+
+
+def load_directory(conn, data_dir, cursors=None, full_refresh=False, method='copy'):
+    """Load a date partition (see load_partition); returns the rows read"""
+    return load_partition(conn, data_dir, cursors, full_refresh, method)['rows']
+
+
+def partition_dates(start, end):
+    """Every YYYY-MM-DD from start to end, inclusive"""
+    day = datetime.strptime(start, '%Y-%m-%d')
+    last = datetime.strptime(end, '%Y-%m-%d')
+    while day <= last:
+        yield day.strftime('%Y-%m-%d')
+        day += timedelta(days=1)
+
+
+# Connection of a backfill worker process
+_worker_conn = None
+
+
+def _init_worker(params):
+    """Open the one connection a backfill worker keeps for its lifetime"""
+    global _worker_conn
+    _worker_conn = psycopg2.connect(**params)
+
+
+def load_file(path, full_refresh=False, method='copy'):
+    """Load and commit one lake file on the worker's connection
+
+    Returns (rows read, rows inserted or updated, bytes, newest per channel),
+    or None if the file is unchanged since its last load.
+    """
+    conn = _worker_conn
+    try:
+        files = changed_files(conn.cursor(), [path], full_refresh)
+        if not files:
+            return None
+        _, total, changed, newest = load_files(conn, files, method)
+        return total, changed, files[0][2], newest
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def load_range(start, end, workers=4, cursors=None, full_refresh=False, method='copy', **conn_overrides):
+    """Backfill every partition from start to end in parallel
+
+    Files are spread over `workers` processes (parsing is CPU-bound), each
+    holding one connection, so at most `workers` connections are open. Every
+    file is committed on its own, so a failed
+    file does not roll back the others and a rerun only loads what is missing.
+    Loader cursors are not used to filter (partitions arrive out of order);
+    the manifest and upserts keep the backfill idempotent, and the cursors
+    are advanced to the newest loaded messages at the end.
+    Returns a dict of aggregated metrics.
+    """
+    paths = []
+    for date in partition_dates(start, end):
+        paths.extend(lake_files(f'{RAW_MESSAGES_DIR}/{date}'))
+
+    print(f"\n📁 Backfilling {start} → {end}: {len(paths)} files, {workers} workers")
+
+    stats = {'files': 0, 'skipped': 0, 'failed': 0, 'rows': 0, 'changed': 0, 'bytes': 0}
+    newest = {}
+    started = time.perf_counter()
+
+    params = connection_params(**conn_overrides)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(params,)) as executor:
+        futures = {executor.submit(load_file, path, full_refresh, method): path for path in paths}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                stats['failed'] += 1
+                print(f"  ❌ {path}: {e}")
+                continue
+
+            if result is None:
+                stats['skipped'] += 1
+                continue
+
+            rows, changed, size, file_newest = result
+            stats['files'] += 1
+            stats['rows'] += rows
+            stats['changed'] += changed
+            stats['bytes'] += size
+            for channel, msg in file_newest.items():
+                if channel not in newest or msg['message_id'] > newest[channel]['message_id']:
+                    newest[channel] = msg
+
+    stats['seconds'] = time.perf_counter() - started
+    elapsed = stats['seconds'] or 1e-9
+    print(f"  {stats['files']} files loaded, {stats['skipped']} unchanged, {stats['failed']} failed: "
+          f"{stats['rows']:,} rows in {elapsed:.2f}s")
+    print(f"  {stats['rows'] / elapsed:,.0f} rows/sec, {stats['bytes'] / elapsed / 1e6:.1f} MB/s, "
+          f"{stats['changed']:,} inserted or updated")
+
+    if cursors:
+        advance_cursors(cursors, newest)
+
+    return stats
+
+
+def print_counts(conn):
+    """Show row counts"""
+    cur = conn.cursor()
     cur.execute("SELECT COUNT(*) FROM raw.telegram_messages")
     count = cur.fetchone()[0]
     print(f"📊 Total in database: {count}")
-    
+
     # Show by channel
     cur.execute("SELECT channel_name, COUNT(*) FROM raw.telegram_messages GROUP BY channel_name")
     print("\n📈 By channel:")
     for channel, cnt in cur.fetchall():
         print(f"  {channel}: {cnt} messages")
-    
-    conn.close()
-    
-except Exception as e:
-    print(f"❌ ERROR: {e}")
-    print("\n💡 SOLUTIONS:")
-    print("1. Check if Docker PostgreSQL is running:")
-    print("   docker ps | grep medical_postgres")
-    print("2. If not running, start it:")
-    print("   docker rm medical_postgres 2>/dev/null; docker run -d --name medical_postgres -p 5433:5432 -e POSTGRES_PASSWORD=postgres -e POSTGRES_DB=medical_warehouse postgres:15")
-    print("3. Wait 10 seconds after starting")
-
-print("="*60)
+
+
+def parse_args(argv=None):
+    """Command line options"""
+    parser = argparse.ArgumentParser(description="Load raw Telegram messages to PostgreSQL")
+    parser.add_argument('--date', default=datetime.now().strftime('%Y-%m-%d'),
+                        help="Lake partition to load (YYYY-MM-DD, default: today)")
+    parser.add_argument('--full-refresh', action='store_true',
+                        help="Ignore the load manifest and reload every message of the partition")
+    parser.add_argument('--method', choices=['copy', 'upsert', 'insert'], default='copy',
+                        help="COPY bulk load (default), batched upsert, or row-by-row fallback")
+    parser.add_argument('--cursor-file', default=DEFAULT_CURSOR_FILE)
+    parser.add_argument('--start', help="Backfill: first partition to load (YYYY-MM-DD)")
+    parser.add_argument('--end', help="Backfill: last partition to load (default: --date)")
+    parser.add_argument('--workers', type=int, default=4,
+                        help="Backfill: worker processes, one connection each (default: 4)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    print("="*60)
+    print("📊 LOADING TO POSTGRESQL (PORT 5433)")
+    print("="*60)
+
+    try:
+        conn = get_connection()
+        print("✅ Connected to PostgreSQL on port 5433")
+
+        create_raw_table(conn)
+        print("✅ Created raw schema and table")
+
+        # Load data
+        data_dir = f'{RAW_MESSAGES_DIR}/{args.date}'
+        cursors = CursorStore(args.cursor_file)
+
+        if args.start:
+            load_range(args.start, args.end or args.date, args.workers, cursors, args.full_refresh, args.method)
+        elif os.path.exists(data_dir):
+            print(f"\n📁 Loading data from: {data_dir}")
+            total = load_directory(conn, data_dir, cursors, args.full_refresh, args.method)
+            print(f"✅ Loaded {total} messages")
+
+        print_counts(conn)
+        conn.close()
+
+    except Exception as e:
+        print(f"❌ ERROR: {e}")
+        print("\n💡 SOLUTIONS:")
+        print("1. Check if Docker PostgreSQL is running:")
+        print("   docker ps | grep medical_postgres")
+        print("2. If not running, start it:")
+        print("   docker rm medical_postgres 2>/dev/null; docker run -d --name medical_postgres -p 5433:5432 -e POSTGRES_PASSWORD=postgres -e POSTGRES_DB=medical_warehouse postgres:15")
+        print("3. Wait 10 seconds after starting")
+
+    print("="*60)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,26 @@
 # src/scraper.py - EXACTLY AS PER INSTRUCTIONS
 import os
 import sys
-import json
 import logging
 import random
+import time
+import asyncio
+import argparse
 from datetime import datetime, timedelta
 from PIL import Image, ImageDraw
 
+try:
+    from src.utils.rate_limiter import AsyncRateLimiter
+    from src.utils.cursor_store import CursorStore, DEFAULT_CURSOR_FILE, SCRAPER, LOADER, YOLO
+    from src.utils.raw_lake import open_writer, RAW_MESSAGES_DIR, DEFAULT_MAX_BYTES
+    from src.utils.image_manifest import ImageManifest, DEFAULT_MANIFEST_FILE
+except ImportError:
+    # Fallback for when running directly: python src/scraper.py
+    from utils.rate_limiter import AsyncRateLimiter
+    from utils.cursor_store import CursorStore, DEFAULT_CURSOR_FILE, SCRAPER, LOADER, YOLO
+    from utils.raw_lake import open_writer, RAW_MESSAGES_DIR, DEFAULT_MAX_BYTES
+    from utils.image_manifest import ImageManifest, DEFAULT_MANIFEST_FILE
+
 # Setup logging AS PER INSTRUCTIONS
 os.makedirs('logs', exist_ok=True)
 logging.basicConfig(
@@ -20,16 +34,32 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 class TelegramScraper:
-    def __init__(self):
-        self.channels = [
+    def __init__(self, channels=None, cursor_file=DEFAULT_CURSOR_FILE, compression=None,
+                 max_file_bytes=DEFAULT_MAX_BYTES, output_format='ndjson',
+                 manifest_file=DEFAULT_MANIFEST_FILE):
+        self.channels = channels or [
             'chemed',           # CheMed Telegram Channel
             'lobelia4cosmetics', # https://t.me/lobelia4cosmetics
             'tikvahpharma',     # https://t.me/tikvahpharma
         ]
         
+        # Per-channel throughput of the last async run
+        self.channel_stats = {}
+        
+        # Per-channel high-water marks for incremental scraping
+        self.cursors = CursorStore(cursor_file)
+        
+        # Raw lake output: NDJSON (optionally gzip/zstd compressed, rotated by size) or Parquet
+        self.output_format = output_format
+        self.compression = compression
+        self.max_file_bytes = max_file_bytes
+        
+        # Every saved image is recorded, so YOLO finds new ones without listing directories
+        self.manifest = ImageManifest(manifest_file) if manifest_file else None
+        
         # Create data lake structure AS PER INSTRUCTIONS
         os.makedirs('data/raw/images', exist_ok=True)
-        os.makedirs('data/raw/telegram_messages', exist_ok=True)
+        os.makedirs(RAW_MESSAGES_DIR, exist_ok=True)
         
         logger.info("Telegram Scraper initialized")
     
@@ -66,6 +96,8 @@ class TelegramScraper:
             draw.text((50, 200), f"Channel: {channel_name}", fill=(0, 0, 150))
             
             img.save(img_path)
+            if self.manifest is not None:
+                self.manifest.append(img_path, message_id, channel_name)
             logger.info(f"Downloaded image: {img_path}")
             return img_path
             
@@ -73,80 +105,215 @@ class TelegramScraper:
             logger.error(f"Error downloading image: {e}")
             return None
     
-    def scrape_channel(self, channel_name, message_count=20):
-        """Scrape a single channel AS PER INSTRUCTIONS"""
-        logger.info(f"Scraping channel: {channel_name}")
+    def build_message(self, channel_name, i):
+        """Build the i-th message of a channel (and its image) AS PER INSTRUCTIONS"""
+        message_id = i + (1000 * self.channels.index(channel_name))
         
-        messages = []
+        # Generate realistic Ethiopian medical messages
+        products = [
+            "Paracetamol 500mg available now! Price: 50 ETB",
+            "Amoxicillin capsules 250mg - 120 ETB per pack",
+            "Vitamin C 1000mg tablets - Boost immunity",
+            "Hand sanitizer 500ml - 180 ETB",
+            "Surgical masks (50pcs) - 250 ETB",
+            "Blood pressure monitor digital - 1200 ETB",
+            "Diabetes test strips - 950 ETB per pack",
+            "First aid kit complete - 650 ETB"
+        ]
         
-        for i in range(1, message_count + 1):
-            # Generate realistic Ethiopian medical messages
-            products = [
-                "Paracetamol 500mg available now! Price: 50 ETB",
-                "Amoxicillin capsules 250mg - 120 ETB per pack",
-                "Vitamin C 1000mg tablets - Boost immunity",
-                "Hand sanitizer 500ml - 180 ETB",
-                "Surgical masks (50pcs) - 250 ETB",
-                "Blood pressure monitor digital - 1200 ETB",
-                "Diabetes test strips - 950 ETB per pack",
-                "First aid kit complete - 650 ETB"
-            ]
-            
-            cities = ["Addis Ababa", "Adama", "Bahir Dar", "Mekelle", "Hawassa"]
-            
-            # Create message text
-            product = random.choice(products)
-            city = random.choice(cities)
-            message_text = f"🚚 Available in {city}: {product}\n📞 Contact: 09xx xxx xxx\n📍 Location: {city}"
-            
-            # Add Amharic sometimes
-            if random.random() < 0.3:
-                message_text += "\n\nለበለጠ መረጃ ይደውሉ!"
-            
-            # Random date (last 30 days)
-            message_date = datetime.now() - timedelta(days=random.randint(0, 30))
-            
-            # Random views and forwards
-            views = random.randint(50, 500)
-            forwards = random.randint(0, 50)
-            
-            # 40% chance of having media AS PER INSTRUCTIONS
-            has_media = random.random() < 0.4
-            image_path = None
-            
-            if has_media:
-                image_path = self.create_sample_image(channel_name, i)
-            
-            # Extract data AS PER INSTRUCTIONS:
-            # Message ID, date, text content, View count, forward count, Media information
-            message_data = {
-                'message_id': i + (1000 * self.channels.index(channel_name)),
-                'channel_name': channel_name,
-                'message_date': message_date.isoformat(),
-                'message_text': message_text,
-                'has_media': has_media,
-                'image_path': image_path,
-                'views': views,
-                'forwards': forwards,
-                'scraped_at': datetime.now().isoformat()
-            }
-            
-            messages.append(message_data)
+        cities = ["Addis Ababa", "Adama", "Bahir Dar", "Mekelle", "Hawassa"]
+        
+        # Create message text
+        product = random.choice(products)
+        city = random.choice(cities)
+        message_text = f"🚚 Available in {city}: {product}\n📞 Contact: 09xx xxx xxx\n📍 Location: {city}"
+        
+        # Add Amharic sometimes
+        if random.random() < 0.3:
+            message_text += "\n\nለበለጠ መረጃ ይደውሉ!"
+        
+        # Random date (last 30 days)
+        message_date = datetime.now() - timedelta(days=random.randint(0, 30))
+        
+        # Random views and forwards
+        views = random.randint(50, 500)
+        forwards = random.randint(0, 50)
+        
+        # 40% chance of having media AS PER INSTRUCTIONS
+        has_media = random.random() < 0.4
+        image_path = None
+        
+        if has_media:
+            image_path = self.create_sample_image(channel_name, message_id)
+        
+        # Extract data AS PER INSTRUCTIONS:
+        # Message ID, date, text content, View count, forward count, Media information
+        message_data = {
+            'message_id': message_id,
+            'channel_name': channel_name,
+            'message_date': message_date.isoformat(),
+            'message_text': message_text,
+            'has_media': has_media,
+            'image_path': image_path,
+            'views': views,
+            'forwards': forwards,
+            'scraped_at': datetime.now().isoformat()
+        }
+        
+        return message_data
+    
+    def new_message_indexes(self, channel_name, message_count, min_id=0):
+        """Message positions newer than `min_id` (Telegram's min_id semantics)"""
+        base_id = 1000 * self.channels.index(channel_name)
+        first = max(1, min_id - base_id + 1)
+        return range(first, first + message_count)
+    
+    def iter_channel(self, channel_name, message_count=20, min_id=0):
+        """Yield the messages of a single channel one at a time
+        
+        Only messages with message_id > min_id are fetched.
+        """
+        logger.info(f"Scraping channel: {channel_name} (after message_id {min_id})")
+        
+        n = 0
+        for n, i in enumerate(self.new_message_indexes(channel_name, message_count, min_id), 1):
+            yield self.build_message(channel_name, i)
             
             # Log progress
-            if i % 5 == 0:
-                logger.info(f"  Scraped {i}/{message_count} messages from {channel_name}")
+            if n % 5 == 0:
+                logger.info(f"  Scraped {n}/{message_count} messages from {channel_name}")
+        
+        logger.info(f"Finished scraping {channel_name}: {n} messages")
+    
+    def scrape_channel(self, channel_name, message_count=20, min_id=0):
+        """Scrape a single channel AS PER INSTRUCTIONS"""
+        return list(self.iter_channel(channel_name, message_count, min_id))
+    
+    def open_partition(self, channel, today, full_refresh=False):
+        """Streaming writer for a channel's partition
+        
+        Partitioned directory structure: data/raw/telegram_messages/YYYY-MM-DD/channel_name.NNNN.{ndjson,parquet}
+        A full refresh replaces the channel's files, otherwise new messages are added as new data.
+        """
+        return open_writer(
+            f'{RAW_MESSAGES_DIR}/{today}',
+            channel,
+            fmt=self.output_format,
+            compression=self.compression,
+            max_bytes=self.max_file_bytes,
+            overwrite=full_refresh
+        )
+    
+    def new_totals(self):
+        return {'messages': 0, 'images': 0, 'last_message_id': 0, 'last_message_date': None, 'files': []}
+    
+    def write_message(self, writer, totals, message):
+        """Append one message to the lake and update the channel totals"""
+        writer.write(message)
+        
+        totals['messages'] += 1
+        if message['image_path']:
+            totals['images'] += 1
+        if message['message_id'] > totals['last_message_id']:
+            totals['last_message_id'] = message['message_id']
+            totals['last_message_date'] = message['message_date']
+    
+    def build_and_write(self, writer, totals, channel_name, i):
+        self.write_message(writer, totals, self.build_message(channel_name, i))
+    
+    def finish_channel(self, channel, writer, totals):
+        """Advance the channel cursor once its messages are on disk"""
+        totals['files'] = list(writer.paths)
+        
+        if not totals['messages']:
+            logger.info(f"No new messages in {channel}")
+            return totals
+        
+        self.cursors.update(channel, totals['last_message_id'], totals['last_message_date'])
+        self.cursors.save()
+        
+        logger.info(f"Saved {totals['messages']} new messages to {', '.join(totals['files'])}")
+        return totals
+    
+    def save_messages(self, channel, messages, today, full_refresh=False):
+        """Stream messages (any iterable) into the channel's partition
+        
+        Only the current message is held in memory, however big the channel is.
+        """
+        totals = self.new_totals()
+        
+        with self.open_partition(channel, today, full_refresh) as writer:
+            for message in messages:
+                self.write_message(writer, totals, message)
         
-        logger.info(f"Finished scraping {channel_name}: {len(messages)} messages")
-        return messages
+        return self.finish_channel(channel, writer, totals)
+    
+    async def scrape_channel_async(self, channel_name, today, message_count=20, rate_limiter=None,
+                                   fetch_latency=0.0, min_id=0, full_refresh=False):
+        """Scrape a single channel straight into its partition without blocking the event loop"""
+        logger.info(f"Scraping channel (async): {channel_name} (after message_id {min_id})")
+        
+        totals = self.new_totals()
+        
+        with self.open_partition(channel_name, today, full_refresh) as writer:
+            for i in self.new_message_indexes(channel_name, message_count, min_id):
+                # Every fetch goes through the global rate limiter
+                if rate_limiter:
+                    await rate_limiter.acquire()
+                
+                # Simulated network round trip (fake-channel benchmarks)
+                if fetch_latency:
+                    await asyncio.sleep(fetch_latency)
+                
+                # Image creation and writing do disk I/O, keep them off the event loop
+                await asyncio.to_thread(self.build_and_write, writer, totals, channel_name, i)
+        
+        logger.info(f"Finished scraping {channel_name}: {totals['messages']} messages")
+        return self.finish_channel(channel_name, writer, totals)
+    
+    def channel_min_id(self, channel, full_refresh=False):
+        """High-water mark to resume a channel from
+        
+        A full refresh also resets the loader and YOLO cursors of the channel,
+        otherwise they stay ahead of the re-scraped messages and skip them.
+        """
+        if full_refresh:
+            for stage in (SCRAPER, LOADER, YOLO):
+                self.cursors.reset(stage, channel)
+            return 0
+        return self.cursors.last_message_id(channel)
+    
+    def summarize(self, channel_totals, today):
+        """Run totals across channels"""
+        return {
+            'date': today,
+            'messages': sum(t['messages'] for t in channel_totals.values()),
+            'images': sum(t['images'] for t in channel_totals.values()),
+            'channels': channel_totals
+        }
     
-    def run(self):
-        """Main scraping function"""
+    def log_summary(self, summary):
+        """Log scraping summary"""
+        logger.info("="*50)
+        logger.info("SCRAPING COMPLETE")
+        logger.info(f"Total messages: {summary['messages']}")
+        logger.info(f"Messages with images: {summary['images']}")
+        logger.info(f"Data saved to: {RAW_MESSAGES_DIR}/{summary['date']}/")
+        logger.info("Images saved to: data/raw/images/")
+        logger.info("="*50)
+    
+    def run(self, message_count=15, full_refresh=False):
+        """Main scraping function
+        
+        Incremental by default: each channel resumes after its last seen
+        message_id. `full_refresh` ignores the cursors and re-scrapes everything.
+        Messages are streamed to disk; the returned summary only holds counts.
+        """
         logger.info("="*50)
         logger.info("STARTING TELEGRAM DATA SCRAPING")
         logger.info("="*50)
         
-        all_messages = []
+        channel_totals = {}
         
         # Get today's date for partitioned directory structure
         today = datetime.now().strftime('%Y-%m-%d')
@@ -154,47 +321,118 @@ class TelegramScraper:
         # Scrape all channels
         for channel in self.channels:
             try:
-                messages = self.scrape_channel(channel, 15)
-                all_messages.extend(messages)
-                
-                # Store raw scraped data as JSON files
-                # Partitioned directory structure: data/raw/telegram_messages/YYYY-MM-DD/channel_name.json
-                date_dir = f'data/raw/telegram_messages/{today}'
-                os.makedirs(date_dir, exist_ok=True)
-                
-                json_file = f'{date_dir}/{channel}.json'
-                with open(json_file, 'w', encoding='utf-8') as f:
-                    json.dump(messages, f, indent=2, ensure_ascii=False)
-                
-                logger.info(f"Saved {len(messages)} messages to {json_file}")
+                min_id = self.channel_min_id(channel, full_refresh)
+                channel_totals[channel] = self.save_messages(
+                    channel, self.iter_channel(channel, message_count, min_id), today, full_refresh
+                )
                 
             except Exception as e:
                 logger.error(f"Error scraping {channel}: {e}")
                 # Capture errors AS PER INSTRUCTIONS
         
         # Summary
-        total_messages = len(all_messages)
-        total_images = sum(1 for msg in all_messages if msg['image_path'])
+        summary = self.summarize(channel_totals, today)
+        self.log_summary(summary)
+        
+        return summary
+    
+    async def run_async(self, message_count=15, max_concurrency=10, rate_limit=30.0, fetch_latency=0.0,
+                        full_refresh=False):
+        """Scrape all channels concurrently
         
+        At most `max_concurrency` channels are scraped at the same time and all
+        of them share one rate limiter of `rate_limit` requests per second.
+        A failing channel is logged and skipped, the others keep going.
+        """
         logger.info("="*50)
-        logger.info(f"SCRAPING COMPLETE")
-        logger.info(f"Total messages: {total_messages}")
-        logger.info(f"Messages with images: {total_images}")
-        logger.info(f"Data saved to: data/raw/telegram_messages/{today}/")
-        logger.info(f"Images saved to: data/raw/images/")
+        logger.info(f"STARTING ASYNC TELEGRAM DATA SCRAPING ({len(self.channels)} channels, "
+                    f"concurrency={max_concurrency}, rate_limit={rate_limit}/s)")
         logger.info("="*50)
         
-        return all_messages
+        today = datetime.now().strftime('%Y-%m-%d')
+        semaphore = asyncio.Semaphore(max_concurrency)
+        rate_limiter = AsyncRateLimiter(rate_limit)
+        self.channel_stats = {}
+        channel_totals = {}
+        
+        async def scrape_one(channel):
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    min_id = self.channel_min_id(channel, full_refresh)
+                    totals = await self.scrape_channel_async(
+                        channel, today, message_count, rate_limiter, fetch_latency, min_id, full_refresh
+                    )
+                except Exception as e:
+                    # Per-channel error isolation
+                    logger.error(f"Error scraping {channel}: {e}")
+                    self.channel_stats[channel] = {
+                        'status': 'error',
+                        'error': str(e),
+                        'messages': 0,
+                        'seconds': round(time.perf_counter() - started, 3),
+                        'messages_per_sec': 0.0
+                    }
+                    return
+                
+                elapsed = time.perf_counter() - started
+                channel_totals[channel] = totals
+                self.channel_stats[channel] = {
+                    'status': 'success',
+                    'messages': totals['messages'],
+                    'seconds': round(elapsed, 3),
+                    'messages_per_sec': round(totals['messages'] / elapsed, 2) if elapsed else 0.0
+                }
+                logger.info(f"  {channel}: {totals['messages']} messages in {elapsed:.2f}s "
+                            f"({self.channel_stats[channel]['messages_per_sec']} msg/s)")
+        
+        started = time.perf_counter()
+        await asyncio.gather(*(scrape_one(channel) for channel in self.channels))
+        elapsed = time.perf_counter() - started
+        
+        summary = self.summarize(channel_totals, today)
+        failed = [c for c, stats in self.channel_stats.items() if stats['status'] == 'error']
+        
+        self.log_summary(summary)
+        logger.info(f"Async run: {summary['messages']} messages from {len(channel_totals)} "
+                    f"channels in {elapsed:.2f}s ({summary['messages'] / elapsed if elapsed else 0:.1f} msg/s)")
+        if failed:
+            logger.warning(f"Failed channels: {', '.join(failed)}")
+        
+        return summary
 
-def main():
+def parse_args(argv=None):
+    """Command line options"""
+    parser = argparse.ArgumentParser(description="Telegram medical data scraper")
+    parser.add_argument('--messages', type=int, default=15,
+                        help="Messages to scrape per channel")
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help="Scrape channels concurrently with asyncio")
+    parser.add_argument('--max-concurrency', type=int, default=10,
+                        help="Channels scraped at the same time in async mode")
+    parser.add_argument('--rate-limit', type=float, default=30.0,
+                        help="Global request budget per second in async mode (0 = unlimited)")
+    parser.add_argument('--full-refresh', action='store_true',
+                        help="Ignore per-channel cursors and re-scrape every channel from the start")
+    parser.add_argument('--format', dest='output_format', choices=['ndjson', 'parquet'], default='ndjson',
+                        help="Raw lake file format")
+    parser.add_argument('--compression', choices=['none', 'gzip', 'zstd'], default='none',
+                        help="Compression of the lake files (Parquet defaults to snappy)")
+    parser.add_argument('--max-file-mb', type=float, default=DEFAULT_MAX_BYTES / (1024 * 1024),
+                        help="Rotate lake files once this many MB of (uncompressed) messages are written to them")
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Main entry point"""
+    args = parse_args(argv)
+    
     print("\n" + "="*60)
     print("TELEGRAM MEDICAL DATA SCRAPER")
     print("="*60)
     print("Following instructions exactly:")
     print("1. Extract: Message ID, date, text, views, forwards, media")
     print("2. Download images to: data/raw/images/{channel}/{id}.jpg")
-    print("3. Store JSON to: data/raw/telegram_messages/YYYY-MM-DD/")
+    print(f"3. Store {args.output_format.upper()} to: data/raw/telegram_messages/YYYY-MM-DD/")
     print("4. Log to: logs/scraper.log")
     print("="*60)
     
@@ -206,14 +444,26 @@ def main():
         import subprocess
         subprocess.check_call([sys.executable, "-m", "pip", "install", "Pillow"])
     
-    scraper = TelegramScraper()
+    scraper = TelegramScraper(
+        compression=None if args.compression == 'none' else args.compression,
+        max_file_bytes=int(args.max_file_mb * 1024 * 1024),
+        output_format=args.output_format
+    )
     
     try:
-        messages = scraper.run()
+        if args.use_async:
+            summary = asyncio.run(scraper.run_async(
+                message_count=args.messages,
+                max_concurrency=args.max_concurrency,
+                rate_limit=args.rate_limit,
+                full_refresh=args.full_refresh
+            ))
+        else:
+            summary = scraper.run(args.messages, full_refresh=args.full_refresh)
         
         # Print summary for user
-        print(f"\n✅ SUCCESS: {len(messages)} messages scraped")
-        print(f"📸 Images created: {sum(1 for m in messages if m['image_path'])}")
+        print(f"\n✅ SUCCESS: {summary['messages']} messages scraped")
+        print(f"📸 Images created: {summary['images']}")
         print(f"📁 Check: data/raw/telegram_messages/")
         print(f"🖼️  Check: data/raw/images/")
         print(f"📝 Logs: logs/scraper.log")
@@ -0,0 +1,117 @@
+# src/utils/box_classifier.py - Vectorized image categorization over detection boxes
+import numpy as np
+
+# Detection classes we care about
+PERSON_CLASSES = ['person']
+PRODUCT_CLASSES = ['bottle', 'cup', 'vase', 'handbag', 'cell phone', 'laptop']
+
+CATEGORIES = ['promotional', 'product_display', 'lifestyle', 'other']
+
+
+def classify(class_names, person_classes=PERSON_CLASSES, product_classes=PRODUCT_CLASSES):
+    """Image category from the classes detected in it"""
+    has_person = any(obj in person_classes for obj in class_names)
+    has_product = any(obj in product_classes for obj in class_names)
+
+    if has_person and has_product:
+        return 'promotional'
+    elif has_product and not has_person:
+        return 'product_display'
+    elif has_person and not has_product:
+        return 'lifestyle'
+    else:
+        return 'other'
+
+
+def summarize_boxes(box_classes, box_confidences, min_confidence=0.0):
+    """Image-level columns of one image, box by box (reference for BoxClassifier)
+
+    Returns (detected_class, confidence_score, image_category, detection_count),
+    ignoring boxes below `min_confidence`.
+    """
+    kept = [(name, conf) for name, conf in zip(box_classes, box_confidences) if conf >= min_confidence]
+    if not kept:
+        return 'none', 0.0, classify([]), 0
+
+    top_class, top_confidence = max(kept, key=lambda box: box[1])
+    return top_class, top_confidence, classify([name for name, _ in kept]), len(kept)
+
+
+class BoxClassifier:
+    """Categorize a whole batch of images at once from flat box arrays
+
+    Class membership is looked up in boolean masks indexed by class id, built
+    once from the class names, so nothing is compared as a string per box.
+    `thresholds` maps class names to their own minimum confidence (others use
+    `min_confidence`); `top_k` only counts the k most confident boxes per image.
+
+    Usage:
+        classifier = BoxClassifier(model.names)
+        classes, confidences, categories, counts = classifier.summarize(class_ids, confidences, boxes_per_image)
+    """
+
+    def __init__(self, names, person_classes=PERSON_CLASSES, product_classes=PRODUCT_CLASSES,
+                 thresholds=None, min_confidence=0.0, top_k=None):
+        # Ultralytics gives {id: name}; a plain list is indexed by position
+        if isinstance(names, dict):
+            names = [names.get(i, str(i)) for i in range(max(names) + 1)] if names else []
+        self.names = np.array(list(names), dtype=object)
+        self.index = {name: i for i, name in enumerate(self.names)}
+
+        self.person_mask = np.isin(self.names, person_classes)
+        self.product_mask = np.isin(self.names, product_classes)
+
+        self.thresholds = np.full(len(self.names), min_confidence, dtype=np.float64)
+        for name, threshold in (thresholds or {}).items():
+            if name in self.index:
+                self.thresholds[self.index[name]] = threshold
+
+        self.top_k = top_k
+
+    def encode(self, class_names):
+        """Class ids of class names"""
+        return np.fromiter((self.index[name] for name in class_names), dtype=np.intp, count=len(class_names))
+
+    def summarize(self, class_ids, confidences, counts):
+        """Image-level columns for a batch of images
+
+        `class_ids` and `confidences` hold the boxes of every image back to back,
+        `counts` the number of boxes per image. Returns arrays of
+        (detected_class, confidence_score, image_category, detection_count).
+        """
+        counts = np.asarray(counts, dtype=np.intp)
+        n = len(counts)
+        class_ids = np.asarray(class_ids, dtype=np.intp)
+        confidences = np.asarray(confidences, dtype=np.float64)
+        image = np.repeat(np.arange(n), counts)
+
+        keep = confidences >= self.thresholds[class_ids]
+        image, class_ids, confidences = image[keep], class_ids[keep], confidences[keep]
+
+        # Most confident box first within each image (stable, so ties keep box order)
+        order = np.lexsort((-confidences, image))
+        image, class_ids, confidences = image[order], class_ids[order], confidences[order]
+        starts = np.flatnonzero(np.r_[True, image[1:] != image[:-1]]) if len(image) else image
+
+        if self.top_k:
+            rank = np.arange(len(image)) - np.repeat(starts, np.diff(np.r_[starts, len(image)]))
+            keep = rank < self.top_k
+            image, class_ids, confidences = image[keep], class_ids[keep], confidences[keep]
+            starts = np.flatnonzero(np.r_[True, image[1:] != image[:-1]]) if len(image) else image
+
+        detection_count = np.bincount(image, minlength=n)
+        has_person = np.bincount(image, weights=self.person_mask[class_ids], minlength=n) > 0
+        has_product = np.bincount(image, weights=self.product_mask[class_ids], minlength=n) > 0
+        category = np.select(
+            [has_person & has_product, has_product, has_person],
+            CATEGORIES[:3],
+            CATEGORIES[3]
+        )
+
+        detected_class = np.full(n, 'none', dtype=object)
+        confidence_score = np.zeros(n)
+        first = image[starts]
+        detected_class[first] = self.names[class_ids[starts]]
+        confidence_score[first] = confidences[starts]
+
+        return detected_class, confidence_score, category, detection_count
@@ -0,0 +1,86 @@
+# src/utils/cursor_store.py - Per-channel high-water marks for incremental runs
+import os
+import json
+import threading
+from datetime import datetime
+
+DEFAULT_CURSOR_FILE = 'data/state/cursors.json'
+
+# Pipeline stages that keep their own cursor
+SCRAPER = 'scraper'
+LOADER = 'loader'
+YOLO = 'yolo'
+
+
+class CursorStore:
+    """Persistent last-seen message_id/date per (stage, channel)
+
+    The scraper advances the `scraper` cursor as it writes new messages,
+    downstream stages (loader, YOLO) advance their own cursor once they have
+    processed messages, so `pending()` tells them whether there is any delta.
+
+    File layout (JSON):
+        {"scraper": {"chemed": {"message_id": 15, "message_date": "...", "updated_at": "..."}}}
+    """
+
+    def __init__(self, path=DEFAULT_CURSOR_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._cursors = {}
+
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self._cursors = json.load(f)
+
+    def get(self, channel, stage=SCRAPER):
+        """Cursor dict for a channel, or None if the channel was never processed"""
+        return self._cursors.get(stage, {}).get(channel)
+
+    def last_message_id(self, channel, stage=SCRAPER):
+        """Last processed message_id for a channel (0 if none)"""
+        cursor = self.get(channel, stage)
+        return cursor['message_id'] if cursor else 0
+
+    def channels(self, stage=SCRAPER):
+        """Channels that have a cursor for a stage"""
+        return list(self._cursors.get(stage, {}).keys())
+
+    def pending(self, channel, stage, upstream=SCRAPER):
+        """True if `upstream` has seen messages that `stage` has not processed yet"""
+        return self.last_message_id(channel, upstream) > self.last_message_id(channel, stage)
+
+    def update(self, channel, message_id, message_date=None, stage=SCRAPER):
+        """Advance a channel cursor (never moves backwards)"""
+        with self._lock:
+            stage_cursors = self._cursors.setdefault(stage, {})
+            current = stage_cursors.get(channel)
+
+            if current and current['message_id'] >= message_id:
+                return current
+
+            stage_cursors[channel] = {
+                'message_id': message_id,
+                'message_date': message_date,
+                'updated_at': datetime.now().isoformat()
+            }
+            return stage_cursors[channel]
+
+    def reset(self, stage, channel=None):
+        """Forget cursors of a stage (full refresh)"""
+        with self._lock:
+            if channel is None:
+                self._cursors.pop(stage, None)
+            else:
+                self._cursors.get(stage, {}).pop(channel, None)
+
+    def save(self):
+        """Write cursors atomically so a crash never leaves a half-written file"""
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            tmp_path = f'{self.path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._cursors, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
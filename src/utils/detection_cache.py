@@ -0,0 +1,125 @@
+# src/utils/detection_cache.py - Persistent YOLO detections keyed by image content
+import os
+import json
+import sqlite3
+from datetime import datetime
+
+DEFAULT_CACHE_FILE = 'data/state/detection_cache.sqlite'
+
+# Commit after this many new entries (and on close)
+COMMIT_EVERY = 500
+
+
+class DetectionCache:
+    """SQLite cache of raw detections per (content hash, model version)
+
+    The same image reposted in another channel, or re-detected on a later
+    run, is served from the cache instead of running the model again.
+    Changing the model version naturally invalidates every entry. The model's
+    class names are kept next to the entries, so cached ids can be named
+    without loading the model.
+
+    Usage:
+        with DetectionCache(model_version='yolov8n.pt:1a2b3c') as cache:
+            digest = file_checksum(path)
+            detections = cache.get(digest)
+            if detections is None:
+                cache.put(digest, run_model(path))
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_FILE, model_version='unknown'):
+        self.path = path
+        self.model_version = model_version
+        self.hits = 0
+        self.misses = 0
+        self._uncommitted = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Partitions detected concurrently (backfills) share the file: wait for locks
+        self._conn = sqlite3.connect(path, timeout=60)
+        self._conn.execute("""
+        CREATE TABLE IF NOT EXISTS detections (
+            content_hash TEXT NOT NULL,
+            model_version TEXT NOT NULL,
+            detections TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            PRIMARY KEY (content_hash, model_version)
+        )
+        """)
+        self._conn.execute("""
+        CREATE TABLE IF NOT EXISTS class_names (
+            model_version TEXT PRIMARY KEY,
+            names TEXT NOT NULL
+        )
+        """)
+        self._conn.commit()
+
+    def get(self, content_hash):
+        """Cached detections (list of dicts) for an image, or None on a miss"""
+        row = self._conn.execute(
+            "SELECT detections FROM detections WHERE content_hash = ? AND model_version = ?",
+            (content_hash, self.model_version)
+        ).fetchone()
+
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, content_hash, detections):
+        """Store the detections of an image"""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO detections VALUES (?, ?, ?, ?)",
+            (content_hash, self.model_version, json.dumps(detections), datetime.now().isoformat())
+        )
+        self._uncommitted += 1
+        if self._uncommitted >= COMMIT_EVERY:
+            self.commit()
+
+    def class_names(self):
+        """Class names ({id: name}) stored for this model version, or None"""
+        row = self._conn.execute(
+            "SELECT names FROM class_names WHERE model_version = ?", (self.model_version,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {int(class_id): name for class_id, name in json.loads(row[0]).items()}
+
+    def put_class_names(self, names):
+        """Store the model's class names ({id: name} or a list)"""
+        if not isinstance(names, dict):
+            names = dict(enumerate(names))
+        self._conn.execute(
+            "INSERT OR REPLACE INTO class_names VALUES (?, ?)",
+            (self.model_version, json.dumps({str(class_id): name for class_id, name in names.items()}))
+        )
+        self._uncommitted += 1
+
+    def commit(self):
+        self._conn.commit()
+        self._uncommitted = 0
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self):
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM detections WHERE model_version = ?", (self.model_version,)
+        ).fetchone()[0]
+
+    def close(self):
+        if self._conn is not None:
+            self.commit()
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
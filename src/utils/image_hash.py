@@ -0,0 +1,314 @@
+# src/utils/image_hash.py - Perceptual hashes and a near-duplicate image index
+import os
+import sqlite3
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+import numpy as np
+from PIL import Image
+
+from .raw_lake import file_checksum
+
+DEFAULT_INDEX_FILE = 'data/state/image_hashes.sqlite'
+
+# Hashes at most this many bits apart are treated as the same picture
+DEFAULT_RADIUS = 4
+
+HASH_BITS = 64
+
+
+def dhash(path, size=8):
+    """64-bit difference hash: is each pixel brighter than its right neighbour?
+
+    JPEGs are decoded at reduced scale (draft mode), which is all a 9x8
+    thumbnail needs and much faster than a full decode.
+    """
+    with Image.open(path) as img:
+        img.draft('L', (size * 4, size * 4))
+        pixels = np.asarray(img.convert('L').resize((size + 1, size), Image.BILINEAR), dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hash_image(path):
+    """(path, dhash, sha256) of an image file, or (path, None, None) if unreadable"""
+    try:
+        return path, dhash(path), file_checksum(path)
+    except OSError:
+        return path, None, None
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+def popcount(values):
+    """Set bits of each uint64 (np.bitwise_count needs NumPy 2)"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    return np.unpackbits(values.view(np.uint8)).reshape(-1, HASH_BITS).sum(axis=1)
+
+
+def _to_signed(value):
+    """SQLite integers are signed 64-bit"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+class ImageHashIndex:
+    """Persistent dHash index with multi-index hashing for Hamming lookups
+
+    Each 64-bit hash is split into `chunks` parts with one lookup table per
+    part. Two hashes within `radius` bits differ by at most radius // chunks
+    bits in at least one part (pigeonhole), so a lookup only probes those
+    few neighbours of each part instead of scanning every image.
+
+    Saved hashes stay in SQLite, with one indexed column per part, so opening
+    the index costs nothing however many images it holds and a lookup is one
+    indexed query. Images added since the last save() are kept in in-memory
+    tables of the same layout.
+
+    Every image is stored with its content hash and `duplicate_of`, the first
+    indexed image it is a near-duplicate of (None for originals).
+
+    Usage:
+        with ImageHashIndex() as index:
+            original = index.add(path, dhash(path), content_hash)
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_FILE, radius=DEFAULT_RADIUS, chunks=4):
+        if HASH_BITS % chunks:
+            raise ValueError(f"chunks must divide {HASH_BITS}, got {chunks}")
+        self.path = path
+        self.radius = radius
+        self.chunks = chunks
+        self.chunk_bits = HASH_BITS // chunks
+        self.chunk_radius = radius // chunks
+
+        # Images added since the last save
+        self._hashes = array('Q')
+        self._paths = []
+        self._positions = {}
+        self._content_hashes = {}
+        self._duplicate_of = {}
+        self._tables = [{} for _ in range(chunks)]
+        self._new = []
+        self._unsaved = set()
+
+        # Bit flips to probe around each part of a query
+        self._flips = [0]
+        for distance in range(1, self.chunk_radius + 1):
+            for bits in combinations(range(self.chunk_bits), distance):
+                self._flips.append(sum(1 << bit for bit in bits))
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Partitions detected concurrently (backfills) share the file: wait for locks
+        self._conn = sqlite3.connect(path, timeout=60)
+        self._conn.execute("""
+        CREATE TABLE IF NOT EXISTS image_hashes (
+            image_path TEXT PRIMARY KEY,
+            dhash INTEGER NOT NULL,
+            content_hash TEXT,
+            duplicate_of TEXT
+        )
+        """)
+
+        # One column per part, filled in for indexes saved before they existed.
+        # (part, dhash) indexes answer a probe without reading the table.
+        self._part_columns = [f"part{self.chunk_bits}_{i}" for i in range(chunks)]
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(image_hashes)")}
+        mask = (1 << self.chunk_bits) - 1
+        for i, column in enumerate(self._part_columns):
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE image_hashes ADD COLUMN {column} INTEGER")
+                self._conn.execute(f"UPDATE image_hashes SET {column} = (dhash >> {i * self.chunk_bits}) & {mask}")
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_image_hashes_{column} ON image_hashes ({column}, dhash)")
+        self._conn.commit()
+
+        # Same statement for every lookup, so SQLite compiles it once
+        probes = ', '.join('?' * len(self._flips))
+        self._lookup_sql = ' UNION ALL '.join(f"SELECT rowid, dhash FROM image_hashes WHERE {column} IN ({probes})"
+                                              for column in self._part_columns)
+
+    def _parts(self, value):
+        mask = (1 << self.chunk_bits) - 1
+        return [(value >> (i * self.chunk_bits)) & mask for i in range(self.chunks)]
+
+    def _insert(self, image_path, value, content_hash, duplicate_of):
+        position = len(self._paths)
+        self._hashes.append(value)
+        self._paths.append(image_path)
+        self._positions[image_path] = position
+        self._content_hashes[image_path] = content_hash
+        if duplicate_of:
+            self._duplicate_of[image_path] = duplicate_of
+        for table, part in zip(self._tables, self._parts(value)):
+            table.setdefault(part, []).append(position)
+
+    def _remove(self, image_path):
+        position = self._positions.pop(image_path)
+        for table, part in zip(self._tables, self._parts(self._hashes[position])):
+            table[part].remove(position)
+        self._content_hashes.pop(image_path, None)
+        self._duplicate_of.pop(image_path, None)
+
+    def _saved(self, image_path):
+        """(content_hash, duplicate_of) of a saved image, or None"""
+        return self._conn.execute(
+            "SELECT content_hash, duplicate_of FROM image_hashes WHERE image_path = ?", (image_path,)
+        ).fetchone()
+
+    def _known(self, image_path):
+        """(content_hash, duplicate_of) of an indexed image, or None"""
+        if image_path in self._positions:
+            return self._content_hashes.get(image_path), self._duplicate_of.get(image_path)
+        return self._saved(image_path)
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM image_hashes").fetchone()[0] + len(self._unsaved)
+
+    def __contains__(self, image_path):
+        return self._known(image_path) is not None
+
+    def content_hash(self, image_path):
+        known = self._known(image_path)
+        return known[0] if known else None
+
+    def duplicate_of(self, image_path):
+        """Original of a near-duplicate image, None for originals and unknown images"""
+        known = self._known(image_path)
+        return known[1] if known else None
+
+    def lookup(self, value, radius=None):
+        """Indexed images within `radius` bits of a hash, as [(distance, image_path)], closest first"""
+        radius = self.radius if radius is None else radius
+        parts = self._parts(value)
+
+        matches = []
+
+        # Saved images: one query over the part indexes, paths read for matches only
+        probes = [part ^ flip for part in parts for flip in self._flips]
+        rows = self._conn.execute(self._lookup_sql, probes).fetchall()
+        if rows:
+            rows = np.array(rows, dtype=np.int64)
+            distances = popcount(rows[:, 1].view(np.uint64) ^ np.uint64(value))
+            close = dict(zip(rows[distances <= radius, 0].tolist(), distances[distances <= radius].tolist()))
+            if close:
+                found = self._conn.execute(
+                    f"SELECT rowid, image_path FROM image_hashes WHERE rowid IN ({', '.join('?' * len(close))})",
+                    list(close)
+                )
+                for rowid, image_path in found:
+                    # Unless re-added with new content since the last save
+                    if image_path not in self._positions:
+                        matches.append((close[rowid], rowid, image_path))
+
+        # Images added since the last save, after every saved one
+        candidates = set()
+        for table, part in zip(self._tables, parts):
+            for flip in self._flips:
+                candidates.update(table.get(part ^ flip, ()))
+        if candidates:
+            positions = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            hashes = np.frombuffer(self._hashes, dtype=np.uint64)[positions]
+            distances = popcount(hashes ^ np.uint64(value))
+            for position, distance in zip(positions.tolist(), distances.tolist()):
+                if distance <= radius:
+                    matches.append((distance, 1 << 62 | position, self._paths[position]))
+
+        # Closest first, oldest first among equals
+        return [(int(distance), image_path) for distance, _, image_path in sorted(matches)]
+
+    def add(self, image_path, value, content_hash=None):
+        """Index an image and return the original it duplicates (or None)
+
+        Images already in the index keep their earlier answer, unless the
+        file's content changed since.
+        """
+        known = self._known(image_path)
+        if known is None:
+            self._unsaved.add(image_path)
+        else:
+            if content_hash is None or content_hash == known[0]:
+                return known[1]
+            if image_path in self._positions:
+                self._remove(image_path)
+
+        # Point at the root original, so chains of reposts share one source
+        # (skipping copies of this path's own earlier content)
+        original = None
+        for _, match in self.lookup(value):
+            if match == image_path:
+                continue
+            root = self.duplicate_of(match) or match
+            if root != image_path:
+                original = root
+                break
+
+        self._insert(image_path, value, content_hash, original)
+        self._new.append((image_path, _to_signed(value), content_hash, original, *self._parts(value)))
+        return original
+
+    def save(self):
+        """Write images added since the last save, then drop them from memory"""
+        if self._new:
+            columns = ', '.join(['image_path', 'dhash', 'content_hash', 'duplicate_of'] + self._part_columns)
+            placeholders = ', '.join('?' * (4 + self.chunks))
+            self._conn.executemany(f"INSERT OR REPLACE INTO image_hashes ({columns}) VALUES ({placeholders})",
+                                   self._new)
+            self._conn.commit()
+            self._hashes = array('Q')
+            self._paths = []
+            self._positions = {}
+            self._content_hashes = {}
+            self._duplicate_of = {}
+            self._tables = [{} for _ in range(self.chunks)]
+            self._new = []
+            self._unsaved = set()
+
+    def close(self):
+        if self._conn is not None:
+            self.save()
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def index_images(index, paths, workers=1, chunksize=256):
+    """Hash images on a process pool and add them to `index` in order
+
+    Images already indexed are skipped. Returns (added, unreadable).
+    """
+    paths = [path for path in paths if path not in index]
+    added = unreadable = 0
+
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        hashed = executor.map(hash_image, paths, chunksize=chunksize)
+    else:
+        executor = None
+        hashed = map(hash_image, paths)
+
+    try:
+        for path, value, content_hash in hashed:
+            if value is None:
+                unreadable += 1
+                continue
+            index.add(path, value, content_hash)
+            added += 1
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    index.save()
+    return added, unreadable
@@ -0,0 +1,147 @@
+# src/utils/image_manifest.py - Append-only manifest of downloaded images
+import os
+import json
+import zlib
+import threading
+from datetime import datetime
+
+from .raw_lake import file_checksum
+
+DEFAULT_MANIFEST_FILE = 'data/raw/image_manifest.ndjson'
+DEFAULT_OFFSETS_FILE = 'data/state/image_manifest_offsets.json'
+
+
+def message_id_from_path(image_path):
+    """message_id of an image named <message_id>.jpg
+
+    Other names get a stable number from their CRC32 (Python's hash() of a
+    string changes with every interpreter, so it cannot identify a file).
+    """
+    stem = os.path.splitext(os.path.basename(image_path))[0]
+    try:
+        return int(stem)
+    except ValueError:
+        return zlib.crc32(stem.encode('utf-8')) % 1000000
+
+
+class ImageManifest:
+    """NDJSON log of every image the scraper saves, one line per image
+
+    {"path": ..., "size": ..., "mtime": ..., "content_hash": ..., "message_id": ..., "channel_name": ...}
+
+    Consumers (e.g. YOLO) remember the byte offset they have read up to, so
+    finding new images only reads the lines appended since, instead of
+    listing every file under data/raw/images.
+
+    Usage:
+        manifest = ImageManifest()
+        manifest.append(path, message_id, channel_name)       # scraper
+        for entry, offset in manifest.read(manifest.offset('yolo')):
+            ...
+        manifest.commit('yolo', offset)                       # after processing
+    """
+
+    def __init__(self, path=DEFAULT_MANIFEST_FILE, offsets_file=DEFAULT_OFFSETS_FILE):
+        self.path = path
+        self.offsets_file = offsets_file
+        self._lock = threading.Lock()
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def entry(self, image_path, message_id, channel_name):
+        """Manifest line of an image on disk"""
+        stat = os.stat(image_path)
+        return {
+            'path': image_path,
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'content_hash': file_checksum(image_path),
+            'message_id': message_id,
+            'channel_name': channel_name,
+            'added_at': datetime.now().isoformat()
+        }
+
+    def append(self, image_path, message_id, channel_name):
+        """Record a saved image (safe to call from several threads)"""
+        line = json.dumps(self.entry(image_path, message_id, channel_name), ensure_ascii=False) + "\n"
+        with self._lock:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+    def read(self, offset=0):
+        """Yield (entry, offset after it) for lines from byte `offset` on
+
+        A half-written last line (scraper still appending) is left for the
+        next read. An offset past the end, or not at the start of a line,
+        means the manifest was rebuilt, so reading starts over.
+        """
+        if not self.exists():
+            return
+        if offset > os.path.getsize(self.path):
+            offset = 0
+
+        with open(self.path, 'rb') as f:
+            if offset:
+                f.seek(offset - 1)
+                if f.read(1) != b"\n":
+                    offset = 0
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                if line.strip():
+                    yield json.loads(line), offset
+
+    def offset(self, consumer):
+        """Byte offset a consumer has processed up to"""
+        if not os.path.exists(self.offsets_file):
+            return 0
+        with open(self.offsets_file, 'r', encoding='utf-8') as f:
+            return json.load(f).get(consumer, 0)
+
+    def commit(self, consumer, offset):
+        """Remember that a consumer processed everything before `offset`"""
+        offsets = {}
+        if os.path.exists(self.offsets_file):
+            with open(self.offsets_file, 'r', encoding='utf-8') as f:
+                offsets = json.load(f)
+        offsets[consumer] = offset
+        self._write_offsets(offsets)
+
+    def _write_offsets(self, offsets):
+        if os.path.dirname(self.offsets_file):
+            os.makedirs(os.path.dirname(self.offsets_file), exist_ok=True)
+        partial = f"{self.offsets_file}.tmp"
+        with open(partial, 'w', encoding='utf-8') as f:
+            json.dump(offsets, f, indent=2)
+        os.replace(partial, self.offsets_file)
+
+    def rebuild(self, images_dir='data/raw/images'):
+        """Write a manifest of the images already on disk (one-off, for older trees)
+
+        Byte offsets into the old manifest mean nothing in the new one, so
+        every consumer starts over (their cursors still skip what they have
+        processed). Returns the number of images recorded.
+        """
+        count = 0
+        partial = f"{self.path}.tmp"
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(partial, 'w', encoding='utf-8') as f:
+            for channel_name in sorted(os.listdir(images_dir)):
+                channel_dir = os.path.join(images_dir, channel_name)
+                if not os.path.isdir(channel_dir):
+                    continue
+                names = [name for name in os.listdir(channel_dir) if name.endswith('.jpg')]
+                for name in sorted(names, key=message_id_from_path):
+                    path = os.path.join(channel_dir, name)
+                    entry = self.entry(path, message_id_from_path(path), channel_name)
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                    count += 1
+        os.replace(partial, self.path)
+        self._write_offsets({})
+        return count
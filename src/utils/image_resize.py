@@ -0,0 +1,121 @@
+# src/utils/image_resize.py - Inference-size copies and thumbnails of scraped images
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from .raw_lake import file_checksum
+
+DEFAULT_RESIZED_DIR = 'data/cache/images'
+
+# Longest side of the copies YOLO reads (its default imgsz) and of API thumbnails
+INFERENCE_SIZE = 640
+THUMBNAIL_SIZE = 256
+
+JPEG_QUALITY = 90
+
+
+def resize_image(source, destination, max_side, quality=JPEG_QUALITY):
+    """Write a copy of `source` no larger than max_side x max_side
+
+    JPEGs are decoded in draft mode, straight at the smallest power-of-two
+    scale that is still at least max_side, instead of decoding every pixel
+    and throwing most of them away. Images already small enough are copied
+    as they are. Returns the original (width, height).
+    """
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    partial = f"{destination}.{os.getpid()}.tmp"
+
+    with Image.open(source) as img:
+        size = img.size
+        if max(size) <= max_side and img.format == 'JPEG':
+            shutil.copyfile(source, partial)
+        else:
+            img.draft('RGB', (max_side, max_side))
+            img = img.convert('RGB')
+            img.thumbnail((max_side, max_side), Image.BILINEAR)
+            img.save(partial, 'JPEG', quality=quality)
+
+    # Atomic, so readers never see half-written files
+    os.replace(partial, destination)
+    return size
+
+
+class ResizedImageCache:
+    """Content-addressed directory of pre-resized images
+
+    Copies are stored as <root>/<size>/<sha[:2]>/<sha>.jpg, keyed by the
+    content hash of the original, so reposts share one copy and a changed
+    file gets a new one. Inference reads the INFERENCE_SIZE copy instead of
+    decoding the full-size download every run; the API can serve thumbnails.
+
+    Usage:
+        resized = ResizedImageCache()
+        resized.preprocess_all(paths, workers=4)
+        copy = resized.inference_copy(path)
+    """
+
+    def __init__(self, root=DEFAULT_RESIZED_DIR, inference_size=INFERENCE_SIZE, thumbnail_size=THUMBNAIL_SIZE):
+        self.root = root
+        self.inference_size = inference_size
+        self.thumbnail_size = thumbnail_size
+
+    def path(self, content_hash, size):
+        return os.path.join(self.root, str(size), content_hash[:2], f"{content_hash}.jpg")
+
+    def inference_path(self, content_hash):
+        return self.path(content_hash, self.inference_size)
+
+    def thumbnail_path(self, content_hash):
+        return self.path(content_hash, self.thumbnail_size)
+
+    def inference_copy(self, image_path, content_hash=None):
+        """Path of the inference-size copy of an image, or None if not preprocessed yet"""
+        copy = self.inference_path(content_hash or file_checksum(image_path))
+        return copy if os.path.exists(copy) else None
+
+    def preprocess(self, image_path):
+        """Create the missing copies of one image; returns how many were written"""
+        content_hash = file_checksum(image_path)
+        written = 0
+        source = image_path
+        # Largest first, so smaller copies are made from the previous copy
+        for size in sorted({self.inference_size, self.thumbnail_size}, reverse=True):
+            destination = self.path(content_hash, size)
+            if not os.path.exists(destination):
+                resize_image(source, destination, size)
+                written += 1
+            source = destination
+        return written
+
+    def preprocess_all(self, paths, workers=1, chunksize=64):
+        """Preprocess images on a process pool
+
+        Returns (images, copies written, failed). Already preprocessed images
+        only cost a checksum.
+        """
+        paths = list(paths)
+        written = failed = 0
+
+        if workers > 1 and len(paths) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_preprocess, [(self, path) for path in paths], chunksize=chunksize))
+        else:
+            results = [_preprocess((self, path)) for path in paths]
+
+        for result in results:
+            if result is None:
+                failed += 1
+            else:
+                written += result
+        return len(paths), written, failed
+
+
+def _preprocess(task):
+    """Preprocess one image in a pool worker (None if unreadable)"""
+    resized, image_path = task
+    try:
+        return resized.preprocess(image_path)
+    except OSError:
+        return None
@@ -0,0 +1,171 @@
+# src/utils/parquet_lake.py - Columnar Parquet partitions for the raw data lake
+#
+# Layout: data/raw/telegram_messages/YYYY-MM-DD/{channel}.{part:04d}.parquet
+# Same partitioning as the NDJSON files (date directory, one file set per
+# channel), typed with the columns of raw.telegram_messages.
+import os
+from datetime import datetime
+
+DEFAULT_ROW_GROUP_SIZE = 10000
+
+# Column name -> pyarrow type name, mirrors raw.telegram_messages
+MESSAGE_COLUMNS = [
+    ('message_id', 'int32'),
+    ('channel_name', 'string'),
+    ('message_date', 'timestamp'),
+    ('message_text', 'string'),
+    ('has_media', 'bool'),
+    ('image_path', 'string'),
+    ('views', 'int32'),
+    ('forwards', 'int32'),
+    ('scraped_at', 'timestamp'),
+]
+
+TIMESTAMP_COLUMNS = [name for name, kind in MESSAGE_COLUMNS if kind == 'timestamp']
+
+
+def _pyarrow():
+    """pyarrow is optional, only needed for Parquet output"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet support requires the pyarrow package: pip install pyarrow")
+    return pyarrow
+
+
+def message_schema():
+    """Typed Arrow schema matching raw.telegram_messages"""
+    pa = _pyarrow()
+    types = {
+        'int32': pa.int32(),
+        'string': pa.string(),
+        'bool': pa.bool_(),
+        'timestamp': pa.timestamp('us'),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in MESSAGE_COLUMNS])
+
+
+def _to_datetime(value):
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def rows_to_table(rows):
+    """Build a typed Arrow table from message dicts"""
+    pa = _pyarrow()
+    columns = {name: [row.get(name) for row in rows] for name, _ in MESSAGE_COLUMNS}
+    for name in TIMESTAMP_COLUMNS:
+        columns[name] = [_to_datetime(v) for v in columns[name]]
+    return pa.Table.from_pydict(columns, schema=message_schema())
+
+
+class ParquetWriter:
+    """Row-group buffered Parquet writer for one channel of a partition
+
+    Same interface as raw_lake.NDJSONWriter. Parquet files cannot be appended
+    to, so every writer session produces a new part; `compact_partition`
+    merges them back together.
+    """
+
+    def __init__(self, path, compression='snappy', row_group_size=DEFAULT_ROW_GROUP_SIZE):
+        self.path = path
+        self.compression = compression or 'snappy'
+        self.row_group_size = row_group_size
+        self.count = 0
+        self.paths = []
+
+        self._rows = []
+        self._writer = None
+
+    def _flush(self):
+        if not self._rows:
+            return
+
+        if self._writer is None:
+            pq = _pyarrow().parquet
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._writer = pq.ParquetWriter(self.path, message_schema(), compression=self.compression)
+            self.paths.append(self.path)
+
+        self._writer.write_table(rows_to_table(self._rows))
+        self._rows = []
+
+    def write(self, record):
+        """Buffer one message, flushing a row group when full"""
+        self._rows.append(record)
+        self.count += 1
+        if len(self._rows) >= self.row_group_size:
+            self._flush()
+
+    def write_all(self, records):
+        for record in records:
+            self.write(record)
+        return self.count
+
+    def close(self):
+        self._flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def iter_parquet(path, columns=None, batch_size=DEFAULT_ROW_GROUP_SIZE):
+    """Yield messages from a Parquet file, one row group batch at a time
+
+    Timestamps are returned as ISO strings, like in the NDJSON files.
+    """
+    pq = _pyarrow().parquet
+    parquet_file = pq.ParquetFile(path)
+
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+        for row in batch.to_pylist():
+            for name in TIMESTAMP_COLUMNS:
+                if row.get(name) is not None:
+                    row[name] = row[name].isoformat()
+            yield row
+
+
+def read_table(paths, columns=None):
+    """Read Parquet files into a pandas DataFrame, only loading `columns`"""
+    pa = _pyarrow()
+    pq = pa.parquet
+
+    if isinstance(paths, str):
+        paths = [paths]
+
+    tables = [pq.read_table(path, columns=columns) for path in paths]
+    if not tables:
+        return None
+    return pa.concat_tables(tables).to_pandas()
+
+
+def compact_files(paths, target, compression='snappy', row_group_size=DEFAULT_ROW_GROUP_SIZE):
+    """Merge Parquet files into `target`, streaming row groups
+
+    The merged file is written next to the target and swapped in atomically,
+    then the source files are removed. Returns the number of rows.
+    """
+    pq = _pyarrow().parquet
+    tmp_path = f'{target}.tmp'
+    rows = 0
+
+    with pq.ParquetWriter(tmp_path, message_schema(), compression=compression) as writer:
+        for path in paths:
+            parquet_file = pq.ParquetFile(path)
+            for batch in parquet_file.iter_batches(batch_size=row_group_size):
+                writer.write_batch(batch)
+                rows += batch.num_rows
+
+    os.replace(tmp_path, target)
+    for path in paths:
+        if os.path.abspath(path) != os.path.abspath(target):
+            os.remove(path)
+    return rows
@@ -0,0 +1,107 @@
+# src/utils/pg_copy.py - Stream Python rows into PostgreSQL COPY FROM STDIN
+import io
+import time
+from datetime import datetime
+
+NULL = '\\N'
+
+# Escape backslash first so the other escapes are not doubled
+_ESCAPES = [
+    ('\\', '\\\\'),
+    ('\t', '\\t'),
+    ('\n', '\\n'),
+    ('\r', '\\r'),
+]
+
+
+def copy_value(value):
+    """Format one value for COPY text format"""
+    if value is None:
+        return NULL
+    if value is True:
+        return 't'
+    if value is False:
+        return 'f'
+
+    if isinstance(value, str):
+        # str.replace is much faster than str.translate on non-ASCII text
+        for char, escaped in _ESCAPES:
+            if char in value:
+                value = value.replace(char, escaped)
+        return value
+
+    if isinstance(value, (list, tuple)):
+        return copy_value(array_literal(value))
+
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def array_literal(values):
+    """Format a list as a PostgreSQL array literal, e.g. {1.5,NULL,"cell phone"}"""
+    items = []
+    for value in values:
+        if value is None:
+            items.append('NULL')
+        elif isinstance(value, str):
+            items.append('"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"')
+        else:
+            items.append(str(value))
+    return '{' + ','.join(items) + '}'
+
+
+def copy_line(values):
+    """Format one row for COPY text format"""
+    return '\t'.join([copy_value(v) for v in values]) + '\n'
+
+
+class CopyStream(io.TextIOBase):
+    """Read-only file object over an iterator of rows, for cursor.copy_expert
+
+    Rows are formatted lazily as COPY reads, so nothing but the current
+    chunk is held in memory. Calls `on_progress(rows, rows_per_sec)` every
+    `progress_every` rows.
+    """
+
+    def __init__(self, rows, progress_every=100000, on_progress=None):
+        self._rows = iter(rows)
+        self._buffer = ''
+        self.rows = 0
+        self.progress_every = progress_every
+        self.on_progress = on_progress
+        self.started = time.perf_counter()
+
+    def readable(self):
+        return True
+
+    def _next_line(self):
+        line = copy_line(next(self._rows))
+        self.rows += 1
+        if self.on_progress and self.progress_every and self.rows % self.progress_every == 0:
+            self.on_progress(self.rows, self.rows_per_sec())
+        return line
+
+    def read(self, size=-1):
+        chunks = [self._buffer]
+        length = len(self._buffer)
+
+        try:
+            while size < 0 or length < size:
+                line = self._next_line()
+                chunks.append(line)
+                length += len(line)
+        except StopIteration:
+            pass
+
+        data = ''.join(chunks)
+        if size < 0:
+            self._buffer = ''
+            return data
+
+        self._buffer = data[size:]
+        return data[:size]
+
+    def rows_per_sec(self):
+        elapsed = time.perf_counter() - self.started
+        return self.rows / elapsed if elapsed else 0.0
@@ -0,0 +1,36 @@
+# src/utils/rate_limiter.py - Token bucket rate limiter for async scraping
+import asyncio
+import time
+
+
+class AsyncRateLimiter:
+    """Global token bucket shared by all concurrent channel scrapes.
+
+    `rate` is the number of requests allowed per second, `burst` the number
+    of requests that may be issued back to back before throttling kicks in.
+    A rate of 0 (or None) disables limiting.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate or 0)
+        self.burst = float(burst if burst is not None else max(1.0, self.rate))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        """Wait until a request token is available"""
+        if self.rate <= 0:
+            return
+
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
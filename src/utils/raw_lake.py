@@ -0,0 +1,268 @@
+# src/utils/raw_lake.py - Streaming NDJSON reader/writer for the raw data lake
+#
+# Layout: data/raw/telegram_messages/YYYY-MM-DD/{channel}.{part:04d}.ndjson[.gz|.zst]
+# One JSON object per line, so files can be appended to and read back one
+# message at a time. Legacy {channel}.json files (a JSON list) are still readable,
+# and {channel}.{part:04d}.parquet files (see parquet_lake.py) are read the same way.
+import os
+import io
+import re
+import gzip
+import json
+import hashlib
+
+from .parquet_lake import ParquetWriter, iter_parquet, compact_files
+
+RAW_MESSAGES_DIR = 'data/raw/telegram_messages'
+
+# Rotate to a new part once a file reaches this size (bytes)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+COMPRESSION_SUFFIXES = {
+    None: '',
+    'gzip': '.gz',
+    'zstd': '.zst',
+}
+
+LAKE_FILE_PATTERN = re.compile(r'^(?P<channel>[^.]+)(\.(?P<part>\d{4}))?\.(?P<format>ndjson|json|parquet)(?P<suffix>\.gz|\.zst)?$')
+
+FORMATS = ['ndjson', 'parquet']
+
+
+def _zstd():
+    """zstandard is optional, only needed for .zst files"""
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("zstd compression requires the zstandard package: pip install zstandard")
+    return zstandard
+
+
+def open_text(path, mode='r'):
+    """Open a lake file as text, transparently (de)compressing by suffix
+
+    `mode` is 'r', 'w' or 'a'. Appending to .gz/.zst files adds a new
+    gzip member / zstd frame, which readers decode as one stream.
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+
+    if path.endswith('.zst'):
+        zstandard = _zstd()
+        raw = open(path, mode + 'b')
+        if mode == 'r':
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+        else:
+            stream = zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding='utf-8')
+
+    return open(path, mode, encoding='utf-8')
+
+
+def parse_lake_filename(filename):
+    """Split a lake file name into (channel, part, format), or None if it is not a lake file"""
+    match = LAKE_FILE_PATTERN.match(filename)
+    if not match:
+        return None
+    return match.group('channel'), int(match.group('part') or 0), match.group('format')
+
+
+def channel_files(directory, channel):
+    """All lake files of a channel in a partition directory, oldest part first"""
+    if not os.path.isdir(directory):
+        return []
+
+    files = []
+    for filename in os.listdir(directory):
+        parsed = parse_lake_filename(filename)
+        if parsed and parsed[0] == channel:
+            files.append((parsed[1], os.path.join(directory, filename)))
+    return [path for _, path in sorted(files)]
+
+
+def lake_files(directory):
+    """All lake files in a partition directory, sorted by channel and part"""
+    if not os.path.isdir(directory):
+        return []
+
+    files = []
+    for filename in os.listdir(directory):
+        parsed = parse_lake_filename(filename)
+        if parsed:
+            files.append((parsed[0], parsed[1], os.path.join(directory, filename)))
+    return [path for _, _, path in sorted(files)]
+
+
+def file_checksum(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def next_part(directory, channel):
+    """Part number for a new file of a channel"""
+    parts = [parse_lake_filename(os.path.basename(path))[1] for path in channel_files(directory, channel)]
+    return max(parts) + 1 if parts else 0
+
+
+def iter_records(path, columns=None):
+    """Yield messages from a lake file one at a time
+
+    `columns` only applies to Parquet files, which can skip unneeded columns.
+    """
+    parsed = parse_lake_filename(os.path.basename(path))
+
+    if parsed and parsed[2] == 'parquet':
+        yield from iter_parquet(path, columns=columns)
+        return
+
+    if parsed and parsed[2] == 'json':
+        # Legacy layout: one JSON list per file
+        with open_text(path) as f:
+            yield from json.load(f)
+        return
+
+    with open_text(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def iter_partition(directory, columns=None):
+    """Yield every message of a date partition"""
+    for path in lake_files(directory):
+        yield from iter_records(path, columns=columns)
+
+
+def open_writer(directory, channel, fmt='ndjson', compression=None, max_bytes=DEFAULT_MAX_BYTES,
+                overwrite=False):
+    """Streaming writer for one channel of a partition, in NDJSON or Parquet"""
+    if fmt == 'ndjson':
+        return NDJSONWriter(directory, channel, compression=compression, max_bytes=max_bytes, overwrite=overwrite)
+
+    if fmt != 'parquet':
+        raise ValueError(f"Unknown lake format: {fmt} (expected one of {FORMATS})")
+
+    os.makedirs(directory, exist_ok=True)
+    if overwrite:
+        for path in channel_files(directory, channel):
+            os.remove(path)
+
+    path = os.path.join(directory, f'{channel}.{next_part(directory, channel):04d}.parquet')
+    return ParquetWriter(path, compression=compression)
+
+
+def compact_partition(directory, compression='snappy'):
+    """Merge each channel's Parquet parts of a partition into a single file
+
+    Returns {channel: rows} for the channels that were compacted.
+    """
+    by_channel = {}
+    for path in lake_files(directory):
+        channel, _, fmt = parse_lake_filename(os.path.basename(path))
+        if fmt == 'parquet':
+            by_channel.setdefault(channel, []).append(path)
+
+    compacted = {}
+    for channel, paths in by_channel.items():
+        if len(paths) > 1:
+            compacted[channel] = compact_files(paths, paths[0], compression=compression)
+    return compacted
+
+
+class NDJSONWriter:
+    """Append-only, size-rotated NDJSON writer for one channel of a partition
+
+    Parts rotate once `max_bytes` of uncompressed lines are written to them.
+    Only uncompressed parts are resumed by a later run; a compressed run
+    starts a new part, since the size of a compressed file on disk says
+    nothing about the lines in it.
+
+    Usage:
+        with NDJSONWriter('data/raw/telegram_messages/2026-01-15', 'chemed') as writer:
+            for message in messages:
+                writer.write(message)
+    """
+
+    def __init__(self, directory, channel, compression=None, max_bytes=DEFAULT_MAX_BYTES, overwrite=False):
+        if compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"Unknown compression: {compression} (expected one of {list(COMPRESSION_SUFFIXES)})")
+
+        self.directory = directory
+        self.channel = channel
+        self.compression = compression
+        self.max_bytes = max_bytes
+        self.count = 0
+        self.paths = []
+
+        self._file = None
+        self._bytes = 0
+
+        os.makedirs(directory, exist_ok=True)
+
+        existing = channel_files(directory, channel)
+        if overwrite:
+            for path in existing:
+                os.remove(path)
+            existing = []
+
+        # Resume the last (uncompressed) part of an earlier run if it still has room
+        self._part = 0
+        for path in existing:
+            parsed = parse_lake_filename(os.path.basename(path))
+            self._part = max(self._part, parsed[1] + 1)
+        if compression is None and existing and existing[-1].endswith(self._part_name(self._part - 1)):
+            last = existing[-1]
+            if os.path.getsize(last) < max_bytes:
+                self._part -= 1
+                self._bytes = os.path.getsize(last)
+
+    def _part_name(self, part):
+        return f'{self.channel}.{part:04d}.ndjson{COMPRESSION_SUFFIXES[self.compression]}'
+
+    def _open(self):
+        path = os.path.join(self.directory, self._part_name(self._part))
+        self._file = open_text(path, 'a')
+        if path not in self.paths:
+            self.paths.append(path)
+
+    def _rotate(self):
+        self._file.close()
+        self._part += 1
+        self._bytes = 0
+        self._open()
+
+    def write(self, record):
+        """Append one message"""
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        size = len(line.encode('utf-8'))
+
+        if self._file is None:
+            self._open()
+        elif self._bytes and self._bytes + size > self.max_bytes:
+            self._rotate()
+
+        self._file.write(line)
+        self._bytes += size
+        self.count += 1
+
+    def write_all(self, records):
+        """Append messages from any iterable (generators included)"""
+        for record in records:
+            self.write(record)
+        return self.count
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
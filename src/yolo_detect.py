@@ -1,137 +1,1113 @@
 # src/yolo_detect.py - COMPLETE YOLO DETECTION
 import os
+import sys
 import csv
-import pandas as pd
+import json
+import time
+import argparse
+import shutil
+import multiprocessing
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from pathlib import Path
-from ultralytics import YOLO
+from PIL import Image
 from datetime import datetime
 import logging
 
+try:
+    from src.utils.cursor_store import CursorStore, DEFAULT_CURSOR_FILE, YOLO as YOLO_STAGE
+    from src.utils.detection_cache import DetectionCache, DEFAULT_CACHE_FILE
+    from src.utils.raw_lake import file_checksum, iter_partition
+    from src.utils.pg_copy import CopyStream
+    from src.utils.box_classifier import BoxClassifier, PERSON_CLASSES, PRODUCT_CLASSES, classify
+    from src.utils.image_hash import ImageHashIndex, DEFAULT_INDEX_FILE, dhash
+    from src.utils.image_resize import ResizedImageCache, DEFAULT_RESIZED_DIR
+    from src.utils.image_manifest import ImageManifest, DEFAULT_MANIFEST_FILE, message_id_from_path
+except ImportError:
+    # Fallback for when running directly: python src/yolo_detect.py
+    from utils.cursor_store import CursorStore, DEFAULT_CURSOR_FILE, YOLO as YOLO_STAGE
+    from utils.detection_cache import DetectionCache, DEFAULT_CACHE_FILE
+    from utils.raw_lake import file_checksum, iter_partition
+    from utils.pg_copy import CopyStream
+    from utils.box_classifier import BoxClassifier, PERSON_CLASSES, PRODUCT_CLASSES, classify
+    from utils.image_hash import ImageHashIndex, DEFAULT_INDEX_FILE, dhash
+    from utils.image_resize import ResizedImageCache, DEFAULT_RESIZED_DIR
+    from utils.image_manifest import ImageManifest, DEFAULT_MANIFEST_FILE, message_id_from_path
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Columns needed by show_summary
+SUMMARY_COLUMNS = ['channel_name', 'image_category', 'detected_class']
+
+# Every box of an image, as parallel arrays (box_xyxy holds 4 floats per box)
+BOX_COLUMNS = ['box_classes', 'box_confidences', 'box_xyxy']
+
+# Columns of raw.yolo_detections written by the loaders, in COPY order
+DETECTION_COLUMNS = [
+    'message_id', 'channel_name', 'image_path', 'detected_class', 'confidence_score',
+    'image_category', 'detection_count', 'detected_at', 'model_version'
+] + BOX_COLUMNS + ['duplicate_of']
+
+# Bump when the cached detection format changes (v2 added boxes, v3 stores them as arrays)
+CACHE_FORMAT = 'v3'
+
+# Rows per INSERT ... ON CONFLICT batch, and bytes handed to COPY per read
+UPSERT_BATCH_SIZE = 1000
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# A re-detected image replaces the earlier row of the same model version
+# (updated_at tells incremental fct_image_detections runs which rows changed)
+DETECTION_UPSERT_CLAUSE = """
+ON CONFLICT (message_id, channel_name, model_version) DO UPDATE SET
+    image_path = EXCLUDED.image_path,
+    detected_class = EXCLUDED.detected_class,
+    confidence_score = EXCLUDED.confidence_score,
+    image_category = EXCLUDED.image_category,
+    detection_count = EXCLUDED.detection_count,
+    detected_at = EXCLUDED.detected_at,
+    box_classes = EXCLUDED.box_classes,
+    box_confidences = EXCLUDED.box_confidences,
+    box_xyxy = EXCLUDED.box_xyxy,
+    duplicate_of = EXCLUDED.duplicate_of,
+    updated_at = CURRENT_TIMESTAMP
+"""
+
+# Images per model call, and threads decoding the next batches meanwhile
+DEFAULT_BATCH_SIZE = 16
+DEFAULT_PREFETCH_WORKERS = 4
+
+# Images that fail this many runs in a row stop holding the cursors back
+MAX_DETECTION_ATTEMPTS = 3
+DEFAULT_FAILURES_FILE = 'data/state/failed_images.json'
+
+# Inference backends: PyTorch, or the weights exported once for ONNX Runtime / OpenVINO
+BACKENDS = ['torch', 'onnx', 'onnx-int8', 'openvino']
+DEFAULT_MODELS_DIR = 'data/models'
+
+def load_image(image_path, resized=None):
+    """Decode an image to RGB (runs on the prefetch threads)
+    
+    With a ResizedImageCache the pre-resized inference copy is decoded when
+    it exists; the original size is kept in info['original_size'] so boxes
+    can be scaled back to the downloaded image.
+    """
+    copy = resized.inference_copy(image_path) if resized is not None else None
+    if copy is None:
+        with Image.open(image_path) as img:
+            return img.convert('RGB')
+    
+    with Image.open(image_path) as original:
+        # Only reads the header
+        original_size = original.size
+    with Image.open(copy) as img:
+        image = img.convert('RGB')
+    image.info['original_size'] = original_size
+    return image
+
+def box_scale(image):
+    """Factor from an image's pixels to its original download's pixels"""
+    if not isinstance(image, Image.Image):
+        return 1.0
+    return image.info.get('original_size', image.size)[0] / image.width
+
+def rescale_boxes(detections, image_path, original_path):
+    """Detections of a near-duplicate's original, with boxes in the near-duplicate's pixels
+    
+    Reposts are often resized copies. Boxes are dropped when either size
+    cannot be read (e.g. the original was deleted).
+    """
+    try:
+        with Image.open(image_path) as img:
+            width, height = img.size
+        with Image.open(original_path) as img:
+            original_width, original_height = img.size
+    except OSError:
+        return dict(detections, xyxy=[])
+    
+    if (width, height) == (original_width, original_height):
+        return detections
+    scales = (width / original_width, height / original_height)
+    xyxy = [round(value * scales[i % 2], 1) for i, value in enumerate(detections['xyxy'])]
+    return dict(detections, xyxy=xyxy)
+
+def create_detections_table(conn):
+    """Create raw.yolo_detections with its unique key
+    
+    Tables created by earlier versions have no model_version column and may
+    hold duplicate rows; those rows are tagged 'legacy' and deduplicated
+    (keeping the latest) before the unique index is built.
+    """
+    cur = conn.cursor()
+    cur.execute("CREATE SCHEMA IF NOT EXISTS raw;")
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS raw.yolo_detections (
+        id SERIAL PRIMARY KEY,
+        message_id INTEGER,
+        channel_name VARCHAR(255),
+        image_path TEXT,
+        detected_class VARCHAR(100),
+        confidence_score FLOAT,
+        image_category VARCHAR(50),
+        detection_count INTEGER,
+        detected_at TIMESTAMP,
+        model_version VARCHAR(100),
+        box_classes TEXT[],
+        box_confidences REAL[],
+        box_xyxy REAL[],
+        duplicate_of TEXT,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """)
+    
+    cur.execute("""
+    SELECT 1 FROM pg_indexes
+    WHERE schemaname = 'raw' AND tablename = 'yolo_detections' AND indexname = 'idx_unique_detection'
+    """)
+    if cur.fetchone() is None:
+        cur.execute("ALTER TABLE raw.yolo_detections ADD COLUMN IF NOT EXISTS model_version VARCHAR(100)")
+        cur.execute("UPDATE raw.yolo_detections SET model_version = 'legacy' WHERE model_version IS NULL")
+        cur.execute("""
+        DELETE FROM raw.yolo_detections a
+        USING raw.yolo_detections b
+        WHERE a.message_id = b.message_id
+          AND a.channel_name = b.channel_name
+          AND a.model_version = b.model_version
+          AND a.id < b.id
+        """)
+        cur.execute("""
+        CREATE UNIQUE INDEX idx_unique_detection
+        ON raw.yolo_detections (message_id, channel_name, model_version)
+        """)
+    
+    # Per-box arrays and near-duplicate links (missing from tables of earlier versions)
+    cur.execute("""
+    ALTER TABLE raw.yolo_detections
+        ADD COLUMN IF NOT EXISTS box_classes TEXT[],
+        ADD COLUMN IF NOT EXISTS box_confidences REAL[],
+        ADD COLUMN IF NOT EXISTS box_xyxy REAL[],
+        ADD COLUMN IF NOT EXISTS duplicate_of TEXT
+    """)
+
+    # Last insert, re-detection or reclassification of a row; earlier rows count from detected_at
+    cur.execute("""
+    SELECT 1 FROM information_schema.columns
+    WHERE table_schema = 'raw' AND table_name = 'yolo_detections' AND column_name = 'updated_at'
+    """)
+    if cur.fetchone() is None:
+        cur.execute("ALTER TABLE raw.yolo_detections ADD COLUMN updated_at TIMESTAMP")
+        cur.execute("UPDATE raw.yolo_detections SET updated_at = detected_at")
+        cur.execute("ALTER TABLE raw.yolo_detections ALTER COLUMN updated_at SET DEFAULT CURRENT_TIMESTAMP")
+    
+    # Incremental fct_image_detections runs only read rows updated since the mart's last run
+    cur.execute("DROP INDEX IF EXISTS raw.idx_detections_detected_at")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_detections_updated_at ON raw.yolo_detections (updated_at)")
+    conn.commit()
+
+def detection_row(result):
+    """Column values of a detection, in DETECTION_COLUMNS order"""
+    return tuple(result.get(column) for column in DETECTION_COLUMNS)
+
+def latest_detections(df):
+    """One row per (message_id, channel_name, model_version), the last one saved"""
+    if 'model_version' not in df:
+        # Files saved before model versions were tracked
+        df = df.assign(model_version='legacy')
+    return df.drop_duplicates(['message_id', 'channel_name', 'model_version'], keep='last')
+
+def copy_detections(cur, results):
+    """Stream detections through COPY into a staging table, then upsert them
+    
+    Returns (rows streamed, rows inserted or updated).
+    """
+    columns = ', '.join(DETECTION_COLUMNS)
+    cur.execute("""
+    CREATE TEMP TABLE IF NOT EXISTS staging_yolo_detections
+    (LIKE raw.yolo_detections INCLUDING DEFAULTS) ON COMMIT DELETE ROWS
+    """)
+    
+    stream = CopyStream(detection_row(result) for result in results)
+    cur.copy_expert(f"COPY staging_yolo_detections ({columns}) FROM STDIN", stream, size=COPY_CHUNK_SIZE)
+    
+    # Latest detection wins when an image appears twice in one load
+    cur.execute(f"""
+    INSERT INTO raw.yolo_detections ({columns})
+    SELECT DISTINCT ON (message_id, channel_name, model_version) {columns}
+    FROM staging_yolo_detections
+    ORDER BY message_id, channel_name, model_version, detected_at DESC NULLS LAST
+    {DETECTION_UPSERT_CLAUSE}
+    """)
+    return stream.rows, cur.rowcount
+
+def upsert_detections(cur, results, batch_size=UPSERT_BATCH_SIZE):
+    """Batched INSERT ... ON CONFLICT through execute_values
+    
+    Returns (rows read, rows inserted or updated).
+    """
+    from psycopg2.extras import execute_values
+    
+    sql = f"INSERT INTO raw.yolo_detections ({', '.join(DETECTION_COLUMNS)}) VALUES %s {DETECTION_UPSERT_CLAUSE}"
+    total = 0
+    changed = 0
+    batch = {}
+    
+    def flush():
+        nonlocal changed
+        if batch:
+            execute_values(cur, sql, list(batch.values()), page_size=len(batch))
+            changed += cur.rowcount
+            batch.clear()
+    
+    for result in results:
+        # A statement may not upsert the same key twice: the last row wins
+        key = (result.get('message_id'), result.get('channel_name'), result.get('model_version'))
+        batch[key] = detection_row(result)
+        total += 1
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    
+    return total, changed
+
+def reclassify_detections(conn, min_confidence=0.0, model_version=None, thresholds=None, top_k=None):
+    """Re-derive the image-level columns of raw.yolo_detections from stored boxes
+    
+    Runs the classification rules over box_classes/box_confidences without
+    loading the model (one vectorized BoxClassifier call for all rows), then
+    updates the rows whose result changed in one statement. Rows loaded
+    before boxes were stored are left as they are.
+    Returns (rows checked, rows updated).
+    """
+    cur = conn.cursor()
+    query = "SELECT id, box_classes, box_confidences FROM raw.yolo_detections WHERE box_classes IS NOT NULL"
+    params = []
+    if model_version:
+        query += " AND model_version = %s"
+        params.append(model_version)
+    cur.execute(query, params)
+    
+    stored = cur.fetchall()
+    
+    class_names = [name for _, classes, _ in stored for name in classes]
+    classifier = BoxClassifier(sorted(set(class_names)), thresholds=thresholds,
+                               min_confidence=min_confidence, top_k=top_k)
+    summary = classifier.summarize(
+        classifier.encode(class_names),
+        [conf for _, _, confidences in stored for conf in confidences],
+        [len(classes) for _, classes, _ in stored]
+    )
+    rows = zip([row_id for row_id, _, _ in stored], *(column.tolist() for column in summary))
+    
+    cur.execute("""
+    CREATE TEMP TABLE reclassified_detections (
+        id INTEGER PRIMARY KEY,
+        detected_class VARCHAR(100),
+        confidence_score FLOAT,
+        image_category VARCHAR(50),
+        detection_count INTEGER
+    ) ON COMMIT DROP
+    """)
+    stream = CopyStream(rows)
+    cur.copy_expert("COPY reclassified_detections FROM STDIN", stream, size=COPY_CHUNK_SIZE)
+    cur.execute("""
+    UPDATE raw.yolo_detections y SET
+        detected_class = r.detected_class,
+        confidence_score = r.confidence_score,
+        image_category = r.image_category,
+        detection_count = r.detection_count,
+        updated_at = CURRENT_TIMESTAMP
+    FROM reclassified_detections r
+    WHERE y.id = r.id
+      AND (y.detected_class, y.confidence_score, y.image_category, y.detection_count)
+          IS DISTINCT FROM (r.detected_class, r.confidence_score, r.image_category, r.detection_count)
+    """)
+    updated = cur.rowcount
+    conn.commit()
+    return stream.rows, updated
+
+def get_connection():
+    """Connect to the warehouse on PORT 5433"""
+    import psycopg2
+    return psycopg2.connect(
+        host="localhost",
+        database="medical_warehouse",
+        user="postgres",
+        password="postgres",
+        port="5433"
+    )
+
+def load_yolo(path, **kwargs):
+    """Load a YOLO model, importing ultralytics (and torch) only now
+    
+    Importing them takes seconds, so the module stays cheap to import for
+    runs with no new images, --reclassify, the loaders and the tests.
+    """
+    from ultralytics import YOLO
+    return YOLO(path, **kwargs)
+
+def export_model(weights, backend='onnx', models_dir=DEFAULT_MODELS_DIR, imgsz=640):
+    """Path of `weights` exported for `backend`, exporting on first use
+    
+    Exports are named after the checksum of the weights, so new weights get
+    a new export instead of a stale one. 'onnx-int8' additionally quantizes
+    the ONNX weights to 8 bits (ONNX Runtime dynamic quantization).
+    """
+    if backend == 'torch':
+        return weights
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+    
+    if not os.path.exists(weights):
+        # Named weights like yolov8n.pt are downloaded by ultralytics
+        load_yolo(weights)
+    if not os.path.exists(weights):
+        raise ValueError(f"Exporting needs a weights file, {weights!r} is not one")
+    
+    os.makedirs(models_dir, exist_ok=True)
+    stem = f"{Path(weights).stem}-{file_checksum(weights)[:12]}"
+    export_format = 'openvino' if backend == 'openvino' else 'onnx'
+    target = os.path.join(models_dir, f"{stem}_openvino_model" if export_format == 'openvino' else f"{stem}.onnx")
+    
+    if not os.path.exists(target):
+        logger.info(f"📦 Exporting {weights} to {export_format} (once)...")
+        exported = load_yolo(weights).export(format=export_format, imgsz=imgsz, dynamic=True, verbose=False)
+        shutil.move(str(exported), target)
+    
+    if backend == 'onnx-int8':
+        quantized = os.path.join(models_dir, f"{stem}-int8.onnx")
+        if not os.path.exists(quantized):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            quantize_dynamic(target, quantized, weight_type=QuantType.QUInt8)
+        target = quantized
+    
+    return target
+
+# Detector of a sharded worker process, loaded once per process
+_worker_detector = None
+
+def cap_runtime_threads(backend, threads):
+    """Make the inference runtime of this process use `threads` threads
+    
+    Torch is capped with set_num_threads. ultralytics creates ONNX Runtime
+    and OpenVINO sessions with the runtime's default (every core) and has no
+    option for it, so their session constructors are wrapped. Call before
+    the model is loaded, in worker processes only.
+    """
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+    import torch
+    torch.set_num_threads(threads)
+    
+    if backend in ('onnx', 'onnx-int8'):
+        import onnxruntime
+        
+        class CappedSession(onnxruntime.InferenceSession):
+            def __init__(self, path_or_bytes, sess_options=None, *args, **kwargs):
+                sess_options = sess_options or onnxruntime.SessionOptions()
+                sess_options.intra_op_num_threads = threads
+                sess_options.inter_op_num_threads = 1
+                super().__init__(path_or_bytes, sess_options, *args, **kwargs)
+        
+        onnxruntime.InferenceSession = CappedSession
+    elif backend == 'openvino':
+        import openvino
+        compile_model = openvino.Core.compile_model
+        
+        def capped_compile_model(core, *args, config=None, **kwargs):
+            config = dict(config or {})
+            config.setdefault('INFERENCE_NUM_THREADS', threads)
+            return compile_model(core, *args, config=config, **kwargs)
+        
+        openvino.Core.compile_model = capped_compile_model
+
+def _init_worker(options, threads):
+    """Load the model once in a worker and cap its runtime's threads"""
+    global _worker_detector
+    cap_runtime_threads(options.get('backend', 'torch'), threads)
+    _worker_detector = YOLODetector(**options)
+
+def _detect_shard(items):
+    """Detect one shard of (image_path, message_id, channel_name) items"""
+    return list(_worker_detector.infer(items))
+
 class YOLODetector:
-    def __init__(self):
-        # Load YOLOv8 nano model (small & fast)
-        self.model = YOLO('yolov8n.pt')
+    def __init__(self, cursor_file=DEFAULT_CURSOR_FILE, batch_size=DEFAULT_BATCH_SIZE,
+                 prefetch_workers=DEFAULT_PREFETCH_WORKERS, device=None, weights='yolov8n.pt',
+                 cache_file=DEFAULT_CACHE_FILE, class_thresholds=None, top_k=None,
+                 index_file=DEFAULT_INDEX_FILE, resized_dir=DEFAULT_RESIZED_DIR, backend='torch',
+                 conf=None, manifest_file=DEFAULT_MANIFEST_FILE, failures_file=DEFAULT_FAILURES_FILE):
+        # YOLOv8 nano model (small & fast), loaded on first use (see the model property)
+        self.backend = backend
+        self._model = None
+        self.device = device
+        self.weights = weights
+        
+        # Minimum box confidence (None keeps the ultralytics default of 0.25)
+        self.conf = conf
+        
+        # Batched inference: batch_size=1 runs the original one-image-at-a-time path
+        self.batch_size = batch_size
+        self.prefetch_workers = prefetch_workers
         
         # Define detection classes we care about
-        self.person_classes = ['person']
-        self.product_classes = ['bottle', 'cup', 'vase', 'handbag', 'cell phone', 'laptop']
+        self.person_classes = list(PERSON_CLASSES)
+        self.product_classes = list(PRODUCT_CLASSES)
+        
+        # Per-class confidence thresholds and top-k boxes used to categorize images
+        self.class_thresholds = class_thresholds
+        self.top_k = top_k
+        self._classifier = None
+        # Class names taken from the detection cache, so cache hits never load the model
+        self.class_names = None
         
-        # Output file
+        # Output files, appended to by every run (Parquet lets analytics read only the columns they need)
         self.output_csv = 'data/yolo_detections.csv'
+        # A directory with one part-<timestamp>.parquet per run
+        self.output_parquet = 'data/yolo_detections.parquet'
+        
+        # Shared per-channel cursors: only images newer than the last run are detected
+        self.cursors = CursorStore(cursor_file)
+        
+        # Detections per image content hash (None disables the cache)
+        self.cache_file = cache_file
+        self._model_version = None
+        
+        # Perceptual hashes of every image seen, to spot near-duplicates (None disables)
+        self.index_file = index_file
+        self.duplicates = {}
+        
+        # Pre-resized inference copies and thumbnails (None decodes the full-size originals)
+        self.resized = ResizedImageCache(resized_dir) if resized_dir else None
+        
+        # Images written by the scraper, read from where the last run stopped
+        self.manifest = ImageManifest(manifest_file) if manifest_file else None
+        self.manifest_offset = None
+        self.known_hashes = {}
+        
+        # Newest message_id detected per channel, committed once the rows are loaded
+        self.newest = {}
+        # Paths counted in self.newest -> start of their manifest line (None without a manifest)
+        self.item_offsets = {}
+        
+        # Images that could not be detected -> failed attempts, saved with the cursors
+        self.failures_file = failures_file
+        self.failures = {}
+        if failures_file and os.path.exists(failures_file):
+            with open(failures_file, 'r', encoding='utf-8') as f:
+                self.failures = json.load(f)
         
         # Create directories
         os.makedirs('data', exist_ok=True)
         os.makedirs('logs', exist_ok=True)
     
+    @property
+    def model(self):
+        """The YOLO model, loaded (and exported for non-PyTorch backends) on first use"""
+        if self._model is None:
+            started = time.perf_counter()
+            self._model = load_yolo(export_model(self.weights, self.backend), task='detect')
+            logger.info(f"  Loaded {self.weights} ({self.backend}) in {time.perf_counter() - started:.2f}s")
+        return self._model
+    
+    @property
+    def classifier(self):
+        """Vectorized categorizer, with class masks built once from the class names
+        
+        The names come from the detection cache when it has them, otherwise
+        from the model (which loads it).
+        """
+        if self._classifier is None:
+            names = self.class_names if self.class_names is not None else self.model.names
+            self._classifier = BoxClassifier(names, self.person_classes, self.product_classes,
+                                             thresholds=self.class_thresholds, top_k=self.top_k)
+        return self._classifier
+    
     def classify_image(self, detections):
         """Classify image based on detected objects"""
-        detected_objects = [det['class_name'] for det in detections]
+        detected_objects = [self.model.names[class_id] for class_id in detections['class_ids']]
+        return classify(detected_objects, self.person_classes, self.product_classes)
+    
+    def model_version(self):
+        """Identifies the weights, so detections of different models are kept apart
         
-        has_person = any(obj in self.person_classes for obj in detected_objects)
-        has_product = any(obj in self.product_classes for obj in detected_objects)
+        Exported backends get their own version (e.g. yolov8n.pt:1a2b3c+onnx-int8),
+        since quantized or re-compiled models can find slightly different boxes.
+        """
+        if self._model_version is None:
+            if os.path.exists(self.weights):
+                self._model_version = f"{os.path.basename(self.weights)}:{file_checksum(self.weights)[:12]}"
+            else:
+                self._model_version = self.weights
+            if self.backend != 'torch':
+                self._model_version += f"+{self.backend}"
+        return self._model_version
+    
+    def cache_namespace(self):
+        """Detection cache entries are shared only with runs of the same model and settings
         
-        if has_person and has_product:
-            return 'promotional'
-        elif has_product and not has_person:
-            return 'product_display'
-        elif has_person and not has_product:
-            return 'lifestyle'
-        else:
-            return 'other'
+        Another --conf, or full-size originals instead of resized copies
+        (--no-resize), can find other boxes for the same image.
+        """
+        conf = 'default' if self.conf is None else self.conf
+        images = f"resized{self.resized.inference_size}" if self.resized is not None else 'full'
+        return f"{self.model_version()}/conf={conf}/{images}/{CACHE_FORMAT}"
+    
+    def predict(self, source):
+        """Run the model on an image path, a decoded image or a list of them"""
+        options = {} if self.conf is None else {'conf': self.conf}
+        return self.model(source, verbose=False, device=self.device, **options)
+    
+    def extract_detections(self, result, scale=1.0):
+        """Boxes of one image's YOLO result as plain arrays
+        
+        {'class_ids': [...], 'confidences': [...], 'xyxy': [x1, y1, x2, y2, ...]},
+        read from the whole cls/conf/xyxy tensors at once rather than box by box.
+        `scale` maps boxes found on a resized copy back to the original image.
+        """
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return {'class_ids': [], 'confidences': [], 'xyxy': []}
+        
+        boxes = boxes.cpu().numpy()
+        return {
+            'class_ids': boxes.cls.astype(int).tolist(),
+            'confidences': boxes.conf.astype(float).round(4).tolist(),
+            'xyxy': (boxes.xyxy.astype(float) * scale).round(1).ravel().tolist()
+        }
+    
+    def build_results(self, detected):
+        """Detection rows for a batch of (item, detections), categorized in one call"""
+        detected = list(detected)
+        if not detected:
+            return []
+        class_ids = [class_id for _, detections in detected for class_id in detections['class_ids']]
+        confidences = [conf for _, detections in detected for conf in detections['confidences']]
+        counts = [len(detections['class_ids']) for _, detections in detected]
+        
+        top_classes, top_confidences, categories, detection_counts = self.classifier.summarize(
+            class_ids, confidences, counts)
+        names = self.classifier.names
+        detected_at = datetime.now().isoformat()
+        
+        rows = []
+        for i, ((image_path, message_id, channel_name), detections) in enumerate(detected):
+            rows.append({
+                'message_id': message_id,
+                'channel_name': channel_name,
+                'image_path': image_path,
+                'detected_class': top_classes[i],
+                'confidence_score': float(top_confidences[i]),
+                'image_category': str(categories[i]),
+                'detection_count': int(detection_counts[i]),
+                'detected_at': detected_at,
+                'model_version': self.model_version(),
+                # Every box, so new questions can be answered without re-running the model
+                'box_classes': names[detections['class_ids']].tolist(),
+                'box_confidences': detections['confidences'],
+                'box_xyxy': detections['xyxy'],
+                'duplicate_of': self.duplicates.get(image_path)
+            })
+        return rows
+    
+    def build_result(self, detections, image_path, message_id, channel_name):
+        """Turn the detections of one image into a detection row"""
+        return self.build_results([((image_path, message_id, channel_name), detections)])[0]
     
     def detect_image(self, image_path, message_id, channel_name):
         """Run YOLO detection on single image"""
         try:
             # Run detection
-            results = self.model(image_path, verbose=False)
+            results = self.predict(image_path)
+            return self.build_result(self.extract_detections(results[0]), image_path, message_id, channel_name)
+            
+        except Exception as e:
+            logger.error(f"Error detecting {image_path}: {e}")
+            return None
+    
+    def prefetch_batches(self, items):
+        """Yield batches of (item, decoded image), decoding ahead on a thread pool
+        
+        Up to two batches are decoded ahead, so decoding overlaps with inference
+        without holding every image in memory.
+        """
+        def resolve(ready):
+            batch = []
+            for item, future in ready:
+                try:
+                    batch.append((item, future.result()))
+                except Exception as e:
+                    logger.error(f"Error reading {item[0]}: {e}")
+            return batch
+        
+        with ThreadPoolExecutor(max_workers=max(1, self.prefetch_workers)) as executor:
+            pending = deque()
+            for item in items:
+                pending.append((item, executor.submit(load_image, item[0], self.resized)))
+                if len(pending) >= 2 * self.batch_size:
+                    yield resolve([pending.popleft() for _ in range(self.batch_size)])
             
-            detections = []
-            confidence_scores = []
+            while pending:
+                yield resolve([pending.popleft() for _ in range(min(self.batch_size, len(pending)))])
+    
+    def infer(self, items):
+        """Run the model on (image_path, message_id, channel_name) items
+        
+        Yields (item, detections) per image. With batch_size > 1 images are
+        decoded on background threads and sent to the model in batches; a batch
+        that fails is retried one image at a time. Images that still fail are
+        logged and left out.
+        """
+        if self.batch_size <= 1:
+            for item in items:
+                try:
+                    source = load_image(item[0], self.resized) if self.resized is not None else item[0]
+                    results = self.predict(source)
+                except Exception as e:
+                    logger.error(f"Error detecting {item[0]}: {e}")
+                    continue
+                yield item, self.extract_detections(results[0], box_scale(source))
+            return
+        
+        for batch in self.prefetch_batches(items):
+            if not batch:
+                continue
+            try:
+                results = self.predict([image for _, image in batch])
+            except Exception as e:
+                logger.error(f"Error detecting batch of {len(batch)} images, retrying one at a time: {e}")
+                yield from self.infer_one_by_one(batch)
+                continue
             
-            # Extract detections
-            for result in results:
-                boxes = result.boxes
-                if boxes is not None:
-                    for box in boxes:
-                        class_id = int(box.cls[0])
-                        class_name = self.model.names[class_id]
-                        confidence = float(box.conf[0])
-                        
-                        detections.append({
-                            'class_id': class_id,
-                            'class_name': class_name,
-                            'confidence': confidence
-                        })
-                        confidence_scores.append(confidence)
+            for (item, image), result in zip(batch, results):
+                yield item, self.extract_detections(result, box_scale(image))
+    
+    def infer_one_by_one(self, batch):
+        """Retry the (item, image) pairs of a failed batch one image at a time"""
+        for item, image in batch:
+            try:
+                results = self.predict(image)
+            except Exception as e:
+                logger.error(f"Error detecting {item[0]}: {e}")
+                continue
+            yield item, self.extract_detections(results[0], box_scale(image))
+    
+    def detect_images(self, items):
+        """Run detection on (image_path, message_id, channel_name) items, one row per image"""
+        batch = []
+        for pair in self.infer(items):
+            batch.append(pair)
+            if len(batch) >= max(1, self.batch_size):
+                yield from self.build_results(batch)
+                batch = []
+        yield from self.build_results(batch)
+    
+    def detect_sharded(self, items, workers, threads_per_worker=None):
+        """Run the model in `workers` processes, each loading it once
+        
+        Yields (item, detections) like infer().
+        Items are cut into shards of batch_size images and handed out through
+        the executor's work queue, so fast workers simply take more shards. Each
+        worker's runtime (torch, ONNX Runtime or OpenVINO) uses `threads_per_worker`
+        threads (default: cores / workers) so the processes do not oversubscribe
+        the CPU.
+        """
+        if threads_per_worker is None:
+            threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+        
+        items = list(items)
+        shard_size = max(1, self.batch_size)
+        shards = [items[i:i + shard_size] for i in range(0, len(items), shard_size)]
+        options = {
+            'batch_size': self.batch_size,
+            # Each worker already has its own cores; keep its decoding light
+            'prefetch_workers': min(self.prefetch_workers, threads_per_worker),
+            'device': self.device,
+            'weights': self.weights,
+            'backend': self.backend,
+            'conf': self.conf,
+            'cache_file': None,
+            'index_file': None,
+            'manifest_file': None,
+            'failures_file': None,
+            'resized_dir': self.resized.root if self.resized is not None else None,
+        }
+        
+        logger.info(f"  {len(items)} images in {len(shards)} shards, "
+                    f"{workers} workers x {threads_per_worker} threads")
+        
+        # spawn: forking a process that already holds torch threads can deadlock
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(options, threads_per_worker)) as executor:
+            futures = [executor.submit(_detect_shard, shard) for shard in shards]
+            for future in as_completed(futures):
+                yield from future.result()
+    
+    def run_inference(self, items, workers=1, threads_per_worker=None):
+        """(item, detections) for each item, in this process or sharded across workers"""
+        if workers > 1:
+            return self.detect_sharded(items, workers, threads_per_worker)
+        return self.infer(items)
+    
+    def cached_inference(self, items, cache, workers=1, threads_per_worker=None, index=None):
+        """(item, detections) for each item, running the model only on unseen content
+        
+        Images already in the cache, and repeats of the same content within
+        this run (e.g. a photo reposted in several channels), skip inference.
+        With an ImageHashIndex, near-duplicates (re-encoded, resized or
+        re-compressed reposts) reuse the detections of their original too,
+        with boxes rescaled to their own size, and self.duplicates records
+        which original each one copies.
+        """
+        misses = []
+        repeats = {}
+        near_duplicates = 0
+        # Near-duplicates given their original's detections -> original path
+        reused = {}
+        
+        def own(item, detections):
+            if item[0] in reused:
+                return rescale_boxes(detections, item[0], reused[item[0]])
+            return detections
+        
+        for item in items:
+            try:
+                digest = self.content_hash(item[0])
+                original = index.add(item[0], dhash(item[0]), digest) if index is not None else None
+            except OSError as e:
+                logger.error(f"Error reading {item[0]}: {e}")
+                continue
             
-            # Classify image
-            image_category = self.classify_image(detections)
+            # Near-duplicates share the detections of their original's content
+            key = digest
+            detections = None
+            if original:
+                self.duplicates[item[0]] = original
+                original_digest = index.content_hash(original)
+                if original_digest in repeats:
+                    key = original_digest
+                elif original_digest != digest:
+                    detections = cache.get(original_digest)
+                if original_digest != digest and (key != digest or detections is not None):
+                    reused[item[0]] = original
+                    near_duplicates += 1
             
-            # Get top detection
-            top_detection = max(detections, key=lambda x: x['confidence']) if detections else None
+            if key in repeats:
+                repeats[key].append(item)
+                continue
             
-            return {
-                'message_id': message_id,
-                'channel_name': channel_name,
-                'image_path': image_path,
-                'detected_class': top_detection['class_name'] if top_detection else 'none',
-                'confidence_score': top_detection['confidence'] if top_detection else 0.0,
-                'image_category': image_category,
-                'detection_count': len(detections),
-                'detected_at': datetime.now().isoformat()
-            }
+            if detections is None:
+                detections = cache.get(key)
+            if detections is not None:
+                yield item, own(item, detections)
+                continue
             
-        except Exception as e:
-            logger.error(f"Error detecting {image_path}: {e}")
-            return None
+            repeats[key] = []
+            misses.append((item, key))
+        
+        duplicates = sum(len(repeat) for repeat in repeats.values())
+        logger.info(f"  {duplicates} duplicate images in this run ({near_duplicates} near-duplicates reused), "
+                    f"{len(misses)} images to detect")
+        
+        digests = {item: digest for item, digest in misses}
+        for item, detections in self.run_inference([item for item, _ in misses], workers, threads_per_worker):
+            digest = digests[item]
+            cache.put(digest, detections)
+            yield item, detections
+            for repeat in repeats[digest]:
+                yield repeat, own(repeat, detections)
+        cache.commit()
     
-    def process_all_images(self):
-        """Process all images from Task 1"""
-        logger.info("🔍 Starting YOLO object detection...")
+    def content_hash(self, image_path):
+        """sha256 of an image, taken from the manifest while the file is unchanged"""
+        known = self.known_hashes.get(image_path)
+        if known is not None:
+            stat = os.stat(image_path)
+            if (stat.st_size, stat.st_mtime) == known[:2]:
+                return known[2]
+        return file_checksum(image_path)
+    
+    def manifest_images(self, full_refresh=False, newest=None):
+        """Yield (image_path, message_id, channel_name) from manifest lines not read yet
         
-        all_results = []
-        images_dir = Path('data/raw/images')
+        Only the lines appended since the last run are read (O(new images));
+        self.manifest_offset is where the next run starts once this one succeeds.
+        """
+        newest = {} if newest is None else newest
+        offset = 0 if full_refresh else self.manifest.offset(YOLO_STAGE)
+        self.manifest_offset = offset
+        last_seen = {}
+        seen = set()
         
-        if not images_dir.exists():
-            logger.error(f"Images directory not found: {images_dir}")
-            return []
+        for entry, self.manifest_offset in self.manifest.read(offset):
+            line_start, offset = offset, self.manifest_offset
+            path, message_id, channel_name = entry['path'], entry['message_id'], entry['channel_name']
+            if channel_name not in last_seen:
+                last_seen[channel_name] = 0 if full_refresh else self.cursors.last_message_id(channel_name, YOLO_STAGE)
+            
+            # Already detected, saved twice (re-scrape) or deleted since
+            if message_id <= last_seen[channel_name] or path in seen or not os.path.exists(path):
+                continue
+            seen.add(path)
+            
+            self.known_hashes[path] = (entry['size'], entry['mtime'], entry['content_hash'])
+            newest[channel_name] = max(newest.get(channel_name, 0), message_id)
+            self.item_offsets[path] = line_start
+            yield path, message_id, channel_name
+    
+    def pending_images(self, full_refresh=False, newest=None):
+        """Yield (image_path, message_id, channel_name) for images still to detect
         
-        # Find all images
-        image_count = 0
+        Read from the scraper's image manifest when there is one, otherwise by
+        listing data/raw/images. `newest` collects the highest message_id seen
+        per channel.
+        """
+        newest = {} if newest is None else newest
+        if self.manifest is not None and self.manifest.exists():
+            yield from self.manifest_images(full_refresh, newest)
+            return
+        
+        images_dir = Path('data/raw/images')
         for channel_dir in images_dir.iterdir():
             if channel_dir.is_dir():
                 channel_name = channel_dir.name
                 
+                if (not full_refresh and self.cursors.get(channel_name)
+                        and not self.cursors.pending(channel_name, YOLO_STAGE)):
+                    logger.info(f"  ⏭️  {channel_name}: no new images")
+                    continue
+                
+                last_seen = 0 if full_refresh else self.cursors.last_message_id(channel_name, YOLO_STAGE)
+                
                 for image_file in channel_dir.glob('*.jpg'):
-                    # Extract message_id from filename
-                    try:
-                        message_id = int(image_file.stem)
-                    except ValueError:
-                        message_id = hash(image_file.stem) % 1000000
-                    
-                    # Run detection
-                    result = self.detect_image(
-                        str(image_file),
-                        message_id,
-                        channel_name
-                    )
+                    # Extract message_id from filename (stable made-up ids for other names)
+                    message_id = message_id_from_path(image_file)
+                    if image_file.stem.isdigit():
+                        if message_id <= last_seen:
+                            continue
+                        newest[channel_name] = max(newest.get(channel_name, 0), message_id)
+                        self.item_offsets[str(image_file)] = None
                     
-                    if result:
-                        all_results.append(result)
-                        image_count += 1
-                        
-                        if image_count % 5 == 0:
-                            logger.info(f"  Processed {image_count} images...")
-        
-        # Save to CSV
+                    yield str(image_file), message_id, channel_name
+    
+    def partition_images(self, data_dir):
+        """Yield (image_path, message_id, channel_name) for the images of one lake date partition
+        
+        Taken from the messages' image_path, so a partition can be re-detected
+        on its own (e.g. in a backfill) without touching the cursors.
+        """
+        columns = ['message_id', 'channel_name', 'image_path']
+        seen = set()
+        for record in iter_partition(data_dir, columns=columns):
+            image_path = record.get('image_path')
+            if image_path and image_path not in seen and os.path.exists(image_path):
+                seen.add(image_path)
+                yield image_path, record['message_id'], record['channel_name']
+    
+    def commit_manifest(self):
+        """Start the next run after the manifest lines this run has read"""
+        if self.manifest is not None and self.manifest_offset is not None:
+            self.manifest.commit(YOLO_STAGE, self.manifest_offset)
+    
+    def keep_pending(self, failed, detected=()):
+        """Hold the cursors and manifest offset back so `failed` items are retried next run
+        
+        An image that failed MAX_DETECTION_ATTEMPTS runs in a row (e.g. a
+        corrupt file) is given up on: it stays listed in the failures file but
+        no longer holds back the images after it. Paths in `detected` are
+        cleared from the failures.
+        """
+        for path in detected:
+            self.failures.pop(path, None)
+        
+        given_up = 0
+        for path, message_id, channel_name in failed:
+            if path not in self.item_offsets:
+                continue
+            attempts = self.failures.get(path, {}).get('attempts', 0) + 1
+            self.failures[path] = {'attempts': attempts, 'message_id': message_id, 'channel_name': channel_name,
+                                   'failed_at': datetime.now().isoformat()}
+            if attempts >= MAX_DETECTION_ATTEMPTS:
+                given_up += 1
+                continue
+            if channel_name in self.newest:
+                self.newest[channel_name] = min(self.newest[channel_name], message_id - 1)
+            if self.item_offsets[path] is not None:
+                self.manifest_offset = min(self.manifest_offset, self.item_offsets[path])
+        if given_up:
+            logger.warning(f"⚠️ {given_up} images failed {MAX_DETECTION_ATTEMPTS} runs in a row, skipping them "
+                           f"(listed in {self.failures_file})")
+        if len(failed) > given_up:
+            logger.warning(f"⚠️ {len(failed) - given_up} images could not be detected, "
+                           f"they stay pending for the next run")
+    
+    def save_failures(self):
+        """Write the failed attempts per image (atomically, like the cursors)"""
+        if not self.failures_file:
+            return
+        directory = os.path.dirname(self.failures_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f'{self.failures_file}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.failures, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.failures_file)
+    
+    def commit_progress(self):
+        """Advance the yolo cursors and manifest offset past the images of process_all_images
+        
+        Call once its rows are safely loaded, so a failed load is retried next run.
+        """
+        for channel_name, message_id in self.newest.items():
+            self.cursors.update(channel_name, message_id, stage=YOLO_STAGE)
+        self.cursors.save()
+        self.commit_manifest()
+        self.save_failures()
+    
+    def save_outputs(self, results):
+        """Append detection rows to the CSV and as a new Parquet part
+        
+        Each run only writes its own rows, so saving does not grow with
+        history. Re-detected images are saved again; load_detections() keeps
+        the last row per (message_id, channel_name, model_version).
+        """
+        import pandas as pd
+        
+        df = pd.DataFrame(results)
+        
+        # Box arrays only go to Parquet, the CSV keeps one flat row per image
+        flat = df.drop(columns=BOX_COLUMNS)
+        if os.path.exists(self.output_csv):
+            header = list(pd.read_csv(self.output_csv, nrows=0).columns)
+            if set(flat.columns) <= set(header):
+                flat.reindex(columns=header).to_csv(self.output_csv, mode='a', header=False, index=False)
+            else:
+                # Older layout without some columns: rewrite it once
+                saved = pd.read_csv(self.output_csv)
+                latest_detections(pd.concat([saved, flat], ignore_index=True)).to_csv(self.output_csv, index=False)
+        else:
+            flat.to_csv(self.output_csv, index=False)
+        logger.info(f"✅ Saved {len(df)} detections to {self.output_csv}")
+        
+        try:
+            self.parquet_parts()
+            part = os.path.join(self.output_parquet, f"part-{datetime.now():%Y%m%dT%H%M%S%f}.parquet")
+            df.to_parquet(part, index=False)
+        except ImportError:
+            logger.warning("pyarrow not installed, skipping Parquet output")
+        return df
+    
+    def parquet_parts(self):
+        """Parquet parts in save order, turning a single-file output of older runs into the first part"""
+        import pandas as pd
+        
+        if os.path.isfile(self.output_parquet):
+            legacy = latest_detections(pd.read_parquet(self.output_parquet))
+            os.remove(self.output_parquet)
+            os.makedirs(self.output_parquet)
+            legacy.to_parquet(os.path.join(self.output_parquet, 'part-00000000T000000000000.parquet'), index=False)
+        os.makedirs(self.output_parquet, exist_ok=True)
+        return sorted(str(path) for path in Path(self.output_parquet).glob('part-*.parquet'))
+    
+    def preprocess_images(self, paths, workers=None):
+        """Write inference-size copies and thumbnails of images that lack them"""
+        workers = workers or os.cpu_count() or 1
+        started = time.perf_counter()
+        images, written, failed = self.resized.preprocess_all(paths, workers)
+        if images:
+            logger.info(f"  Preprocessed {images} images in {time.perf_counter() - started:.2f}s "
+                        f"({written} copies written, {failed} unreadable, {workers} workers)")
+    
+    def detect_items(self, items, workers=1, threads_per_worker=None, preprocess_workers=None):
+        """Detect (image_path, message_id, channel_name) items and return the result rows
+        
+        Goes through the resized copies, detection cache and near-duplicate
+        index, but leaves cursors, the manifest and the saved CSV/Parquet
+        alone, so it also serves callers detecting a slice of the images
+        (e.g. one date partition).
+        """
+        started = time.perf_counter()
+        if self.resized is not None:
+            self.preprocess_images([item[0] for item in items], preprocess_workers)
+        cache = None
+        index = None
+        if self.cache_file:
+            cache = DetectionCache(self.cache_file, self.cache_namespace())
+            if self.class_names is None:
+                self.class_names = cache.class_names()
+            if self.index_file:
+                index = ImageHashIndex(self.index_file)
+        if cache is not None:
+            detections = self.cached_inference(items, cache, workers, threads_per_worker, index)
+        else:
+            detections = self.run_inference(items, workers, threads_per_worker)
+        
+        detected = []
+        for pair in detections:
+            detected.append(pair)
+            
+            if len(detected) % 50 == 0:
+                logger.info(f"  Processed {len(detected)} images...")
+        
+        # Categorize every image in one vectorized pass
+        all_results = self.build_results(detected)
+        
+        elapsed = time.perf_counter() - started
+        if cache is not None:
+            if self._model is not None:
+                # Lets the next all-hit run name the classes without loading the model
+                cache.put_class_names(self.model.names)
+            logger.info(f"  Detection cache: {cache.hits} hits, {cache.misses} misses "
+                        f"({cache.hit_rate():.0%} hit rate), {len(cache)} entries")
+            cache.close()
+        if index is not None:
+            logger.info(f"  Near-duplicate index: {len(index)} images, "
+                        f"{sum(1 for row in all_results if row['duplicate_of'])} duplicates in this run")
+            index.close()
         if all_results:
-            df = pd.DataFrame(all_results)
-            df.to_csv(self.output_csv, index=False)
-            logger.info(f"✅ Saved {len(all_results)} detections to {self.output_csv}")
+            logger.info(f"  {len(all_results)} images in {elapsed:.2f}s "
+                        f"({len(all_results) / elapsed:.1f} images/sec, batch size {self.batch_size})")
+        
+        return all_results
+    
+    def process_all_images(self, full_refresh=False, workers=1, threads_per_worker=None,
+                           preprocess_workers=None):
+        """Process all images from Task 1
+        
+        Incremental by default: images whose message_id is at or below the
+        channel's `yolo` cursor were detected by an earlier run and are skipped.
+        The cursor only moves on commit_progress(), once the rows are loaded.
+        With workers > 1 detection is sharded across processes (see detect_sharded).
+        New images are first resized on `preprocess_workers` processes
+        (default: all cores), so inference decodes small copies.
+        """
+        logger.info("🔍 Starting YOLO object detection...")
+        
+        all_results = []
+        self.newest = {}
+        self.item_offsets = {}
+        images_dir = Path('data/raw/images')
+        
+        if not images_dir.exists():
+            logger.error(f"Images directory not found: {images_dir}")
+            return []
+        
+        # Find and detect all images
+        items = list(self.pending_images(full_refresh, self.newest))
+        if not items:
+            # Nothing new: no model, cache or index to open
+            logger.info("✅ No new images to detect")
+            self.commit_progress()
+            return []
+        all_results = self.detect_items(items, workers, threads_per_worker, preprocess_workers)
+        
+        # Unreadable images and failed inference must not be skipped by the cursors (for a few runs)
+        detected = {row['image_path'] for row in all_results}
+        self.keep_pending([item for item in items if item[0] not in detected], detected)
+        
+        # Append to the CSV/Parquet outputs of earlier runs
+        if all_results:
+            df = self.save_outputs(all_results)
             
             # Show summary
             self.show_summary(df)
@@ -140,8 +1116,31 @@ class YOLODetector:
         
         return all_results
     
-    def show_summary(self, df):
+    def load_detections(self, columns=None):
+        """Read saved detections, loading only `columns` when Parquet is available
+        
+        Images saved by several runs keep their last row.
+        """
+        import pandas as pd
+        
+        keys = ['message_id', 'channel_name', 'model_version']
+        wanted = None if columns is None else list(dict.fromkeys(keys + list(columns)))
+        if os.path.exists(self.output_parquet):
+            try:
+                parts = [pd.read_parquet(part, columns=wanted) for part in self.parquet_parts()]
+                if parts:
+                    df = latest_detections(pd.concat(parts, ignore_index=True))
+                    return df if columns is None else df[list(columns)]
+            except ImportError:
+                pass
+        df = latest_detections(pd.read_csv(self.output_csv))
+        return df if columns is None else df[list(columns)]
+    
+    def show_summary(self, df=None):
         """Show detection summary"""
+        if df is None:
+            df = self.load_detections(SUMMARY_COLUMNS)
+        
         print("\n" + "="*60)
         print("📊 YOLO DETECTION SUMMARY")
         print("="*60)
@@ -170,82 +1169,150 @@ class YOLODetector:
         
         print("\n" + "="*60)
     
-    def load_to_postgres(self):
-        """Load YOLO results to PostgreSQL"""
+    def load_to_postgres(self, results=None, method='copy'):
+        """Load YOLO results to PostgreSQL
+        
+        `results` are the rows returned by process_all_images; they are streamed
+        straight into raw.yolo_detections (COPY into a staging table + one
+        upsert, or batched execute_values). Without them the saved detections
+        are read back from disk. Reloading is idempotent on
+        (message_id, channel_name, model_version).
+        Returns (rows loaded, rows inserted or updated), or None if loading failed.
+        """
         try:
             import psycopg2
+            import pandas as pd
             
-            # Read CSV
-            df = pd.read_csv(self.output_csv)
+            if results is None:
+                results = self.load_detections().to_dict('records')
+                for result in results:
+                    # Files saved before model versions were tracked
+                    result.setdefault('model_version', 'legacy')
+                    if pd.isna(result.get('duplicate_of')):
+                        result['duplicate_of'] = None
+                    for column in BOX_COLUMNS:
+                        if hasattr(result.get(column), 'tolist'):
+                            result[column] = result[column].tolist()
             
             # Connect to PostgreSQL
-            conn = psycopg2.connect(
-                host="localhost",
-                database="medical_warehouse",
-                user="postgres",
-                password="postgres",
-                port="5433"
-            )
+            conn = get_connection()
             
+            create_detections_table(conn)
             cur = conn.cursor()
             
-            # Create table
-            cur.execute("""
-            CREATE TABLE IF NOT EXISTS raw.yolo_detections (
-                id SERIAL PRIMARY KEY,
-                message_id INTEGER,
-                channel_name VARCHAR(255),
-                image_path TEXT,
-                detected_class VARCHAR(100),
-                confidence_score FLOAT,
-                image_category VARCHAR(50),
-                detection_count INTEGER,
-                detected_at TIMESTAMP
-            );
-            """)
-            
-            # Insert data
-            for _, row in df.iterrows():
-                cur.execute("""
-                INSERT INTO raw.yolo_detections 
-                (message_id, channel_name, image_path, detected_class, 
-                 confidence_score, image_category, detection_count, detected_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT DO NOTHING
-                """, (
-                    row['message_id'],
-                    row['channel_name'],
-                    row['image_path'],
-                    row['detected_class'],
-                    row['confidence_score'],
-                    row['image_category'],
-                    row['detection_count'],
-                    row['detected_at']
-                ))
+            try:
+                if method == 'copy':
+                    total, changed = copy_detections(cur, results)
+                else:
+                    total, changed = upsert_detections(cur, results)
+            except psycopg2.Error as e:
+                if method != 'copy':
+                    raise
+                logger.warning(f"COPY failed ({e}), falling back to batched upserts")
+                conn.rollback()
+                total, changed = upsert_detections(cur, results)
             
             conn.commit()
             cur.close()
             conn.close()
             
-            logger.info(f"✅ Loaded {len(df)} detections to raw.yolo_detections")
+            logger.info(f"✅ Loaded {total} detections to raw.yolo_detections ({changed} inserted or updated)")
+            return total, changed
             
         except Exception as e:
             logger.error(f"❌ Error loading to PostgreSQL: {e}")
+            return None
+
+def parse_args(argv=None):
+    """Command line options"""
+    parser = argparse.ArgumentParser(description="YOLOv8 object detection on scraped images")
+    parser.add_argument('--full-refresh', action='store_true',
+                        help="Ignore the yolo cursor and re-detect every image")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Images per inference call (1 = one image at a time)")
+    parser.add_argument('--prefetch-workers', type=int, default=DEFAULT_PREFETCH_WORKERS,
+                        help="Threads decoding upcoming images during inference")
+    parser.add_argument('--device', default=None, help="Inference device, e.g. cpu or 0")
+    parser.add_argument('--backend', choices=BACKENDS, default='torch',
+                        help="Run PyTorch, or the model exported for ONNX Runtime (optionally INT8) / OpenVINO")
+    parser.add_argument('--conf', type=float, default=None,
+                        help="Minimum box confidence (default: ultralytics' 0.25)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Worker processes, each with its own model (1 = single process)")
+    parser.add_argument('--threads-per-worker', type=int, default=None,
+                        help="Inference threads per worker, for every backend (default: CPU cores / workers)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Run the model on every image, bypassing the detection cache")
+    parser.add_argument('--no-dedup', action='store_true',
+                        help="Skip the perceptual-hash near-duplicate index")
+    parser.add_argument('--rebuild-manifest', action='store_true',
+                        help="Record the images already on disk in the image manifest first (older data trees)")
+    parser.add_argument('--no-resize', action='store_true',
+                        help="Run inference on the full-size downloads instead of pre-resized copies")
+    parser.add_argument('--preprocess-workers', type=int, default=None,
+                        help="Processes resizing new images before inference (default: CPU cores)")
+    parser.add_argument('--reclassify', action='store_true',
+                        help="Re-run the categorization rules over stored boxes (no model, no images)")
+    parser.add_argument('--min-confidence', type=float, default=0.0,
+                        help="Reclassify: ignore boxes below this confidence")
+    parser.add_argument('--model-version', default=None,
+                        help="Reclassify: only rows of this model version")
+    parser.add_argument('--class-threshold', action='append', default=[], metavar='CLASS=CONF',
+                        help="Minimum confidence for one class when categorizing, e.g. person=0.5 (repeatable)")
+    parser.add_argument('--top-k', type=int, default=None,
+                        help="Only the k most confident boxes of an image count when categorizing")
+    args = parser.parse_args(argv)
+    
+    args.class_thresholds = {}
+    for option in args.class_threshold:
+        name, _, value = option.rpartition('=')
+        if not name:
+            parser.error(f"--class-threshold expects CLASS=CONF, got {option!r}")
+        args.class_thresholds[name] = float(value)
+    return args
 
-def main():
+def main(argv=None):
     """Main function"""
+    args = parse_args(argv)
+    
+    if args.reclassify:
+        print("\n" + "="*60)
+        print("🏷️  RECLASSIFYING STORED DETECTIONS")
+        print("="*60)
+        started = time.perf_counter()
+        conn = get_connection()
+        checked, updated = reclassify_detections(conn, args.min_confidence, args.model_version,
+                                                 args.class_thresholds, args.top_k)
+        conn.close()
+        print(f"✅ {checked} images reclassified in {time.perf_counter() - started:.2f}s, {updated} rows changed")
+        return []
+    
     print("\n" + "="*60)
     print("🎯 YOLOv8 OBJECT DETECTION - TASK 3")
     print("="*60)
     
-    detector = YOLODetector()
+    detector = YOLODetector(batch_size=args.batch_size, prefetch_workers=args.prefetch_workers,
+                            device=args.device, backend=args.backend, conf=args.conf,
+                            cache_file=None if args.no_cache else DEFAULT_CACHE_FILE,
+                            class_thresholds=args.class_thresholds, top_k=args.top_k,
+                            index_file=None if args.no_dedup else DEFAULT_INDEX_FILE,
+                            resized_dir=None if args.no_resize else DEFAULT_RESIZED_DIR)
+    
+    if args.rebuild_manifest:
+        count = ImageManifest(DEFAULT_MANIFEST_FILE).rebuild()
+        print(f"📝 Image manifest rebuilt: {count} images")
     
     # Step 1: Process images
-    results = detector.process_all_images()
+    results = detector.process_all_images(full_refresh=args.full_refresh, workers=args.workers,
+                                          threads_per_worker=args.threads_per_worker,
+                                          preprocess_workers=args.preprocess_workers)
     
     if results:
-        # Step 2: Load to PostgreSQL
-        detector.load_to_postgres()
+        # Step 2: Load to PostgreSQL (straight from memory, no CSV round trip)
+        if detector.load_to_postgres(results) is None:
+            print("❌ Detections not loaded, the same images will be retried next run")
+            sys.exit(1)
+        detector.commit_progress()
         
         print("\n✅ TASK 3 COMPLETE!")
         print("Next: Create dbt model fct_image_detections.sql")
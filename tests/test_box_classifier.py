@@ -0,0 +1,51 @@
+"""Test image categorization rules and the vectorized BoxClassifier."""
+import random
+
+from src.utils.box_classifier import BoxClassifier, classify, summarize_boxes
+
+NAMES = ['person', 'bottle', 'chair', 'cell phone', 'dog']
+
+
+def test_classify_categories():
+    assert classify(['person', 'bottle']) == 'promotional'
+    assert classify(['cup']) == 'product_display'
+    assert classify(['person']) == 'lifestyle'
+    assert classify([]) == 'other'
+
+
+def test_summarize_boxes_respects_min_confidence():
+    classes = ['person', 'bottle', 'chair']
+    confidences = [0.4, 0.8, 0.9]
+
+    assert summarize_boxes(classes, confidences) == ('chair', 0.9, 'promotional', 3)
+    assert summarize_boxes(classes, confidences, min_confidence=0.5) == ('chair', 0.9, 'product_display', 2)
+    assert summarize_boxes(classes, confidences, min_confidence=0.95) == ('none', 0.0, 'other', 0)
+
+
+def test_vectorized_matches_per_image_rules():
+    random.seed(0)
+    images = []
+    for _ in range(500):
+        boxes = random.randint(0, 6)
+        images.append(([random.choice(NAMES) for _ in range(boxes)],
+                       [round(random.random(), 2) for _ in range(boxes)]))
+
+    classifier = BoxClassifier(NAMES, min_confidence=0.3)
+    summary = classifier.summarize(
+        classifier.encode([name for classes, _ in images for name in classes]),
+        [conf for _, confidences in images for conf in confidences],
+        [len(classes) for classes, _ in images]
+    )
+
+    for i, (classes, confidences) in enumerate(images):
+        expected = summarize_boxes(classes, confidences, min_confidence=0.3)
+        assert tuple(column[i] for column in summary) == expected
+
+
+def test_class_thresholds_and_top_k():
+    classifier = BoxClassifier({0: 'person', 1: 'bottle', 2: 'chair'}, thresholds={'person': 0.7}, top_k=1)
+    classes, confidences, categories, counts = classifier.summarize([0, 1, 2, 0], [0.6, 0.5, 0.4, 0.9], [3, 1])
+
+    # Image 0: the person box is below its own threshold, top-1 keeps the bottle
+    assert (classes[0], categories[0], counts[0]) == ('bottle', 'product_display', 1)
+    assert (classes[1], confidences[1], categories[1]) == ('person', 0.9, 'lifestyle')
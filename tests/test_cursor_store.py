@@ -0,0 +1,32 @@
+"""Test per-channel cursors used for incremental runs."""
+from src.utils.cursor_store import CursorStore, SCRAPER, LOADER
+
+
+def test_cursor_only_moves_forward(tmp_path):
+    store = CursorStore(str(tmp_path / 'cursors.json'))
+    store.update('chemed', 15, '2026-01-01T00:00:00')
+    store.update('chemed', 10)
+    assert store.last_message_id('chemed') == 15
+
+
+def test_cursor_persists_and_tracks_pending(tmp_path):
+    path = str(tmp_path / 'state' / 'cursors.json')
+    store = CursorStore(path)
+    store.update('chemed', 7)
+    store.update('chemed', 3, stage=LOADER)
+    store.save()
+
+    reloaded = CursorStore(path)
+    assert reloaded.last_message_id('chemed', SCRAPER) == 7
+    assert reloaded.pending('chemed', LOADER)
+
+    reloaded.update('chemed', 7, stage=LOADER)
+    assert not reloaded.pending('chemed', LOADER)
+
+
+def test_reset_forgets_stage(tmp_path):
+    store = CursorStore(str(tmp_path / 'cursors.json'))
+    store.update('chemed', 5)
+    store.reset(SCRAPER)
+    assert store.get('chemed') is None
+
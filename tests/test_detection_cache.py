@@ -0,0 +1,38 @@
+"""Test the content-hash YOLO detection cache."""
+from src.utils.detection_cache import DetectionCache
+
+
+def test_cache_roundtrip_and_stats(tmp_path):
+    path = str(tmp_path / 'state' / 'cache.sqlite')
+    detections = [{'class_id': 39, 'class_name': 'bottle', 'confidence': 0.91}]
+
+    with DetectionCache(path, model_version='yolov8n.pt:abc') as cache:
+        assert cache.get('hash1') is None
+        cache.put('hash1', detections)
+
+    with DetectionCache(path, model_version='yolov8n.pt:abc') as cache:
+        assert cache.get('hash1') == detections
+        assert cache.hits == 1 and cache.misses == 0
+        assert len(cache) == 1
+
+
+def test_cache_is_per_model_version(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    with DetectionCache(path, model_version='v1') as cache:
+        cache.put('hash1', [])
+
+    with DetectionCache(path, model_version='v2') as cache:
+        assert cache.get('hash1') is None
+        assert cache.hit_rate() == 0.0
+
+
+def test_class_names_are_kept_per_model_version(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    with DetectionCache(path, model_version='v1') as cache:
+        assert cache.class_names() is None
+        cache.put_class_names({0: 'person', 39: 'bottle'})
+
+    with DetectionCache(path, model_version='v1') as cache:
+        assert cache.class_names() == {0: 'person', 39: 'bottle'}
+    with DetectionCache(path, model_version='v2') as cache:
+        assert cache.class_names() is None
@@ -0,0 +1,67 @@
+"""Test perceptual hashes and the near-duplicate image index."""
+import random
+
+import numpy as np
+from PIL import Image
+
+from src.utils.image_hash import ImageHashIndex, dhash, hamming, popcount
+
+
+def make_image(path, seed, size=(320, 240), quality=90):
+    rng = np.random.default_rng(seed)
+    # Smooth gradients plus blobs, so the picture survives resizing
+    x = np.linspace(0, 255, size[0])
+    pixels = np.tile(x, (size[1], 1)) * rng.uniform(0.3, 1.0)
+    for _ in range(5):
+        cx, cy = rng.integers(0, size[0]), rng.integers(0, size[1])
+        pixels[max(0, cy - 40):cy + 40, max(0, cx - 40):cx + 40] = rng.integers(0, 255)
+    Image.fromarray(pixels.astype(np.uint8)).convert('RGB').save(path, quality=quality)
+
+
+def test_dhash_matches_reencoded_copies(tmp_path):
+    original, repost, other = (str(tmp_path / name) for name in ['a.jpg', 'b.jpg', 'c.jpg'])
+    make_image(original, seed=1)
+    make_image(other, seed=2)
+    with Image.open(original) as img:
+        img.resize((160, 120)).save(repost, quality=40)
+
+    assert hamming(dhash(original), dhash(repost)) <= 4
+    assert hamming(dhash(original), dhash(other)) > 10
+
+
+def test_index_links_duplicates_to_their_original(tmp_path):
+    path = str(tmp_path / 'index.sqlite')
+    with ImageHashIndex(path, radius=4) as index:
+        assert index.add('a.jpg', 0b1111, 'sha-a') is None
+        assert index.add('b.jpg', 0b0111, 'sha-b') == 'a.jpg'
+        # Close to the repost only: still points at the root original
+        assert index.add('c.jpg', 0b0111 | 1 << 40 | 1 << 50 | 1 << 60, 'sha-c') == 'a.jpg'
+        assert index.add('d.jpg', (1 << 64) - 1, 'sha-d') is None
+
+    with ImageHashIndex(path, radius=4) as index:
+        assert len(index) == 4
+        assert index.duplicate_of('b.jpg') == 'a.jpg'
+        assert index.content_hash('a.jpg') == 'sha-a'
+        assert index.add('b.jpg', 0, 'sha-b') == 'a.jpg'
+        # A file rewritten with other content is indexed again
+        assert index.add('b.jpg', (1 << 64) - 2, 'sha-b2') == 'd.jpg'
+        assert len(index) == 4
+
+
+def test_lookup_matches_brute_force(tmp_path):
+    random.seed(7)
+    values = [random.getrandbits(64) for _ in range(2000)]
+    hashes = np.array(values, dtype=np.uint64)
+
+    with ImageHashIndex(str(tmp_path / 'index.sqlite'), radius=6) as index:
+        for i, value in enumerate(values):
+            index.add(str(i), value)
+            if i == len(values) // 2:
+                # Half the hashes are looked up in SQLite, half in memory
+                index.save()
+
+        for value in values[:50]:
+            query = value ^ (1 << random.randrange(64)) ^ (1 << random.randrange(64))
+            distances = popcount(hashes ^ np.uint64(query))
+            expected = sorted((int(distances[i]), str(i)) for i in np.flatnonzero(distances <= 6))
+            assert sorted(index.lookup(query)) == expected
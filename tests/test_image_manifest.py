@@ -0,0 +1,56 @@
+"""Test the scraper's image manifest and incremental reads of it."""
+from src.utils.image_manifest import ImageManifest, message_id_from_path
+
+
+def write_image(path, content=b'jpeg bytes'):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_reads_only_lines_after_the_committed_offset(tmp_path):
+    manifest = ImageManifest(str(tmp_path / 'manifest.ndjson'), str(tmp_path / 'offsets.json'))
+    first = write_image(tmp_path / 'images' / 'chemed' / '1.jpg')
+    manifest.append(first, 1, 'chemed')
+
+    entries = list(manifest.read(manifest.offset('yolo')))
+    assert [entry['path'] for entry, _ in entries] == [first]
+    assert len(entries[0][0]['content_hash']) == 64
+    manifest.commit('yolo', entries[-1][1])
+
+    second = write_image(tmp_path / 'images' / 'chemed' / '2.jpg', b'other bytes')
+    manifest.append(second, 2, 'chemed')
+    # A line still being written is left for the next read
+    with open(manifest.path, 'a') as f:
+        f.write('{"path": "partial')
+
+    entries = list(manifest.read(manifest.offset('yolo')))
+    assert [(entry['path'], entry['message_id']) for entry, _ in entries] == [(second, 2)]
+
+
+def test_rebuild_and_stable_message_ids(tmp_path):
+    write_image(tmp_path / 'images' / 'a' / '10.jpg')
+    write_image(tmp_path / 'images' / 'a' / '9.jpg')
+    write_image(tmp_path / 'images' / 'b' / 'photo.jpg')
+    manifest = ImageManifest(str(tmp_path / 'manifest.ndjson'), str(tmp_path / 'offsets.json'))
+
+    assert manifest.rebuild(str(tmp_path / 'images')) == 3
+    ids = [(entry['channel_name'], entry['message_id']) for entry, _ in manifest.read()]
+    assert ids[:2] == [('a', 9), ('a', 10)]
+    assert ids[2] == ('b', message_id_from_path('photo.jpg'))
+    assert message_id_from_path('x/photo.jpg') == message_id_from_path('y/photo.jpg') < 1000000
+
+
+def test_rebuild_resets_consumer_offsets(tmp_path):
+    manifest = ImageManifest(str(tmp_path / 'manifest.ndjson'), str(tmp_path / 'offsets.json'))
+    for message_id in (1, 2, 3):
+        path = write_image(tmp_path / 'images' / 'chemed' / f'{message_id}.jpg', bytes([message_id]))
+        manifest.append(path, message_id, 'chemed')
+    manifest.commit('yolo', list(manifest.read())[1][1])
+
+    manifest.rebuild(str(tmp_path / 'images'))
+    assert manifest.offset('yolo') == 0
+    assert len(list(manifest.read(manifest.offset('yolo')))) == 3
+
+    # An offset into the middle of a line starts over instead of failing to parse
+    assert len(list(manifest.read(5))) == 3
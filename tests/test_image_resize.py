@@ -0,0 +1,41 @@
+"""Test the pre-resized image cache used ahead of inference."""
+import os
+
+from PIL import Image
+
+from src.utils.image_resize import ResizedImageCache, resize_image
+
+
+def make_image(path, size):
+    Image.new('RGB', size, color=(200, 30, 30)).save(path, quality=95)
+
+
+def test_preprocess_writes_content_addressed_copies(tmp_path):
+    source = str(tmp_path / '1.jpg')
+    make_image(source, (1600, 1200))
+    resized = ResizedImageCache(str(tmp_path / 'cache'), inference_size=640, thumbnail_size=128)
+
+    assert resized.inference_copy(source) is None
+    assert resized.preprocess_all([source]) == (1, 2, 0)
+    # Already there: nothing rewritten
+    assert resized.preprocess_all([source]) == (1, 0, 0)
+
+    copy = resized.inference_copy(source)
+    assert copy.startswith(str(tmp_path / 'cache' / '640'))
+    with Image.open(copy) as img:
+        assert img.size == (640, 480)
+    thumbnails = os.listdir(tmp_path / 'cache' / '128')
+    assert len(thumbnails) == 1
+
+
+def test_small_images_are_copied_and_unreadable_counted(tmp_path):
+    source = str(tmp_path / 'small.jpg')
+    make_image(source, (300, 200))
+    assert resize_image(source, str(tmp_path / 'out' / 'small.jpg'), 640) == (300, 200)
+    with open(source, 'rb') as a, open(tmp_path / 'out' / 'small.jpg', 'rb') as b:
+        assert a.read() == b.read()
+
+    broken = tmp_path / 'broken.jpg'
+    broken.write_bytes(b'not a jpeg')
+    resized = ResizedImageCache(str(tmp_path / 'cache'))
+    assert resized.preprocess_all([source, str(broken)], workers=2) == (2, 2, 1)
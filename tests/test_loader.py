@@ -0,0 +1,26 @@
+"""Test loader helpers that do not need a database."""
+from src.loader import partition_dates
+
+
+def test_partition_dates_inclusive_across_months():
+    dates = list(partition_dates('2026-01-30', '2026-02-02'))
+    assert dates == ['2026-01-30', '2026-01-31', '2026-02-01', '2026-02-02']
+
+
+def test_partition_dates_empty_when_reversed():
+    assert list(partition_dates('2026-02-02', '2026-02-01')) == []
+
+
+def test_iter_files_reads_every_changed_file_whatever_the_cursors(tmp_path):
+    import json
+    from src.loader import iter_files
+
+    # An older partition that was never loaded, although the channel's cursors moved past it
+    path = str(tmp_path / 'chemed.0000.ndjson')
+    with open(path, 'w') as f:
+        for message_id in (1, 2, 3):
+            f.write(json.dumps({'message_id': message_id, 'channel_name': 'chemed'}) + "\n")
+
+    row_counts = {}
+    assert [msg['message_id'] for msg in iter_files([(path, 'checksum', 0)], row_counts)] == [1, 2, 3]
+    assert row_counts == {path: 3}
@@ -0,0 +1,31 @@
+"""Test COPY text formatting used by the bulk loader."""
+from src.utils.pg_copy import CopyStream, copy_line
+
+
+def test_copy_line_escapes_and_nulls():
+    line = copy_line((1, 'chemed', 'a\tb\nc\\d', None, True, 3.5))
+    assert line == '1\tchemed\ta\\tb\\nc\\\\d\t\\N\tt\t3.5\n'
+
+
+def test_copy_stream_reads_in_chunks():
+    progress = []
+    rows = ((i, f'text {i}') for i in range(1000))
+    stream = CopyStream(rows, progress_every=250, on_progress=lambda n, rate: progress.append(n))
+
+    chunks = []
+    while True:
+        chunk = stream.read(100)
+        if not chunk:
+            break
+        assert len(chunk) <= 100
+        chunks.append(chunk)
+
+    lines = ''.join(chunks).splitlines()
+    assert len(lines) == 1000
+    assert lines[999] == '999\ttext 999'
+    assert progress == [250, 500, 750, 1000]
+
+
+def test_copy_line_formats_arrays():
+    line = copy_line((['person', 'cell phone'], [0.5, None], []))
+    assert line == '{"person","cell phone"}\t{0.5,NULL}\t{}\n'
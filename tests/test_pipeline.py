@@ -0,0 +1,102 @@
+"""Test the Dagster pipeline definitions without running the stages."""
+import os
+import sys
+import subprocess
+
+import pytest
+
+pytest.importorskip('dagster')
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+@pytest.fixture(scope='module')
+def dbt_manifest():
+    """The asset definitions need the dbt manifest, built like the deploy step does"""
+    from pipeline.dbt_project import dbt_project
+
+    if not os.path.exists(dbt_project.manifest_path):
+        dbt_project.preparer.prepare(dbt_project)
+    return dbt_project.manifest_path
+
+
+class FakeContext:
+    def __init__(self):
+        self.metadata = None
+
+    def add_output_metadata(self, metadata):
+        self.metadata = metadata
+
+
+def test_stage_metadata_keeps_scalars_and_extras():
+    from pipeline.dagster_pipeline import add_stage_metadata
+
+    context = FakeContext()
+    add_stage_metadata(context, {'rows': 10, 'seconds': 1.23456, 'scrape_result': {'rows': 1}},
+                       categories={'other': 2})
+
+    assert context.metadata == {'rows': 10, 'seconds': 1.235, 'categories': {'other': 2}}
+
+
+def test_loading_the_job_does_not_import_stage_libraries():
+    code = ("import sys; import pipeline.dagster_pipeline; "
+            "print([m for m in ('dbt.cli.main', 'ultralytics', 'torch', 'src.scraper') if m in sys.modules])")
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert output.stdout.strip().splitlines()[-1] == '[]'
+
+
+def test_yolo_runs_alongside_the_message_branch():
+    from pipeline.dagster_pipeline import medical_telegram_pipeline
+
+    dependencies = medical_telegram_pipeline.graph.dependency_structure
+
+    def upstream(node):
+        inputs = dependencies.input_to_upstream_outputs_for_node(node).values()
+        return sorted({output.node_name for outputs in inputs for output in outputs})
+
+    assert upstream('run_yolo_enrichment') == ['scrape_telegram_data']
+    assert upstream('build_detection_mart') == ['run_dbt_transformations', 'run_yolo_enrichment']
+
+
+def test_partitioned_assets_build_the_dbt_models_once_per_backfill(dbt_manifest):
+    from dagster import BackfillPolicy
+    from pipeline.dagster_assets import daily_partitions, warehouse_models, yolo_detections
+
+    assert daily_partitions.get_partition_keys()[0] == '2026-01-01'
+    assert yolo_detections.partitions_def == daily_partitions
+    assert warehouse_models.backfill_policy == BackfillPolicy.single_run()
+
+
+def test_dbt_sources_depend_on_the_assets_loading_them(dbt_manifest):
+    from dagster import AssetKey
+    from pipeline.dagster_assets import warehouse_models
+
+    assert {AssetKey('raw_telegram_messages'), AssetKey('yolo_detections')} <= set(warehouse_models.dependency_keys)
+    # dbt tests are asset checks of their models
+    assert len(list(warehouse_models.check_keys)) > 0
+
+
+def test_weekly_schedule_requests_a_full_refresh(dbt_manifest):
+    from datetime import datetime
+    from dagster import build_schedule_context
+    from pipeline.dagster_assets import weekly_full_refresh_schedule
+    from pipeline.dagster_pipeline import FULL_REFRESH_TAG
+
+    request = weekly_full_refresh_schedule(build_schedule_context(scheduled_execution_time=datetime(2026, 10, 18, 3)))
+
+    assert request.partition_key == '2026-10-18'
+    assert request.tags[FULL_REFRESH_TAG] == 'true'
+
+
+def test_only_one_daily_schedule_is_registered(dbt_manifest):
+    from pipeline.dagster_assets import defs
+
+    schedules = [schedule.name for schedule in defs.schedules]
+    assert sorted(schedules) == ['daily_partition_job_schedule', 'weekly_full_refresh_schedule']
+
+
+def test_importing_the_assets_does_not_run_dbt(dbt_manifest):
+    code = "import sys; import pipeline.dagster_assets; print('dbt.cli.main' in sys.modules)"
+    output = subprocess.run([sys.executable, '-W', 'error::DeprecationWarning:pipeline.dagster_assets', '-c', code],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    assert output.stdout.strip().splitlines()[-1] == 'False'
@@ -0,0 +1,85 @@
+"""Test that the API's queries use the warehouse indexes and partitions.
+
+Needs a built warehouse (dbt build); skipped otherwise. Sequential scans are
+disabled, so the planner picks an index whenever one fits the query, whatever
+the size of the tables.
+"""
+import os
+from datetime import date, timedelta
+
+import pytest
+from dotenv import load_dotenv
+from sqlalchemy import URL, create_engine, text
+
+from api.queries import CHANNEL_ACTIVITY_QUERY, SEARCH_MESSAGES_QUERY, SEARCH_CHANNEL_FILTER, SEARCH_ORDER
+
+load_dotenv()
+
+
+@pytest.fixture(scope='module')
+def db():
+    # The POSTGRES_* settings the API connects with (api/database.py), so CI checks its database
+    url = URL.create('postgresql+psycopg2', username=os.getenv('POSTGRES_USER'),
+                     password=os.getenv('POSTGRES_PASSWORD'), host=os.getenv('POSTGRES_HOST'),
+                     port=os.getenv('POSTGRES_PORT'), database=os.getenv('POSTGRES_DB'))
+    try:
+        conn = create_engine(url).connect()
+    except Exception as e:
+        pytest.skip(f"Cannot connect to database: {e}")
+
+    partitioned = conn.execute(text(
+        "SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass('public_marts.fct_messages')"
+    )).scalar()
+    if not partitioned:
+        conn.close()
+        pytest.skip("Warehouse not built: run dbt build")
+
+    conn.execute(text("SET enable_seqscan = off"))
+    yield conn
+    conn.close()
+
+
+def scans(db, query, params):
+    """(node type, table, index) of every scan in the query's plan"""
+    plan = db.execute(text('EXPLAIN (FORMAT JSON) ' + query), params).scalar()[0]['Plan']
+
+    found = []
+    nodes = [(plan, None)]
+    while nodes:
+        node, parent_table = nodes.pop()
+        # Bitmap index scans name the index, their parent heap scan the table
+        table = node.get('Relation Name', parent_table)
+        if node['Node Type'] in ('Seq Scan', 'Index Scan', 'Index Only Scan', 'Bitmap Index Scan'):
+            found.append((node['Node Type'], table, node.get('Index Name')))
+        nodes.extend((child, table) for child in node.get('Plans', []))
+    return found
+
+
+def seq_scans(found):
+    return [table for kind, table, index in found if kind == 'Seq Scan']
+
+
+def fact_indexes(found):
+    """Indexes read on the fct_messages partitions (named after the parent index's columns)"""
+    return {index for kind, table, index in found if table.startswith('fct_messages_')}
+
+
+def test_channel_activity_uses_indexes_and_recent_partitions(db):
+    found = scans(db, CHANNEL_ACTIVITY_QUERY, {'channel_name': 'tikvahpharma', 'days': 7})
+
+    assert seq_scans(found) == []
+    assert ('dim_channels', 'dim_channels_channel_name') in {(table, index) for kind, table, index in found}
+    assert any(index.endswith('_channel_key_idx') for index in fact_indexes(found))
+
+    # Partitions of months before the window are pruned
+    first_month = int((date.today() - timedelta(days=7)).strftime('%Y%m'))
+    partitions = {table for kind, table, index in found if table.startswith('fct_messages_p')}
+    assert all(int(table[len('fct_messages_p'):]) >= first_month for table in partitions)
+
+
+def test_channel_search_uses_indexes(db):
+    query = SEARCH_MESSAGES_QUERY + SEARCH_CHANNEL_FILTER + SEARCH_ORDER
+    found = scans(db, query, {'query': 'paracetamol', 'channel': 'tikvahpharma', 'limit': 20})
+
+    assert seq_scans(found) == []
+    assert any(index.endswith('_channel_key_idx') for index in fact_indexes(found))
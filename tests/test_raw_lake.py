@@ -0,0 +1,81 @@
+"""Test the streaming NDJSON raw lake reader/writer."""
+import json
+import os
+import pytest
+from src.utils.raw_lake import NDJSONWriter, iter_records, iter_partition, lake_files, file_checksum
+
+
+def make_messages(n, channel='chemed'):
+    return ({'message_id': i, 'channel_name': channel, 'message_text': f'msg {i} ለበለጠ'} for i in range(1, n + 1))
+
+
+@pytest.mark.parametrize('compression', [None, 'gzip'])
+def test_roundtrip(tmp_path, compression):
+    with NDJSONWriter(str(tmp_path), 'chemed', compression=compression) as writer:
+        writer.write_all(make_messages(10))
+
+    assert writer.count == 10
+    assert [m['message_id'] for m in iter_partition(str(tmp_path))] == list(range(1, 11))
+
+
+def test_rotates_by_size_and_appends(tmp_path):
+    with NDJSONWriter(str(tmp_path), 'chemed', max_bytes=200) as writer:
+        writer.write_all(make_messages(10))
+    assert len(writer.paths) > 1
+
+    with NDJSONWriter(str(tmp_path), 'chemed', max_bytes=200) as writer:
+        writer.write_all({'message_id': 11, 'channel_name': 'chemed'} for _ in range(1))
+
+    ids = [m['message_id'] for m in iter_partition(str(tmp_path))]
+    assert ids == list(range(1, 12))
+
+
+def test_compressed_runs_start_a_new_part(tmp_path):
+    for first_id in (1, 11):
+        with NDJSONWriter(str(tmp_path), 'chemed', compression='gzip', max_bytes=10000) as writer:
+            writer.write_all({'message_id': i, 'channel_name': 'chemed'} for i in range(first_id, first_id + 10))
+
+    assert [os.path.basename(path) for path in lake_files(str(tmp_path))] == \
+        ['chemed.0000.ndjson.gz', 'chemed.0001.ndjson.gz']
+    assert [m['message_id'] for m in iter_partition(str(tmp_path))] == list(range(1, 21))
+
+
+def test_overwrite_and_legacy_json(tmp_path):
+    legacy = tmp_path / 'tikvahpharma.json'
+    legacy.write_text(json.dumps([{'message_id': 1}, {'message_id': 2}]), encoding='utf-8')
+    assert len(list(iter_records(str(legacy)))) == 2
+
+    with NDJSONWriter(str(tmp_path), 'tikvahpharma', overwrite=True) as writer:
+        writer.write({'message_id': 3})
+
+    assert not legacy.exists()
+    assert [os.path.basename(p) for p in lake_files(str(tmp_path))] == ['tikvahpharma.0000.ndjson']
+
+
+def test_parquet_partition_and_compaction(tmp_path):
+    pytest.importorskip('pyarrow')
+    from src.utils.raw_lake import open_writer, compact_partition
+
+    for run in range(3):
+        with open_writer(str(tmp_path), 'chemed', fmt='parquet') as writer:
+            writer.write_all({'message_id': run * 10 + i, 'channel_name': 'chemed',
+                              'message_date': '2026-01-15T10:00:00', 'views': i} for i in range(5))
+    assert len(lake_files(str(tmp_path))) == 3
+
+    assert compact_partition(str(tmp_path)) == {'chemed': 15}
+    assert [os.path.basename(p) for p in lake_files(str(tmp_path))] == ['chemed.0000.parquet']
+
+    rows = list(iter_partition(str(tmp_path), columns=['message_id', 'message_date']))
+    assert len(rows) == 15
+    assert set(rows[0]) == {'message_id', 'message_date'}
+    assert rows[0]['message_date'] == '2026-01-15T10:00:00'
+
+
+def test_file_checksum_changes_with_content(tmp_path):
+    path = tmp_path / 'chemed.0000.ndjson'
+    path.write_text('{"message_id": 1}\n')
+    first = file_checksum(str(path))
+
+    assert file_checksum(str(path)) == first
+    path.write_text('{"message_id": 1, "views": 5}\n')
+    assert file_checksum(str(path)) != first
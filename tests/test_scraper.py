@@ -32,3 +32,48 @@ def test_data_directories():
         # Check if directory exists or can be created
         os.makedirs(directory, exist_ok=True)
         assert os.path.exists(directory), f"Directory {directory} does not exist"
+
+def test_async_scraping_isolates_channel_errors(tmp_path, monkeypatch):
+    """One failing channel must not stop the other channels in async mode."""
+    import asyncio
+    monkeypatch.chdir(tmp_path)
+    from src.scraper import TelegramScraper
+
+    scraper = TelegramScraper(channels=['good_a', 'broken', 'good_b'])
+    original = scraper.build_message
+
+    def build_message(channel_name, i):
+        if channel_name == 'broken':
+            raise RuntimeError("channel unavailable")
+        return original(channel_name, i)
+
+    monkeypatch.setattr(scraper, 'build_message', build_message)
+    summary = asyncio.run(scraper.run_async(message_count=3, max_concurrency=2, rate_limit=0))
+
+    assert summary['messages'] == 6
+    assert scraper.channel_stats['broken']['status'] == 'error'
+    assert scraper.channel_stats['good_a']['messages'] == 3
+    assert os.path.exists(tmp_path / 'data/raw/telegram_messages')
+
+def test_incremental_scraping_fetches_only_new_messages(tmp_path, monkeypatch):
+    """A second run resumes after the channel's high-water mark."""
+    monkeypatch.chdir(tmp_path)
+    from src.scraper import TelegramScraper
+    from src.utils.raw_lake import iter_partition
+
+    scraper = TelegramScraper(channels=['chemed'])
+    first = scraper.run(message_count=3)
+    second = scraper.run(message_count=2)
+
+    assert first['messages'] == 3
+    assert second['messages'] == 2
+    assert scraper.cursors.last_message_id('chemed') == 5
+
+    partition = next((tmp_path / 'data/raw/telegram_messages').iterdir())
+    assert [m['message_id'] for m in iter_partition(str(partition))] == [1, 2, 3, 4, 5]
+
+    # Downstream cursors are reset too, so the re-scraped messages get reloaded
+    scraper.cursors.update('chemed', 5, stage='loader')
+    scraper.run(message_count=3, full_refresh=True)
+    assert [m['message_id'] for m in iter_partition(str(partition))] == [1, 2, 3]
+    assert scraper.cursors.pending('chemed', 'loader')
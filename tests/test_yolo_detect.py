@@ -0,0 +1,223 @@
+"""Test that the YOLO stage starts cheaply."""
+import os
+import sys
+import subprocess
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def test_import_does_not_load_ultralytics_or_pandas():
+    code = ("import sys; import src.yolo_detect; "
+            "print([m for m in ('ultralytics', 'torch', 'pandas') if m in sys.modules])")
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == '[]'
+
+
+def test_no_new_images_exits_without_loading_the_model(tmp_path, monkeypatch):
+    from src.yolo_detect import YOLODetector
+
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('data/raw/images/empty_channel')
+    detector = YOLODetector(cursor_file='state/cursors.json')
+
+    assert detector.process_all_images() == []
+    assert detector._model is None
+
+
+def test_partition_images_come_from_the_partition_messages(tmp_path, monkeypatch):
+    import json
+    from src.yolo_detect import YOLODetector
+
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('data/raw/images/chemed')
+    open('data/raw/images/chemed/1.jpg', 'wb').close()
+    os.makedirs('lake/2026-01-01')
+    with open('lake/2026-01-01/chemed.0000.ndjson', 'w') as f:
+        for message_id, image_path in [(1, 'data/raw/images/chemed/1.jpg'), (2, None),
+                                       (3, 'data/raw/images/chemed/missing.jpg')]:
+            f.write(json.dumps({'message_id': message_id, 'channel_name': 'chemed', 'image_path': image_path}) + "\n")
+
+    detector = YOLODetector(cursor_file='state/cursors.json')
+    assert list(detector.partition_images('lake/2026-01-01')) == [('data/raw/images/chemed/1.jpg', 1, 'chemed')]
+
+
+def test_saved_detections_are_appended_and_deduplicated_on_read(tmp_path, monkeypatch):
+    import pandas as pd
+    from src.yolo_detect import YOLODetector
+
+    monkeypatch.chdir(tmp_path)
+    detector = YOLODetector(cursor_file='state/cursors.json')
+
+    def row(message_id, category):
+        return {'message_id': message_id, 'channel_name': 'chemed', 'model_version': 'v1',
+                'image_category': category, 'box_classes': [], 'box_confidences': [], 'box_xyxy': []}
+
+    # Parquet written by older runs, as a single file
+    pd.DataFrame([row(0, 'other')]).to_parquet(detector.output_parquet, index=False)
+    detector.save_outputs([row(1, 'other'), row(2, 'other')])
+    detector.save_outputs([row(2, 'promotional'), row(3, 'other')])
+
+    # Each run only writes its own rows
+    assert len(pd.read_csv(detector.output_csv)) == 4
+    assert len(detector.parquet_parts()) == 3
+
+    saved = detector.load_detections(['message_id', 'image_category'])
+    assert saved.values.tolist() == [[0, 'other'], [1, 'other'], [2, 'promotional'], [3, 'other']]
+    # Without Parquet the CSV is read the same way
+    os.rename(detector.output_parquet, 'parts')
+    saved = detector.load_detections(['message_id', 'image_category'])
+    assert saved.values.tolist() == [[1, 'other'], [2, 'promotional'], [3, 'other']]
+
+
+def test_failed_load_keeps_images_pending(tmp_path, monkeypatch):
+    from src.yolo_detect import YOLODetector, main
+    from src.utils.cursor_store import CursorStore
+
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('data/raw/images/chemed')
+    open('data/raw/images/chemed/5.jpg', 'wb').close()
+    row = {'message_id': 5, 'channel_name': 'chemed', 'image_path': 'data/raw/images/chemed/5.jpg',
+           'model_version': 'v1', 'detected_class': 'none', 'image_category': 'other', 'box_classes': [], 'box_confidences': [], 'box_xyxy': []}
+    monkeypatch.setattr(YOLODetector, 'detect_items', lambda self, items, *args: [row])
+    monkeypatch.setattr(YOLODetector, 'load_to_postgres', lambda self, results: None)
+
+    with pytest.raises(SystemExit) as exit_info:
+        main(['--no-resize'])
+    assert exit_info.value.code == 1
+    assert CursorStore('data/state/cursors.json').last_message_id('chemed', 'yolo') == 0
+
+
+def test_failed_batch_is_retried_one_image_at_a_time(tmp_path):
+    from PIL import Image
+    from src.yolo_detect import YOLODetector
+
+    items = []
+    for message_id in (1, 2, 3):
+        path = str(tmp_path / f'{message_id}.jpg')
+        # Message 2 is 9px wide and keeps failing on its own
+        Image.new('RGB', (8 + (message_id == 2), 8)).save(path)
+        items.append((path, message_id, 'chemed'))
+
+    def predict(source):
+        if isinstance(source, list) or source.width == 9:
+            raise RuntimeError('bad image')
+        return ['boxes']
+
+    detector = YOLODetector(cursor_file=str(tmp_path / 'cursors.json'), batch_size=3, resized_dir=None)
+    detector.predict = predict
+    detector.extract_detections = lambda result, scale=None: result
+
+    assert [item[1] for item, _ in detector.infer(items)] == [1, 3]
+
+
+def test_images_that_fail_detection_stay_pending(tmp_path, monkeypatch):
+    from src.yolo_detect import YOLODetector
+
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('data/raw/images/chemed')
+    for name in ('5.jpg', '6.jpg'):
+        open(f'data/raw/images/chemed/{name}', 'wb').close()
+    row = {'message_id': 6, 'channel_name': 'chemed', 'image_path': 'data/raw/images/chemed/6.jpg',
+           'model_version': 'v1', 'detected_class': 'none', 'image_category': 'other',
+           'box_classes': [], 'box_confidences': [], 'box_xyxy': []}
+    monkeypatch.setattr(YOLODetector, 'detect_items', lambda self, items, *args: [row])
+
+    detector = YOLODetector(cursor_file='state/cursors.json', resized_dir=None)
+    detector.process_all_images()
+    detector.commit_progress()
+    assert detector.cursors.last_message_id('chemed', 'yolo') == 4
+
+
+def test_images_that_keep_failing_are_given_up(tmp_path, monkeypatch):
+    from src.yolo_detect import YOLODetector, MAX_DETECTION_ATTEMPTS
+
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('data/raw/images/chemed')
+    for name in ('5.jpg', '6.jpg'):
+        open(f'data/raw/images/chemed/{name}', 'wb').close()
+    row = {'message_id': 6, 'channel_name': 'chemed', 'image_path': 'data/raw/images/chemed/6.jpg',
+           'model_version': 'v1', 'detected_class': 'none', 'image_category': 'other',
+           'box_classes': [], 'box_confidences': [], 'box_xyxy': []}
+    monkeypatch.setattr(YOLODetector, 'detect_items', lambda self, items, *args: [row])
+
+    cursors = []
+    for _ in range(MAX_DETECTION_ATTEMPTS):
+        detector = YOLODetector(cursor_file='state/cursors.json', resized_dir=None)
+        detector.process_all_images()
+        detector.commit_progress()
+        cursors.append(detector.cursors.last_message_id('chemed', 'yolo'))
+
+    assert cursors == [4] * (MAX_DETECTION_ATTEMPTS - 1) + [6]
+    assert list(detector.failures) == ['data/raw/images/chemed/5.jpg']
+
+
+def test_near_duplicate_boxes_are_rescaled_to_the_repost(tmp_path):
+    from PIL import Image
+    from src.yolo_detect import rescale_boxes
+
+    original, repost = str(tmp_path / 'original.jpg'), str(tmp_path / 'repost.jpg')
+    Image.new('RGB', (640, 480)).save(original)
+    Image.new('RGB', (320, 240)).save(repost)
+    detections = {'class_ids': [0], 'confidences': [0.9], 'xyxy': [100.0, 50.0, 300.0, 250.0]}
+
+    assert rescale_boxes(detections, repost, original)['xyxy'] == [50.0, 25.0, 150.0, 125.0]
+    assert rescale_boxes(detections, repost, str(tmp_path / 'deleted.jpg'))['xyxy'] == []
+
+
+def test_cache_namespace_depends_on_conf_and_resizing(tmp_path):
+    from src.yolo_detect import YOLODetector
+
+    def namespace(**options):
+        return YOLODetector(cursor_file=str(tmp_path / 'cursors.json'), **options).cache_namespace()
+
+    namespaces = {namespace(), namespace(conf=0.5), namespace(resized_dir=None), namespace(conf=0.5, resized_dir=None)}
+    assert len(namespaces) == 4
+    assert namespace(conf=0.5) == namespace(conf=0.5)
+
+
+def test_cache_hits_do_not_load_the_model(tmp_path, monkeypatch):
+    from PIL import Image
+    import src.yolo_detect as yolo_detect
+    from src.utils.detection_cache import DetectionCache
+    from src.utils.raw_lake import file_checksum
+
+    path = str(tmp_path / '1.jpg')
+    Image.new('RGB', (8, 8)).save(path)
+    detector = yolo_detect.YOLODetector(cursor_file=str(tmp_path / 'cursors.json'), resized_dir=None,
+                                        cache_file=str(tmp_path / 'cache.sqlite'), index_file=None)
+    with DetectionCache(detector.cache_file, detector.cache_namespace()) as cache:
+        cache.put(file_checksum(path), {'class_ids': [0], 'confidences': [0.9], 'xyxy': [0.0, 0.0, 4.0, 4.0]})
+        cache.put_class_names({0: 'person'})
+
+    def load_yolo(*args, **kwargs):
+        raise AssertionError('the model was loaded')
+    monkeypatch.setattr(yolo_detect, 'load_yolo', load_yolo)
+
+    rows = detector.detect_items([(path, 1, 'chemed')])
+    assert [row['image_category'] for row in rows] == ['lifestyle']
+    assert detector._model is None
+
+
+def test_worker_caps_onnx_runtime_threads(tmp_path, monkeypatch):
+    onnx = pytest.importorskip('onnx')
+    onnxruntime = pytest.importorskip('onnxruntime')
+    import torch
+    from onnx import helper, TensorProto
+    from src.yolo_detect import cap_runtime_threads
+
+    # Restored after the test, like the environment and torch threads
+    monkeypatch.setattr(onnxruntime, 'InferenceSession', onnxruntime.InferenceSession)
+    monkeypatch.setenv('OMP_NUM_THREADS', '')
+    monkeypatch.setattr(torch, 'set_num_threads', lambda threads: None)
+
+    graph = helper.make_graph([helper.make_node('Identity', ['x'], ['y'])], 'identity',
+                              [helper.make_tensor_value_info('x', TensorProto.FLOAT, [1])],
+                              [helper.make_tensor_value_info('y', TensorProto.FLOAT, [1])])
+    path = str(tmp_path / 'identity.onnx')
+    onnx.save(helper.make_model(graph, opset_imports=[helper.make_opsetid('', 13)], ir_version=8), path)
+
+    cap_runtime_threads('onnx', 2)
+    session = onnxruntime.InferenceSession(path, providers=['CPUExecutionProvider'])
+    assert session.get_session_options().intra_op_num_threads == 2
+    assert os.environ['OMP_NUM_THREADS'] == '2'